@@ -0,0 +1,32 @@
+/**
+ * Run fn over items with at most `limit` calls in flight.
+ * Results keep the input order; a rejected call rejects the whole run.
+ */
+async function mapWithConcurrency(items, limit, fn) {
+    const results = new Array(items.length);
+    let next = 0;
+
+    async function worker() {
+        while (next < items.length) {
+            const index = next++;
+            results[index] = await fn(items[index], index);
+        }
+    }
+
+    const workers = Array.from({ length: Math.max(1, Math.min(limit, items.length)) }, worker);
+    await Promise.all(workers);
+    return results;
+}
+
+/**
+ * Split items into consecutive slices of at most `size` (e.g. to bound .in() filters and RPC payloads).
+ */
+function chunk(items, size) {
+    const chunks = [];
+    for (let i = 0; i < items.length; i += size) {
+        chunks.push(items.slice(i, i + size));
+    }
+    return chunks;
+}
+
+module.exports = { mapWithConcurrency, chunk };
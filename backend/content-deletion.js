@@ -0,0 +1,306 @@
+const { once } = require('events');
+const { mapWithConcurrency, chunk } = require('./async-pool');
+
+/**
+ * Content deletion with Vimeo/Mux cleanup, for single items and batches.
+ *
+ * Batches load their records and purchase checks with one query per content type, then
+ * fan the platform deletes out with bounded concurrency. A 429 from either platform
+ * pauses every worker for that platform (Retry-After, else exponential backoff) instead
+ * of each worker hammering the API on its own schedule.
+ */
+
+const CONTENT_TABLES = { drill: 'drills', lesson: 'lessons', sparring: 'sparring_videos' };
+
+const ID_QUERY_CHUNK = 200;
+const UUID_PATTERN = /^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$/i;
+const MAX_ATTEMPTS = 5;
+const BASE_BACKOFF_MS = 500;
+const MAX_BACKOFF_MS = 30000;
+
+const isUsableId = value => value && !value.toString().startsWith('ERROR');
+
+/**
+ * Platform videos referenced by a content record: [{ platform: 'vimeo'|'mux', id }]
+ */
+function collectPlatformVideos(contentType, record) {
+    const videos = [];
+
+    if (contentType === 'drill') {
+        // Drills use Mux (playback IDs in vimeo_url and description_video_url)
+        if (isUsableId(record.vimeo_url)) videos.push({ platform: 'mux', id: record.vimeo_url });
+        if (isUsableId(record.description_video_url)) videos.push({ platform: 'mux', id: record.description_video_url });
+    } else if (contentType === 'lesson') {
+        // Lessons use Vimeo; IDs might be in "id:hash" format
+        if (isUsableId(record.vimeo_url)) videos.push({ platform: 'vimeo', id: record.vimeo_url.split(':')[0] });
+    } else if (contentType === 'sparring') {
+        // Sparring uses Vimeo, or Mux (short playback IDs without a hash) for newer uploads
+        if (isUsableId(record.video_url)) {
+            const isMux = record.video_url.length < 20 && !record.video_url.includes(':');
+            videos.push(isMux
+                ? { platform: 'mux', id: record.video_url }
+                : { platform: 'vimeo', id: record.video_url.split(':')[0] });
+        }
+        if (isUsableId(record.preview_vimeo_id)) {
+            videos.push({ platform: 'vimeo', id: record.preview_vimeo_id.split(':')[0] });
+        }
+    }
+
+    return videos;
+}
+
+/**
+ * IDs (of the given records) that have purchases and must not be deleted.
+ */
+async function findPurchasedContentIds(supabase, contentType, records) {
+    const blocked = new Set();
+    if (records.length === 0) return blocked;
+
+    for (const ids of chunk(records.map(r => r.id), ID_QUERY_CHUNK)) {
+        if (contentType === 'drill') {
+            const { data, error } = await supabase.from('user_drill_purchases').select('drill_id').in('drill_id', ids);
+            if (error) throw error;
+            data.forEach(row => blocked.add(row.drill_id));
+        } else if (contentType === 'sparring') {
+            const { data, error } = await supabase.from('purchases').select('product_id')
+                .in('product_id', ids).eq('status', 'completed');
+            if (error) throw error;
+            data.forEach(row => blocked.add(row.product_id));
+        }
+    }
+
+    if (contentType === 'lesson') {
+        // Lessons are bought through their course
+        const courseIds = [...new Set(records.map(r => r.course_id).filter(Boolean))];
+        const purchasedCourses = new Set();
+        for (const ids of chunk(courseIds, ID_QUERY_CHUNK)) {
+            const { data, error } = await supabase.from('user_courses').select('course_id').in('course_id', ids);
+            if (error) throw error;
+            data.forEach(row => purchasedCourses.add(row.course_id));
+        }
+        records.filter(r => purchasedCourses.has(r.course_id)).forEach(r => blocked.add(r.id));
+    }
+
+    return blocked;
+}
+
+/**
+ * Shared pause for one platform: a 429 seen by any worker delays every worker.
+ */
+class RateLimitGate {
+    constructor() {
+        this.resumeAt = 0;
+        this.throttled = 0;
+    }
+
+    async wait() {
+        const delay = this.resumeAt - Date.now();
+        if (delay > 0) await new Promise(r => setTimeout(r, delay));
+    }
+
+    pause(ms) {
+        this.throttled++;
+        this.resumeAt = Math.max(this.resumeAt, Date.now() + ms);
+    }
+}
+
+function backoffDelay(attempt, retryAfter) {
+    const seconds = Number(retryAfter);
+    if (retryAfter && Number.isFinite(seconds)) return Math.min(seconds * 1000, MAX_BACKOFF_MS);
+    const exp = Math.min(BASE_BACKOFF_MS * 2 ** (attempt - 1), MAX_BACKOFF_MS);
+    return exp / 2 + Math.random() * exp / 2;
+}
+
+/**
+ * fetch with retries on 429 and 5xx. Resolves to the last Response plus the attempt count.
+ */
+async function fetchWithBackoff(url, options, gate) {
+    for (let attempt = 1; ; attempt++) {
+        await gate.wait();
+        let response;
+        try {
+            response = await fetch(url, options);
+        } catch (err) {
+            if (attempt >= MAX_ATTEMPTS) throw err;
+            await new Promise(r => setTimeout(r, backoffDelay(attempt)));
+            continue;
+        }
+
+        const retryable = response.status === 429 || response.status >= 500;
+        if (!retryable || attempt >= MAX_ATTEMPTS) return { response, attempts: attempt };
+
+        const delay = backoffDelay(attempt, response.headers.get('retry-after'));
+        if (response.status === 429) gate.pause(delay);
+        else await new Promise(r => setTimeout(r, delay));
+    }
+}
+
+/**
+ * Deletes platform videos. Endpoints default to the real APIs and can be pointed at local
+ * stand-ins with VIMEO_API_BASE / MUX_API_BASE.
+ */
+function createPlatformDeleter({
+    vimeoToken,
+    muxAuthHeader,
+    vimeoBase = process.env.VIMEO_API_BASE || 'https://api.vimeo.com',
+    muxBase = process.env.MUX_API_BASE || 'https://api.mux.com'
+}) {
+    const gates = { vimeo: new RateLimitGate(), mux: new RateLimitGate() };
+
+    async function deleteVimeo(id) {
+        const { response, attempts } = await fetchWithBackoff(`${vimeoBase}/videos/${id}`, {
+            method: 'DELETE',
+            headers: { Authorization: `Bearer ${vimeoToken}` }
+        }, gates.vimeo);
+        return { attempts, httpStatus: response.status, status: response.ok ? 'deleted' : response.status === 404 ? 'not_found' : 'failed' };
+    }
+
+    async function deleteMux(playbackId) {
+        // Mux deletes by asset ID, so resolve the playback ID first
+        const lookup = await fetchWithBackoff(`${muxBase}/video/v1/playback-ids/${playbackId}`, {
+            headers: { Authorization: muxAuthHeader() }
+        }, gates.mux);
+        if (lookup.response.status === 404) return { attempts: lookup.attempts, httpStatus: 404, status: 'not_found' };
+        if (!lookup.response.ok) return { attempts: lookup.attempts, httpStatus: lookup.response.status, status: 'failed' };
+
+        const assetId = (await lookup.response.json()).data?.object?.id;
+        if (!assetId) return { attempts: lookup.attempts, httpStatus: lookup.response.status, status: 'not_found' };
+
+        const { response, attempts } = await fetchWithBackoff(`${muxBase}/video/v1/assets/${assetId}`, {
+            method: 'DELETE',
+            headers: { Authorization: muxAuthHeader() }
+        }, gates.mux);
+        return {
+            assetId,
+            attempts: lookup.attempts + attempts,
+            httpStatus: response.status,
+            status: response.ok ? 'deleted' : response.status === 404 ? 'not_found' : 'failed'
+        };
+    }
+
+    return {
+        gates,
+        async delete(video) {
+            try {
+                const result = video.platform === 'vimeo' ? await deleteVimeo(video.id) : await deleteMux(video.id);
+                return { ...video, ...result };
+            } catch (err) {
+                return { ...video, status: 'failed', error: err.message };
+            }
+        }
+    };
+}
+
+/**
+ * Delete a batch of { contentType, contentId } items and stream one NDJSON line per item
+ * as it completes, followed by a { summary } line.
+ *
+ * Item statuses: deleted | not_found | blocked (has purchases) | failed. An item whose
+ * platform delete failed keeps its DB row so the same batch can simply be retried; a
+ * contentId that is not a UUID fails on its own instead of failing the whole query.
+ * Repeated items are handled once, and the summary's total and counts both cover the
+ * de-duplicated list. If a lookup fails partway, an { error } line is written and the
+ * stream still closes with the summary.
+ */
+async function streamBatchDelete(supabase, res, items, { deleter, concurrency = 8, onDeleted = () => {} }) {
+    const started = Date.now();
+    const counts = { deleted: 0, not_found: 0, blocked: 0, failed: 0 };
+    let closed = false;
+    res.on('close', () => { closed = true; });
+
+    res.status(200);
+    res.set('Content-Type', 'application/x-ndjson; charset=utf-8');
+    res.set('Cache-Control', 'no-store');
+
+    async function emit(line) {
+        if (line.status) counts[line.status]++;
+        if (closed) return;
+        if (!res.write(`${JSON.stringify(line)}\n`)) await once(res, 'drain');
+    }
+
+    const unique = [...new Map(items.map(i => [`${i.contentType}:${i.contentId}`, i])).values()];
+    let failure = null;
+    try {
+        const valid = [];
+        for (const item of unique) {
+            if (typeof item.contentId === 'string' && UUID_PATTERN.test(item.contentId)) {
+                valid.push(item);
+            } else {
+                await emit({ contentType: item.contentType, contentId: item.contentId, status: 'failed', error: 'contentId must be a UUID' });
+            }
+        }
+
+        // 1. Load records and purchase checks: one query per content type (per 200 IDs)
+        const work = [];
+        for (const [contentType, tableName] of Object.entries(CONTENT_TABLES)) {
+            const ids = valid.filter(i => i.contentType === contentType).map(i => i.contentId);
+            if (ids.length === 0) continue;
+
+            const records = [];
+            for (const idChunk of chunk(ids, ID_QUERY_CHUNK)) {
+                const { data, error } = await supabase.from(tableName).select('*').in('id', idChunk);
+                if (error) throw error;
+                records.push(...data);
+            }
+            const blocked = await findPurchasedContentIds(supabase, contentType, records);
+            const byId = new Map(records.map(r => [r.id, r]));
+
+            for (const contentId of ids) {
+                const record = byId.get(contentId);
+                if (!record) {
+                    await emit({ contentType, contentId, status: 'not_found' });
+                } else if (blocked.has(contentId)) {
+                    await emit({ contentType, contentId, status: 'blocked', hasPurchases: true });
+                } else {
+                    work.push({ contentType, contentId, tableName, videos: collectPlatformVideos(contentType, record) });
+                }
+            }
+        }
+
+        // 2. Platform deletes fan out across items; each item's row is deleted once its videos are gone
+        await mapWithConcurrency(work, concurrency, async item => {
+            if (closed) return;
+            // Videos within an item go one at a time so `concurrency` bounds platform requests in flight
+            const videos = [];
+            for (const video of item.videos) videos.push(await deleter.delete(video));
+            const line = { contentType: item.contentType, contentId: item.contentId, videos };
+
+            if (videos.some(v => v.status === 'failed')) {
+                await emit({ ...line, status: 'failed', error: 'Platform delete failed; record kept for retry' });
+                return;
+            }
+
+            const { error } = await supabase.from(item.tableName).delete().eq('id', item.contentId);
+            if (error) {
+                await emit({ ...line, status: 'failed', error: error.message });
+                return;
+            }
+            onDeleted(item);
+            await emit({ ...line, status: 'deleted' });
+        });
+    } catch (err) {
+        // Headers are already sent: report the failure in-band and still close with the summary
+        console.error('[API/Delete] Batch aborted mid-stream:', err);
+        failure = err;
+        await emit({ error: err.message });
+    }
+
+    await emit({
+        summary: {
+            ...counts,
+            total: unique.length,
+            ...(failure && { aborted: true }),
+            durationMs: Date.now() - started,
+            throttled: { vimeo: deleter.gates.vimeo.throttled, mux: deleter.gates.mux.throttled }
+        }
+    });
+    res.end();
+}
+
+module.exports = {
+    CONTENT_TABLES,
+    collectPlatformVideos,
+    findPurchasedContentIds,
+    createPlatformDeleter,
+    streamBatchDelete
+};
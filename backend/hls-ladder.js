@@ -0,0 +1,261 @@
+const crypto = require('crypto');
+const fs = require('fs');
+const path = require('path');
+const { spawn } = require('child_process');
+
+/**
+ * Adaptive-bitrate HLS (CMAF / fragmented MP4) output for /process.
+ *
+ * One ffmpeg run decodes the input once, splits the decoded frames into one scaler and
+ * encoder per rendition, and writes every playlist, init segment and media segment over
+ * HTTP PUT to the backend's loopback ingest route. The ingest acknowledges each piece as
+ * soon as it is queued and uploads segments to storage (Supabase bucket or a local
+ * directory) through a bounded queue, so ffmpeg never waits on a single storage round
+ * trip and segments are never staged on disk. Playlists are uploaded once, at flush().
+ *
+ * The lowest rendition doubles as the preview: its init segment plus media segments,
+ * concatenated in playlist order, form a playable fragmented MP4.
+ */
+
+const HLS_RENDITIONS = [
+    { name: '360p', height: 360, videoKbps: 800, audioKbps: 96 },
+    { name: '720p', height: 720, videoKbps: 2800, audioKbps: 128 },
+    { name: '1080p', height: 1080, videoKbps: 5000, audioKbps: 128 }
+];
+const DEFAULT_SEGMENT_SECONDS = 4;
+const DEFAULT_UPLOAD_CONCURRENCY = 4;
+const DEFAULT_MAX_QUEUED = 32;
+
+const CONTENT_TYPES = {
+    '.m3u8': 'application/vnd.apple.mpegurl',
+    '.m4s': 'video/iso.segment',
+    '.mp4': 'video/mp4'
+};
+
+/**
+ * Renditions to encode for a source: never upscale, but always keep the lowest rung.
+ */
+function selectRenditions(sourceHeight, renditions = HLS_RENDITIONS) {
+    const fitting = renditions.filter(r => !sourceHeight || r.height <= sourceHeight);
+    return fitting.length > 0 ? fitting : [renditions[0]];
+}
+
+/**
+ * ffmpeg arguments for a single-pass ladder. `input` is a file, or a concat list when
+ * `concat` is set (the cut parts are fed straight in, so no joined intermediate is written).
+ */
+function buildLadderArgs({ input, concat = false, renditions, hasAudio, segmentSeconds = DEFAULT_SEGMENT_SECONDS, outputBase }) {
+    const n = renditions.length;
+    const args = ['-hide_banner', '-loglevel', 'error', '-y'];
+    if (concat) args.push('-f', 'concat', '-safe', '0');
+    args.push('-i', input);
+
+    const splits = renditions.map((_, i) => `[s${i}]`).join('');
+    const scales = renditions.map((r, i) => `[s${i}]scale=-2:${r.height}[v${i}]`).join(';');
+    args.push('-filter_complex', `[0:v]split=${n}${splits};${scales}`);
+
+    renditions.forEach((r, i) => {
+        args.push(
+            '-map', `[v${i}]`,
+            `-c:v:${i}`, 'libx264',
+            `-b:v:${i}`, `${r.videoKbps}k`,
+            `-maxrate:v:${i}`, `${Math.round(r.videoKbps * 1.07)}k`,
+            `-bufsize:v:${i}`, `${Math.round(r.videoKbps * 1.5)}k`
+        );
+        if (hasAudio) args.push('-map', '0:a:0', `-c:a:${i}`, 'aac', `-b:a:${i}`, `${r.audioKbps}k`);
+    });
+
+    const streamMap = renditions
+        .map((r, i) => (hasAudio ? `v:${i},a:${i},name:${r.name}` : `v:${i},name:${r.name}`))
+        .join(' ');
+
+    args.push(
+        '-preset', 'veryfast',
+        '-pix_fmt', 'yuv420p',
+        // Keyframes on every segment boundary in every rendition so players can switch anywhere
+        '-force_key_frames', `expr:gte(t,n_forced*${segmentSeconds})`,
+        '-sc_threshold', '0',
+        '-f', 'hls',
+        '-hls_time', String(segmentSeconds),
+        '-hls_playlist_type', 'vod',
+        '-hls_segment_type', 'fmp4',
+        '-hls_flags', 'independent_segments',
+        '-hls_segment_filename', `${outputBase}/%v/seg_%05d.m4s`,
+        '-master_pl_name', 'master.m3u8',
+        '-var_stream_map', streamMap,
+        '-method', 'PUT',
+        '-http_persistent', '1',
+        `${outputBase}/%v/index.m3u8`
+    );
+    return args;
+}
+
+function runFfmpeg(ffmpegPath, args) {
+    return new Promise((resolve, reject) => {
+        const proc = spawn(ffmpegPath, args);
+        let stderr = '';
+        proc.stderr.on('data', chunk => { stderr = (stderr + chunk).slice(-8192); });
+        proc.on('error', reject);
+        proc.on('close', code => (code === 0 ? resolve() : reject(new Error(`ffmpeg exited with ${code}: ${stderr.trim()}`))));
+    });
+}
+
+/**
+ * Storage targets for ladder output. Both expose put(key, buffer, contentType) and url(key).
+ */
+function createSupabaseHlsStorage(supabase, bucket) {
+    return {
+        async put(key, body, contentType) {
+            const { error } = await supabase.storage.from(bucket).upload(key, body, { contentType, upsert: true });
+            if (error) throw error;
+        },
+        url(key) {
+            return supabase.storage.from(bucket).getPublicUrl(key).data.publicUrl;
+        }
+    };
+}
+
+function createLocalHlsStorage(rootDir, urlBase) {
+    return {
+        async put(key, body) {
+            const target = path.join(rootDir, key);
+            await fs.promises.mkdir(path.dirname(target), { recursive: true });
+            await fs.promises.writeFile(target, body);
+        },
+        url(key) {
+            return `${urlBase}/${key}`;
+        }
+    };
+}
+
+/**
+ * Receives one job's ladder output from ffmpeg and forwards it to storage.
+ *
+ * receive() resolves once a piece is queued; at most `uploadConcurrency` uploads run at a
+ * time and at most `maxQueued` wait behind them (further receives wait for room, which
+ * back-pressures ffmpeg). flush() waits for the queue and then uploads the playlists.
+ */
+class HlsIngest {
+    constructor({ prefix, storage, previewVariant, keepDir, uploadConcurrency = DEFAULT_UPLOAD_CONCURRENCY, maxQueued = DEFAULT_MAX_QUEUED }) {
+        this.prefix = prefix;
+        this.storage = storage;
+        this.previewVariant = previewVariant;
+        this.keepDir = keepDir;
+        this.uploadConcurrency = uploadConcurrency;
+        this.maxQueued = maxQueued;
+        this.token = crypto.randomBytes(16).toString('hex');
+        this.playlists = {};
+        this.stats = { pieces: 0, bytes: 0 };
+        this.queue = [];
+        this.active = 0;
+        this.waiters = []; // resolved whenever an upload settles
+        this.failure = null;
+    }
+
+    async receive(key, body) {
+        const normalized = path.posix.normalize(key);
+        if (normalized.startsWith('..') || path.posix.isAbsolute(normalized)) {
+            throw new Error(`Invalid HLS key: ${key}`);
+        }
+        if (this.failure) throw this.failure;
+
+        const ext = path.posix.extname(normalized);
+        if (ext === '.m3u8') {
+            // ffmpeg rewrites playlists as it goes; the last write is the complete one, uploaded by flush()
+            this.playlists[normalized] = body.toString('utf8');
+            return;
+        }
+
+        if (normalized.startsWith(`${this.previewVariant}/`) || ext === '.mp4') {
+            // Keep the preview rendition's pieces so they can be joined into a progressive file.
+            // Init segments are tiny and their placement varies between ffmpeg versions, so keep them all
+            const target = path.join(this.keepDir, normalized);
+            await fs.promises.mkdir(path.dirname(target), { recursive: true });
+            await fs.promises.writeFile(target, body);
+        }
+
+        while (this.queue.length >= this.maxQueued) await this.settled();
+        this.queue.push({ key: normalized, body });
+        this.pump();
+    }
+
+    settled() {
+        return new Promise(resolve => this.waiters.push(resolve));
+    }
+
+    pump() {
+        while (this.active < this.uploadConcurrency && this.queue.length > 0) {
+            const { key, body } = this.queue.shift();
+            this.active++;
+            this.upload(key, body)
+                .catch(err => { this.failure = this.failure || err; })
+                .finally(() => {
+                    this.active--;
+                    this.pump();
+                    this.waiters.splice(0).forEach(resolve => resolve());
+                });
+        }
+    }
+
+    async upload(key, body) {
+        const ext = path.posix.extname(key);
+        await this.storage.put(`${this.prefix}/${key}`, body, CONTENT_TYPES[ext] || 'application/octet-stream');
+        this.stats.pieces++;
+        this.stats.bytes += body.length;
+    }
+
+    /**
+     * Wait for every queued segment, then upload the final playlists (master last, so it
+     * only ever points at complete renditions). Throws the first upload failure.
+     */
+    async flush() {
+        while (this.active > 0 || this.queue.length > 0) await this.settled();
+        if (this.failure) throw this.failure;
+
+        const keys = Object.keys(this.playlists);
+        const master = keys.filter(key => path.posix.basename(key) === 'master.m3u8');
+        await Promise.all(keys.filter(key => !master.includes(key)).map(key => this.upload(key, Buffer.from(this.playlists[key]))));
+        for (const key of master) await this.upload(key, Buffer.from(this.playlists[key]));
+    }
+
+    /**
+     * Join the preview rendition (init segment + media segments in playlist order) into outPath.
+     */
+    async assemblePreview(outPath) {
+        const playlistKey = `${this.previewVariant}/index.m3u8`;
+        const playlist = this.playlists[playlistKey];
+        if (!playlist) throw new Error(`Preview playlist ${playlistKey} was never written`);
+
+        const map = playlist.match(/#EXT-X-MAP:URI="([^"]+)"/);
+        const segments = playlist.split('\n').map(l => l.trim()).filter(l => l && !l.startsWith('#'));
+        const pieces = [...(map ? [map[1]] : []), ...segments]
+            .map(uri => path.join(this.keepDir, path.posix.normalize(path.posix.join(this.previewVariant, uri))));
+
+        const tmp = `${outPath}.${process.pid}.tmp`;
+        const out = fs.createWriteStream(tmp);
+        for (const piece of pieces) {
+            await new Promise((resolve, reject) => {
+                fs.createReadStream(piece).on('error', reject).on('end', resolve).pipe(out, { end: false });
+            });
+        }
+        out.end();
+        await new Promise((resolve, reject) => out.on('finish', resolve).on('error', reject));
+        await fs.promises.rename(tmp, outPath);
+        return pieces.length;
+    }
+
+    masterUrl() {
+        return this.storage.url(`${this.prefix}/master.m3u8`);
+    }
+}
+
+module.exports = {
+    HLS_RENDITIONS,
+    DEFAULT_SEGMENT_SECONDS,
+    selectRenditions,
+    buildLadderArgs,
+    runFfmpeg,
+    createSupabaseHlsStorage,
+    createLocalHlsStorage,
+    HlsIngest
+};
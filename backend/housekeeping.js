@@ -0,0 +1,122 @@
+const fs = require('fs');
+const path = require('path');
+
+/**
+ * Bounds for long-running process state.
+ *
+ * - createTtlSweeper: expires entries of a plain-object map (jobStatus, vimeoFolderCache)
+ *   a fixed time after they were first seen, skipping entries that are still active.
+ * - collectGarbage: removes files/directories under a temp dir whose mtime is older
+ *   than a max age, skipping names the caller says are still in use. Entries that
+ *   belong together (a session's .json and .part) can be grouped so they are aged on
+ *   the newest member and removed together.
+ * - runtimeStats: RSS, heap, open file descriptors and temp-dir sizes for /metrics/runtime.
+ */
+
+function createTtlSweeper(map, { ttlMs, isActive = () => false, timestampOf = () => null }) {
+    const firstSeen = new Map(); // key -> ms; covers entries that carry no timestamp of their own
+
+    return function sweep(now = Date.now()) {
+        let evicted = 0;
+        for (const key of firstSeen.keys()) {
+            if (!(key in map)) firstSeen.delete(key);
+        }
+        for (const [key, entry] of Object.entries(map)) {
+            if (isActive(entry)) {
+                firstSeen.delete(key);
+                continue;
+            }
+            if (!firstSeen.has(key)) {
+                const ts = timestampOf(entry);
+                firstSeen.set(key, ts ? new Date(ts).getTime() : now);
+            }
+            if (now - firstSeen.get(key) > ttlMs) {
+                delete map[key];
+                firstSeen.delete(key);
+                evicted++;
+            }
+        }
+        return evicted;
+    };
+}
+
+async function pathSize(target) {
+    const stat = await fs.promises.lstat(target).catch(() => null);
+    if (!stat) return 0;
+    if (!stat.isDirectory()) return stat.size;
+    const entries = await fs.promises.readdir(target).catch(() => []);
+    let total = 0;
+    for (const entry of entries) {
+        total += await pathSize(path.join(target, entry));
+    }
+    return total;
+}
+
+// Newest mtime anywhere under target, so a job directory still being written is not collected
+async function latestMtime(target) {
+    const stat = await fs.promises.lstat(target).catch(() => null);
+    if (!stat) return 0;
+    let latest = stat.mtimeMs;
+    if (stat.isDirectory()) {
+        for (const entry of await fs.promises.readdir(target).catch(() => [])) {
+            latest = Math.max(latest, await latestMtime(path.join(target, entry)));
+        }
+    }
+    return latest;
+}
+
+async function collectGarbage(dir, { maxAgeMs, inUse = () => false, match = () => true, group = name => name, onRemove = () => {}, now = Date.now() }) {
+    const result = { removed: 0, bytes: 0 };
+    const groups = new Map(); // group key -> entry names
+    for (const name of await fs.promises.readdir(dir).catch(() => [])) {
+        if (!match(name)) continue;
+        const key = group(name);
+        groups.set(key, [...(groups.get(key) || []), name]);
+    }
+
+    for (const names of groups.values()) {
+        if (names.some(inUse)) continue;
+        const mtimes = await Promise.all(names.map(name => latestMtime(path.join(dir, name))));
+        if (now - Math.max(...mtimes) <= maxAgeMs) continue;
+
+        for (const name of names) {
+            const target = path.join(dir, name);
+            const bytes = await pathSize(target);
+            try {
+                await fs.promises.rm(target, { recursive: true, force: true });
+                result.removed++;
+                result.bytes += bytes;
+                onRemove(name);
+            } catch (e) {
+                console.warn(`[Housekeeping] Failed to remove ${target}:`, e.message);
+            }
+        }
+    }
+    return result;
+}
+
+function openFileDescriptors() {
+    try {
+        return fs.readdirSync('/proc/self/fd').length;
+    } catch (e) {
+        return null; // not Linux
+    }
+}
+
+async function runtimeStats(dirs) {
+    const memory = process.memoryUsage();
+    const tempBytes = {};
+    for (const [name, dir] of Object.entries(dirs)) {
+        tempBytes[name] = await pathSize(dir);
+    }
+    return {
+        uptimeSec: Math.round(process.uptime()),
+        rssBytes: memory.rss,
+        heapUsedBytes: memory.heapUsed,
+        externalBytes: memory.external,
+        openFds: openFileDescriptors(),
+        tempBytes
+    };
+}
+
+module.exports = { createTtlSweeper, collectGarbage, runtimeStats, pathSize };
@@ -0,0 +1,226 @@
+const { once } = require('events');
+
+/**
+ * Payout request helpers: bulk validation and the month-end settlement export
+ */
+
+// Minor-unit precision per currency (totals are summed in minor units to avoid float drift)
+const CURRENCY_DECIMALS = { USD: 2, KRW: 0 };
+
+// Each provider pays out to its own payee field, read from the creator's saved payout_settings
+// (first non-empty key wins; wiseEmail is the legacy name of paypalEmail)
+const PAYOUT_PROVIDERS = {
+    PayPal: { payeeField: 'paypal_email', settingsKeys: ['paypalEmail', 'wiseEmail'], label: 'PayPal email' },
+    Portone: { payeeField: 'portone_phone', settingsKeys: ['portonePhone'], label: 'Portone phone number' }
+};
+
+// The revenue ledger (and so the creator balance) is kept in KRW
+const LEDGER_CURRENCY = 'KRW';
+
+const UUID_PATTERN = /^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$/i;
+
+const PAYOUT_REQUEST_COLUMNS = 'id, creator_id, amount, currency, payment_method, paypal_email, portone_phone, status, requested_at';
+
+const CSV_COLUMNS = ['type', 'currency', 'payment_method', 'id', 'creator_id', 'payee', 'amount', 'count', 'requested_at'];
+
+/**
+ * Validate an incoming payout request body for the authenticated `creator` ({ id, payout_settings })
+ * and map it to a submit_creator_payout_requests item. The payee always comes from the creator's
+ * saved payout settings, never from the body; a body creator_id other than the caller's is rejected.
+ * `krwRates` maps each currency to its KRW value so the amount can be debited from the ledger.
+ * Returns { row } on success or { error, status? } with a human readable reason.
+ */
+function normalizePayoutRequest(input, creator, krwRates = { [LEDGER_CURRENCY]: 1 }) {
+    if (!input || typeof input !== 'object') {
+        return { error: 'Payout request must be an object' };
+    }
+
+    const { payment_method, currency } = input;
+    const amount = Number(input.amount);
+
+    if (input.creator_id !== undefined && input.creator_id !== creator.id) {
+        return { error: 'creator_id does not match the authenticated creator', status: 403 };
+    }
+    if (!Number.isFinite(amount) || amount <= 0) return { error: 'amount must be a positive number' };
+
+    const provider = typeof payment_method === 'string' && Object.hasOwn(PAYOUT_PROVIDERS, payment_method)
+        ? PAYOUT_PROVIDERS[payment_method]
+        : null;
+    if (!provider) {
+        return { error: `payment_method must be one of ${Object.keys(PAYOUT_PROVIDERS).join(', ')}` };
+    }
+    if (typeof currency !== 'string' || !Object.hasOwn(CURRENCY_DECIMALS, currency)) {
+        return { error: `currency must be one of ${Object.keys(CURRENCY_DECIMALS).join(', ')}` };
+    }
+    const settings = creator.payout_settings || {};
+    const payee = provider.settingsKeys.map(key => settings[key]).find(value => typeof value === 'string' && value.trim());
+    if (!payee) {
+        return { error: `Save a ${provider.label} in your payout settings before requesting ${payment_method} payouts` };
+    }
+
+    const factor = 10 ** CURRENCY_DECIMALS[currency];
+    if (Math.abs(Math.round(amount * factor) - amount * factor) > 1e-6) {
+        return { error: `amount has too many decimal places for ${currency}` };
+    }
+
+    const krwRate = Object.hasOwn(krwRates, currency) ? Number(krwRates[currency]) : NaN;
+    if (!Number.isFinite(krwRate) || krwRate <= 0) {
+        return { error: `No KRW conversion rate configured for ${currency} payouts` };
+    }
+
+    return {
+        row: {
+            creator_id: creator.id,
+            amount,
+            currency,
+            payment_method,
+            paypal_email: payment_method === 'PayPal' ? payee.trim() : null,
+            portone_phone: payment_method === 'Portone' ? payee.trim() : null,
+            ledger_amount: Math.round(amount * krwRate)
+        }
+    };
+}
+
+function currencyDecimals(currency) {
+    if (typeof currency !== 'string' || !Object.hasOwn(CURRENCY_DECIMALS, currency)) {
+        throw new Error(`Unsupported payout currency: ${currency}`);
+    }
+    return CURRENCY_DECIMALS[currency];
+}
+
+function toMinorUnits(amount, currency) {
+    return Math.round(Number(amount) * 10 ** currencyDecimals(currency));
+}
+
+function fromMinorUnits(minor, currency) {
+    const decimals = currencyDecimals(currency);
+    return (minor / 10 ** decimals).toFixed(decimals);
+}
+
+function csvCell(value) {
+    if (value === null || value === undefined) return '';
+    let str = String(value);
+    // Spreadsheets evaluate cells starting with these as formulas; force them to text
+    if (/^[=+\-@\t\r]/.test(str)) str = `'${str}`;
+    return /[",\n\r]/.test(str) ? `"${str.replace(/"/g, '""')}"` : str;
+}
+
+/**
+ * Serializer for settlement rows that arrive sorted by (currency, payment_method).
+ * Group subtotals are emitted as soon as the group key changes, so the export is
+ * produced in a single pass without buffering the whole month in memory.
+ */
+function createSettlementSerializer(format) {
+    let group = null;
+    let groupCount = 0;
+    let totalCount = 0;
+
+    const line = record => {
+        if (format === 'ndjson') return `${JSON.stringify(record)}\n`;
+        return `${CSV_COLUMNS.map(col => csvCell(record[col])).join(',')}\n`;
+    };
+
+    const closeGroup = () => {
+        if (!group) return '';
+        groupCount++;
+        const out = line({
+            type: 'group_total',
+            currency: group.currency,
+            payment_method: group.payment_method,
+            amount: fromMinorUnits(group.minor, group.currency),
+            count: group.count
+        });
+        group = null;
+        return out;
+    };
+
+    return {
+        contentType: format === 'ndjson' ? 'application/x-ndjson' : 'text/csv; charset=utf-8',
+
+        header() {
+            return format === 'ndjson' ? '' : `${CSV_COLUMNS.join(',')}\n`;
+        },
+
+        row(request) {
+            let out = '';
+            const paymentMethod = request.payment_method || 'unknown';
+            if (!group || group.currency !== request.currency || group.payment_method !== paymentMethod) {
+                out += closeGroup();
+                group = { currency: request.currency, payment_method: paymentMethod, minor: 0, count: 0 };
+            }
+            group.minor += toMinorUnits(request.amount, request.currency);
+            group.count++;
+            totalCount++;
+
+            const provider = Object.hasOwn(PAYOUT_PROVIDERS, paymentMethod) ? PAYOUT_PROVIDERS[paymentMethod] : null;
+            out += line({
+                type: 'request',
+                currency: request.currency,
+                payment_method: paymentMethod,
+                id: request.id,
+                creator_id: request.creator_id,
+                payee: provider ? request[provider.payeeField] : null,
+                amount: fromMinorUnits(toMinorUnits(request.amount, request.currency), request.currency),
+                requested_at: request.requested_at
+            });
+            return out;
+        },
+
+        end() {
+            const out = closeGroup();
+            if (format === 'ndjson') {
+                return out + line({ type: 'summary', count: totalCount, groups: groupCount });
+            }
+            return out;
+        }
+    };
+}
+
+/**
+ * Page through payout_requests in settlement order and stream them to an HTTP response.
+ */
+async function streamSettlementExport(supabase, res, { format = 'csv', status = 'pending', pageSize = 1000 } = {}) {
+    const serializer = createSettlementSerializer(format);
+    const write = async chunkText => {
+        if (chunkText && !res.write(chunkText)) await once(res, 'drain');
+    };
+
+    res.status(200);
+    res.set('Content-Type', serializer.contentType);
+    res.set('Content-Disposition', `attachment; filename="payout-settlement-${status}.${format === 'ndjson' ? 'ndjson' : 'csv'}"`);
+    await write(serializer.header());
+
+    for (let from = 0; ; from += pageSize) {
+        const { data, error } = await supabase
+            .from('payout_requests')
+            .select(PAYOUT_REQUEST_COLUMNS)
+            .eq('status', status)
+            .order('currency', { ascending: true })
+            .order('payment_method', { ascending: true })
+            .order('requested_at', { ascending: true })
+            .order('id', { ascending: true })
+            .range(from, from + pageSize - 1);
+
+        if (error) throw error;
+
+        for (const request of data || []) {
+            await write(serializer.row(request));
+        }
+
+        if (!data || data.length < pageSize) break;
+    }
+
+    await write(serializer.end());
+    res.end();
+}
+
+module.exports = {
+    CURRENCY_DECIMALS,
+    LEDGER_CURRENCY,
+    PAYOUT_PROVIDERS,
+    PAYOUT_REQUEST_COLUMNS,
+    UUID_PATTERN,
+    normalizePayoutRequest,
+    createSettlementSerializer,
+    streamSettlementExport
+};
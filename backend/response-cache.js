@@ -0,0 +1,115 @@
+const crypto = require('crypto');
+
+/**
+ * Small in-memory cache for serialized JSON responses with ETag support.
+ * Concurrent misses for the same key share one in-flight load.
+ */
+class ResponseCache {
+    constructor({ ttlMs = 30000, maxEntries = 100 } = {}) {
+        this.ttlMs = ttlMs;
+        this.maxEntries = maxEntries;
+        this.entries = new Map();
+        this.inflight = new Map();
+        this.generation = 0;
+        this.stats = { hits: 0, misses: 0, invalidations: 0 };
+    }
+
+    /**
+     * Return the cached entry for key, or run loader() and cache its JSON result.
+     * loader() resolves to { value, meta, cacheable }; cacheable: false serves the
+     * result once without storing it (e.g. a degraded fallback).
+     * Resolves to { body, etag, createdAt, cacheable, hit }.
+     */
+    async getOrLoad(key, loader) {
+        const cached = this.entries.get(key);
+        if (cached && cached.expiresAt > Date.now()) {
+            this.stats.hits++;
+            return { ...cached, hit: true };
+        }
+        this.entries.delete(key);
+
+        // Joining a load that is already running costs no extra query, so it counts as a hit
+        if (this.inflight.has(key)) {
+            this.stats.hits++;
+            return { ...(await this.inflight.get(key)), hit: true };
+        }
+        this.stats.misses++;
+
+        const generation = this.generation;
+        const load = (async () => {
+            const { value, meta, cacheable = true } = await loader();
+            const body = JSON.stringify(value);
+            const entry = {
+                body,
+                etag: computeEtag(body),
+                meta,
+                cacheable,
+                createdAt: Date.now(),
+                expiresAt: Date.now() + this.ttlMs
+            };
+            // Don't store results that were loaded before an invalidation landed
+            if (cacheable && generation === this.generation) {
+                this.entries.set(key, entry);
+                this.evictOverflow();
+            }
+            return entry;
+        })();
+
+        this.inflight.set(key, load);
+        try {
+            return { ...(await load), hit: false };
+        } finally {
+            // An invalidation may already have replaced this load with a newer one
+            if (this.inflight.get(key) === load) this.inflight.delete(key);
+        }
+    }
+
+    invalidate(reason = 'manual') {
+        this.generation++;
+        this.stats.invalidations++;
+        if (this.entries.size > 0) {
+            console.log(`[Cache] Invalidated ${this.entries.size} entries (${reason})`);
+        }
+        this.entries.clear();
+        // Later callers start a fresh load instead of joining one that read pre-invalidation data
+        this.inflight.clear();
+    }
+
+    evictOverflow() {
+        // Map preserves insertion order, so the first keys are the oldest
+        while (this.entries.size > this.maxEntries) {
+            this.entries.delete(this.entries.keys().next().value);
+        }
+    }
+}
+
+function computeEtag(body) {
+    return `"${crypto.createHash('sha1').update(body).digest('base64url')}"`;
+}
+
+/**
+ * True when an If-None-Match header matches the given strong ETag.
+ */
+function etagMatches(ifNoneMatch, etag) {
+    if (!ifNoneMatch) return false;
+    return ifNoneMatch.split(',').some(tag => {
+        const candidate = tag.trim().replace(/^W\//, '');
+        return candidate === '*' || candidate === etag;
+    });
+}
+
+/**
+ * Send a cached entry, answering 304 when the client already has it.
+ */
+function sendCachedJson(req, res, entry, { maxAge = 0 } = {}) {
+    res.set('ETag', entry.etag);
+    res.set('Cache-Control', entry.cacheable ? `public, max-age=${maxAge}, must-revalidate` : 'no-store');
+    res.set('X-Cache', entry.hit ? 'HIT' : 'MISS');
+
+    if (etagMatches(req.headers['if-none-match'], entry.etag)) {
+        return res.status(304).end();
+    }
+    res.type('application/json').send(entry.body);
+}
+
+module.exports = { ResponseCache, computeEtag, etagMatches, sendCachedJson };
@@ -22,6 +22,7 @@ const https = require('https');
 const { pipeline } = require('stream');
 const { promisify } = require('util');
 const streamPipeline = promisify(pipeline);
+const { TraceStore, requestIdMiddleware } = require('./tracing');
 
 // Helper: Download file from URL
 async function downloadFile(url, dest) {
@@ -138,13 +139,31 @@ const PORT = process.env.PORT || process.env.BACKEND_PORT || 8081;
 app.use(cors({
     origin: '*',
     methods: ['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'],
-    allowedHeaders: ['Content-Type', 'Authorization', 'x-request-id']
+    allowedHeaders: ['Content-Type', 'Authorization', 'x-request-id', 'If-None-Match'],
+    exposedHeaders: ['ETag', 'X-Cache', 'X-Next-Cursor', 'x-request-id']
 }));
 app.options('*', cors()); // Enable pre-flight for all routes
+// Bulk payout submissions carry up to PAYOUT_BULK_MAX items, well past the 100kb default
+const PAYOUT_BULK_BODY_LIMIT = '4mb';
+app.use('/creator/dashboard/payout-requests/bulk', express.json({ limit: PAYOUT_BULK_BODY_LIMIT }));
 app.use(express.json());
+app.use(requestIdMiddleware);
+
+// Optional sampled traffic capture for offline replay (see testsprite_tests/traffic_replay.py)
+if (process.env.TRAFFIC_CAPTURE === '1') {
+    const { createTrafficCapture } = require('./traffic-capture');
+    const captureOptions = {
+        logPath: process.env.TRAFFIC_CAPTURE_PATH || path.join(__dirname, 'traffic_capture.ndjson'),
+        sampleRate: parseFloat(process.env.TRAFFIC_CAPTURE_SAMPLE || '0.1')
+    };
+    app.use(createTrafficCapture(captureOptions));
+    console.log(`[Capture] Recording ${captureOptions.sampleRate * 100}% of requests to ${captureOptions.logPath}`);
+}
 
 // In-memory job status storage
 const jobStatus = {};
+// Per-stage timing for /process jobs, keyed by process ID
+const processTraces = new TraceStore({ maxTraces: 500 });
 // In-memory Vimeo folder cache
 const vimeoFolderCache = {};
 
@@ -191,56 +210,123 @@ app.get('/version', (req, res) => {
 });
 
 // Public Sparring API (Bypass RLS for Landing Page)
-app.get('/api/sparring/public', async (req, res) => {
-    try {
-        console.log('[API] Fetching public sparring videos via Service Role');
+// Anonymous, high-traffic feed: the joined result is cached briefly and served with an ETag.
+const { ResponseCache, sendCachedJson } = require('./response-cache');
 
-        // 1. Fetch videos directly (no join)
-        const { data: videos, error: videoError } = await supabase
-            .from('sparring_videos')
-            .select('*')
-            .limit(20)
-            .order('created_at', { ascending: false });
+const SPARRING_FEED_TTL_MS = parseInt(process.env.SPARRING_FEED_TTL_MS || '30000', 10);
+const SPARRING_FEED_DEFAULT_LIMIT = 20;
+const SPARRING_FEED_MAX_LIMIT = 50;
+const sparringFeedCache = new ResponseCache({ ttlMs: SPARRING_FEED_TTL_MS, maxEntries: 200 });
 
-        if (videoError) throw videoError;
+// Cursor = base64url("<created_at>|<id>") of the last item on the previous page
+function encodeSparringCursor(video) {
+    return Buffer.from(`${video.created_at}|${video.id}`).toString('base64url');
+}
 
-        if (!videos || videos.length === 0) {
-            return res.json([]);
-        }
+// Both parts end up inside a PostgREST .or() filter, so only exact timestamp/UUID shapes are accepted
+const CURSOR_TIMESTAMP_PATTERN = /^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(\.\d{1,6})?(Z|[+-]\d{2}:\d{2})$/;
+const CURSOR_ID_PATTERN = /^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$/i;
+
+function decodeSparringCursor(cursor) {
+    const parts = Buffer.from(cursor, 'base64url').toString('utf8').split('|');
+    if (parts.length !== 2) return null;
+    const [createdAt, id] = parts;
+    if (!CURSOR_TIMESTAMP_PATTERN.test(createdAt) || isNaN(Date.parse(createdAt))) return null;
+    if (!CURSOR_ID_PATTERN.test(id)) return null;
+    return { createdAt, id };
+}
 
-        // 2. Extract creator IDs
-        const creatorIds = [...new Set(videos.map(v => v.creator_id))];
+async function loadPublicSparringPage(limit, cursor) {
+    // 1. Fetch videos directly (no join)
+    let query = supabase
+        .from('sparring_videos')
+        .select('*')
+        .order('created_at', { ascending: false })
+        .order('id', { ascending: false })
+        .limit(limit + 1); // One extra row tells us whether another page exists
+
+    if (cursor) {
+        query = query.or(`created_at.lt.${cursor.createdAt},and(created_at.eq.${cursor.createdAt},id.lt.${cursor.id})`);
+    }
 
-        // 3. Fetch creators manually
-        const { data: creators, error: creatorError } = await supabase
-            .from('creators')
-            .select('id, name, profile_image')
-            .in('id', creatorIds);
+    const { data, error: videoError } = await query;
+    if (videoError) throw videoError;
 
-        if (creatorError) {
-            console.warn('Failed to fetch creators for manual join', creatorError);
-            // Return videos without creator info if creator fetch fails
-            return res.json(videos.map(v => ({ ...v, creator: null })));
-        }
+    const videos = (data || []).slice(0, limit);
+    const nextCursor = data && data.length > limit ? encodeSparringCursor(videos[videos.length - 1]) : null;
+
+    if (videos.length === 0) {
+        return { value: [], meta: { nextCursor } };
+    }
+
+    // 2. Extract creator IDs
+    const creatorIds = [...new Set(videos.map(v => v.creator_id))];
 
-        // 4. Map creators to videos
-        const creatorMap = (creators || []).reduce((acc, c) => {
-            acc[c.id] = c;
-            return acc;
-        }, {});
+    // 3. Fetch creators manually
+    const { data: creators, error: creatorError } = await supabase
+        .from('creators')
+        .select('id, name, profile_image')
+        .in('id', creatorIds);
 
-        const joinedData = videos.map(video => ({
-            ...video,
-            creator: creatorMap[video.creator_id] || { name: 'Unknown', profile_image: '' }
-        }));
+    if (creatorError) {
+        console.warn('Failed to fetch creators for manual join', creatorError);
+        // Return videos without creator info if creator fetch fails, but don't cache the degraded page
+        return { value: videos.map(v => ({ ...v, creator: null })), meta: { nextCursor }, cacheable: false };
+    }
+
+    // 4. Map creators to videos
+    const creatorMap = (creators || []).reduce((acc, c) => {
+        acc[c.id] = c;
+        return acc;
+    }, {});
 
-        res.json(joinedData);
+    const joinedData = videos.map(video => ({
+        ...video,
+        creator: creatorMap[video.creator_id] || { name: 'Unknown', profile_image: '' }
+    }));
+
+    return { value: joinedData, meta: { nextCursor } };
+}
+
+app.get('/api/sparring/public', async (req, res) => {
+    try {
+        const limit = Math.min(
+            Math.max(parseInt(req.query.limit, 10) || SPARRING_FEED_DEFAULT_LIMIT, 1),
+            SPARRING_FEED_MAX_LIMIT
+        );
+        let cursor = null;
+        if (req.query.cursor) {
+            cursor = decodeSparringCursor(req.query.cursor);
+            if (!cursor) return res.status(400).json({ error: 'Invalid cursor' });
+        }
+
+        const entry = await sparringFeedCache.getOrLoad(
+            `${limit}:${req.query.cursor || ''}`,
+            () => {
+                console.log('[API] Fetching public sparring videos via Service Role');
+                return loadPublicSparringPage(limit, cursor);
+            }
+        );
+
+        if (entry.meta.nextCursor) res.set('X-Next-Cursor', entry.meta.nextCursor);
+        sendCachedJson(req, res, entry, { maxAge: Math.floor(SPARRING_FEED_TTL_MS / 1000) });
     } catch (error) {
         console.error('Failed to fetch public sparring videos:', error);
         res.status(500).json({ error: error.message });
     }
 });
 
+// Sparring rows are also inserted/published from the client, so listen for changes
+// in addition to invalidating on the backend write paths
+if (supabase) {
+    supabase
+        .channel('sparring-feed-cache')
+        .on('postgres_changes', { event: '*', schema: 'public', table: 'sparring_videos' }, payload => {
+            sparringFeedCache.invalidate(`sparring_videos ${payload.eventType}`);
+        })
+        .subscribe();
+}
+
 // Serve static files
 app.use('/uploads', express.static(path.join(__dirname, 'uploads')));
 
@@ -255,21 +341,41 @@ const PROCESSED_DIR = path.join(TEMP_DIR, 'processed');
     }
 });
 
-// Multer setup for uploads
-const storage = multer.diskStorage({
-    destination: (req, file, cb) => {
-        cb(null, UPLOADS_DIR);
-    },
-    filename: (req, file, cb) => {
-        const uniqueName = `${uuidv4()}${path.extname(file.originalname)}`;
-        cb(null, uniqueName);
-    }
+// Raw uploads are content-addressed: identical bytes resolve to the already stored file
+const { UploadStore, UploadError } = require('./upload-store');
+const uploadStore = new UploadStore({
+    uploadsDir: UPLOADS_DIR,
+    indexDir: path.join(TEMP_DIR, 'upload-index'),
+    sessionsDir: path.join(TEMP_DIR, 'upload-sessions'),
+    chunkSize: parseInt(process.env.UPLOAD_CHUNK_SIZE || String(8 * 1024 * 1024), 10)
 });
+
+// Multer setup for uploads (hashes while writing, see UploadStore.multerStorage)
 const upload = multer({
-    storage,
+    storage: uploadStore.multerStorage(),
     limits: { fileSize: 2 * 1024 * 1024 * 1024 } // 2GB Limit
 });
 
+function sendUploadError(res, err) {
+    if (err instanceof UploadError) {
+        return res.status(err.status).json({ error: err.message, ...err.details });
+    }
+    console.error('[Uploads] Error:', err);
+    res.status(500).json({ error: err.message });
+}
+
+function uploadResponse(stored) {
+    return {
+        success: true,
+        videoId: stored.videoId,
+        filename: stored.filename,
+        originalPath: path.join(UPLOADS_DIR, stored.filename),
+        sha256: stored.hash,
+        size: stored.size,
+        deduplicated: stored.deduplicated
+    };
+}
+
 // Routes
 
 // 1. Upload Raw Video
@@ -278,15 +384,66 @@ app.post('/upload', upload.single('video'), (req, res) => {
         return res.status(400).json({ error: 'No video file uploaded' });
     }
 
-    const videoPath = req.file.path;
-    const videoId = path.parse(req.file.filename).name; // UUID without extension
+    res.json(uploadResponse(req.file.stored));
+});
 
-    res.json({
-        success: true,
-        videoId,
-        originalPath: videoPath,
-        filename: req.file.filename
-    });
+// 1b. Resumable chunked upload
+// POST   /upload/sessions { filename, size, sha256? } -> sha256 is verified against the received bytes;
+//                                                     with a sha256 the session also carries a byte-range challenge
+// GET    /upload/sessions/:uploadId                   -> { received } to resume after a dropped connection
+// PUT    /upload/sessions/:uploadId?offset=N          -> raw bytes (application/octet-stream), streamed to disk
+// POST   /upload/sessions/:uploadId/proof { proof }   -> answer the challenge; stored content completes without the body
+// DELETE /upload/sessions/:uploadId                   -> abort
+// A deduplicated upload gets its own videoId backed by the stored bytes.
+app.post('/upload/sessions', (req, res) => {
+    try {
+        // A claimed hash never resolves to a stored upload on its own: that would hand out
+        // another user's videoId to anyone who knows the hash. Dedup happens in finalize.
+        const { filename, size, sha256 } = req.body;
+        const session = uploadStore.createSession({ filename, size: Number(size), sha256: sha256 ? sha256.toLowerCase() : null });
+        res.status(201).json(session);
+    } catch (err) {
+        sendUploadError(res, err);
+    }
+});
+
+app.get('/upload/sessions/:uploadId', (req, res) => {
+    try {
+        res.json(uploadStore.getSession(req.params.uploadId));
+    } catch (err) {
+        sendUploadError(res, err);
+    }
+});
+
+app.put('/upload/sessions/:uploadId', async (req, res) => {
+    try {
+        const offset = parseInt(req.query.offset || '0', 10);
+        const result = await uploadStore.appendChunk(req.params.uploadId, offset, req);
+        if (!result.complete) {
+            return res.json({ uploadId: result.uploadId, received: result.received, size: result.size, complete: false });
+        }
+        res.json({ ...uploadResponse(result.upload), complete: true });
+    } catch (err) {
+        sendUploadError(res, err);
+    }
+});
+
+app.post('/upload/sessions/:uploadId/proof', async (req, res) => {
+    try {
+        const result = await uploadStore.proveSession(req.params.uploadId, req.body.proof);
+        res.json({ ...uploadResponse(result.upload), complete: true });
+    } catch (err) {
+        sendUploadError(res, err);
+    }
+});
+
+app.delete('/upload/sessions/:uploadId', async (req, res) => {
+    try {
+        await uploadStore.abortSession(req.params.uploadId);
+        res.json({ success: true });
+    } catch (err) {
+        sendUploadError(res, err);
+    }
 });
 
 // 2. Generate Preview (Async)
@@ -334,6 +491,9 @@ app.post('/preview', async (req, res) => {
         .output(outputPath)
         .on('end', () => {
             console.log(`Preview generated: ${outputPath}`);
+            // Keep the preview's metadata once the GC removes the file
+            videoMetadataCache.remember(videoId, outputPath)
+                .catch(err => console.warn(`[Metadata] Could not record preview ${videoId}:`, err.message));
             jobStatus[jobId] = {
                 status: 'completed',
                 completedAt: new Date(),
@@ -371,7 +531,106 @@ app.get('/status/:jobId', (req, res) => {
         return res.status(404).json({ error: 'Job not found' });
     }
 
-    res.json(job);
+    const trace = job.type === 'process' ? processTraces.get(jobId) : null;
+    res.json(trace ? { ...job, trace } : job);
+});
+
+// Trace for a single /process job (its processId; the caller's x-request-id is on the trace)
+app.get('/traces/:processId', (req, res) => {
+    const trace = processTraces.get(req.params.processId);
+    if (!trace) {
+        return res.status(404).json({ error: 'Trace not found' });
+    }
+    res.json(trace);
+});
+
+// Rolling per-stage duration stats across recent /process jobs
+app.get('/metrics/process', (req, res) => {
+    res.json({
+        stages: processTraces.stageSummary(),
+        activeJobs: Object.values(jobStatus).filter(j => j.type === 'process' && j.status === 'processing').length
+    });
+});
+
+// --- Video Metadata (ffprobe, cached by content hash) ---
+
+const { VideoMetadataCache } = require('./video-metadata');
+const videoMetadataCache = new VideoMetadataCache({
+    cacheDir: path.join(TEMP_DIR, 'probe-cache'),
+    concurrency: parseInt(process.env.PROBE_CONCURRENCY || '4', 10)
+});
+const METADATA_BATCH_MAX = 200;
+
+// Map a videoId / processId to the best local file: processed output, then preview, then raw upload.
+// Batch callers pass the uploads listing so the directory is read once per request.
+// Once the temp-file GC has removed all of them, metadata comes from videoMetadataCache.recall(),
+// which /process and /preview fill in as their outputs are written.
+function resolveLocalVideoPath(videoId, uploads = null) {
+    if (!/^[\w-]+$/.test(videoId)) return null;
+
+    const candidates = [
+        path.join(TEMP_DIR, 'processing', videoId, 'final.mp4'),
+        path.join(PROCESSED_DIR, `${videoId}_preview.mp4`)
+    ];
+    for (const candidate of candidates) {
+        if (fs.existsSync(candidate)) return candidate;
+    }
+
+    const upload = (uploads || fs.readdirSync(UPLOADS_DIR)).find(f => path.parse(f).name === videoId);
+    return upload ? path.join(UPLOADS_DIR, upload) : null;
+}
+
+app.get('/videos/:videoId/metadata', async (req, res) => {
+    const filePath = resolveLocalVideoPath(req.params.videoId);
+
+    try {
+        if (!filePath) {
+            const recalled = await videoMetadataCache.recall(req.params.videoId);
+            if (!recalled) return res.status(404).json({ error: 'Video file not found' });
+            return res.json(recalled);
+        }
+        res.json(await videoMetadataCache.get(filePath));
+    } catch (err) {
+        console.error('[Metadata] Probe failed:', err);
+        res.status(500).json({ error: err.message });
+    }
+});
+
+// Batch metadata: { videoIds: [...] } -> per-item results in request order
+app.post('/videos/metadata/batch', async (req, res) => {
+    const { videoIds } = req.body;
+    if (!Array.isArray(videoIds) || videoIds.length === 0) {
+        return res.status(400).json({ error: 'videoIds must be a non-empty array' });
+    }
+    if (videoIds.length > METADATA_BATCH_MAX) {
+        return res.status(400).json({ error: `At most ${METADATA_BATCH_MAX} videoIds per call` });
+    }
+
+    try {
+        const uploads = fs.readdirSync(UPLOADS_DIR);
+        const resolved = videoIds.map(videoId => ({ videoId, filePath: resolveLocalVideoPath(String(videoId), uploads) }));
+        const found = resolved.filter(r => r.filePath);
+        const probed = await videoMetadataCache.getMany(found.map(r => r.filePath));
+        const byPath = new Map(probed.map(p => [p.path, p]));
+        const recalled = new Map(await Promise.all(
+            resolved.filter(r => !r.filePath).map(async r => [r.videoId, await videoMetadataCache.recall(String(r.videoId))])
+        ));
+
+        res.json({
+            results: resolved.map(({ videoId, filePath }) => {
+                if (!filePath) {
+                    const metadata = recalled.get(videoId);
+                    return metadata ? { videoId, ...metadata } : { videoId, error: 'Video file not found' };
+                }
+                const { path: _path, ...metadata } = byPath.get(filePath);
+                return { videoId, ...metadata };
+            }),
+            stats: videoMetadataCache.stats
+        });
+    } catch (err) {
+        console.error('[Metadata] Batch probe failed:', err);
+        res.status(500).json({ error: err.message });
+    }
 });
 
 // --- Secure Vimeo Proxy Endpoints ---
@@ -455,6 +714,20 @@ app.get('/api/vimeo/video/:videoId', async (req, res) => {
     }
 });
 
+// Vimeo's HTTP status for a video (200 when it exists), or null when Vimeo could not be asked
+async function vimeoVideoStatus(vimeoId) {
+    const vimeoToken = process.env.VIMEO_ACCESS_TOKEN || process.env.VITE_VIMEO_ACCESS_TOKEN;
+    if (!vimeoToken) return null;
+    try {
+        const response = await fetch(`https://api.vimeo.com/videos/${vimeoId}?fields=uri`, {
+            headers: { 'Authorization': `Bearer ${vimeoToken}` }
+        });
+        return response.status;
+    } catch (error) {
+        return null;
+    }
+}
+
 // 3. Delete Video
 app.delete('/api/vimeo/video/:videoId', async (req, res) => {
     const { videoId } = req.params;
@@ -471,6 +744,7 @@ app.delete('/api/vimeo/video/:videoId', async (req, res) => {
             throw new Error(data.error || 'Vimeo API error');
         }
 
+        uploadStore.forgetProcessed(r => String(r.vimeoId) === videoId);
         res.status(204).send();
     } catch (error) {
         res.status(500).json({ error: error.message });
@@ -498,9 +772,156 @@ async function logToDB(processId, level, message, details = {}) {
     }
 }
 
+// --- HLS ladder output (outputMode: 'hls') ---
+
+const {
+    selectRenditions,
+    buildLadderArgs,
+    runFfmpeg,
+    createSupabaseHlsStorage,
+    createLocalHlsStorage,
+    HlsIngest
+} = require('./hls-ladder');
+
+const HLS_SEGMENT_SECONDS = parseFloat(process.env.HLS_SEGMENT_SECONDS || '4');
+const HLS_UPLOAD_CONCURRENCY = parseInt(process.env.HLS_UPLOAD_CONCURRENCY || '4', 10);
+const HLS_LOCAL_DIR = path.join(PROCESSED_DIR, 'hls');
+const hlsStorage = (process.env.HLS_STORAGE || (supabase ? 'supabase' : 'local')) === 'supabase'
+    ? createSupabaseHlsStorage(supabase, process.env.HLS_BUCKET || 'hls_videos')
+    : createLocalHlsStorage(HLS_LOCAL_DIR, '/temp/processed/hls');
+// processId -> HlsIngest for ladders currently being written by ffmpeg
+const hlsIngests = new Map();
+
+async function runHlsLadder({ processId, tableName, contentId, ladderInput, localInputPath, processDir, trace }) {
+    // Only the source's streams are needed: uploads reuse the upload store's hash instead of re-reading the file
+    const source = await videoMetadataCache.getWithoutHashing(localInputPath, uploadStore.hashForFile(localInputPath));
+    const renditions = selectRenditions(source.height);
+    const ingest = new HlsIngest({
+        prefix: `${contentId}/${processId}`,
+        storage: hlsStorage,
+        previewVariant: renditions[0].name,
+        keepDir: path.join(processDir, 'hls-preview'),
+        uploadConcurrency: HLS_UPLOAD_CONCURRENCY
+    });
+
+    hlsIngests.set(processId, ingest);
+    try {
+        const args = buildLadderArgs({
+            ...ladderInput,
+            renditions,
+            hasAudio: !!source.audioCodec,
+            segmentSeconds: HLS_SEGMENT_SECONDS,
+            outputBase: `http://127.0.0.1:${PORT}/internal/hls/${processId}/${ingest.token}`
+        });
+        await trace.span('hls_ladder', () => runFfmpeg(ffmpegPath, args), { renditions: renditions.map(r => r.name).join(',') });
+    } finally {
+        hlsIngests.delete(processId);
+    }
+    await trace.span('hls_upload', () => ingest.flush(), { concurrency: HLS_UPLOAD_CONCURRENCY });
+
+    // The lowest rendition is also this job's preview. It is already cut, so it must not take
+    // ${videoId}_preview.mp4, which /preview serves as the raw upload's preview
+    const previewName = `${processId}_hls_preview.mp4`;
+    let previewUrl = null;
+    try {
+        await trace.span('hls_preview', () => ingest.assemblePreview(path.join(PROCESSED_DIR, previewName)), { rendition: renditions[0].name });
+        previewUrl = `/temp/processed/${previewName}`;
+    } catch (err) {
+        // The ladder itself is complete; /preview can still transcode one on demand
+        logToDB(processId, 'warn', 'HLS preview assembly failed', { error: err.message });
+    }
+
+    const masterUrl = ingest.masterUrl();
+    await trace.span('db_update', async () => {
+        const { error } = await supabase.from(tableName).update({ hls_url: masterUrl }).eq('id', contentId);
+        if (error) throw error;
+    }, { table: tableName });
+
+    return {
+        masterUrl,
+        renditions: renditions.map(r => r.name),
+        segmentSeconds: HLS_SEGMENT_SECONDS,
+        pieces: ingest.stats.pieces,
+        bytes: ingest.stats.bytes,
+        previewUrl
+    };
+}
+
+// ffmpeg PUTs each playlist and segment here; only loopback callers holding the job token are accepted
+app.put('/internal/hls/:processId/:token/*', async (req, res) => {
+    const ingest = hlsIngests.get(req.params.processId);
+    const loopback = ['127.0.0.1', '::1', '::ffff:127.0.0.1'].includes(req.socket.remoteAddress);
+    if (!ingest || !loopback || req.params.token !== ingest.token) {
+        return res.status(404).json({ error: 'Unknown HLS ingest' });
+    }
+
+    try {
+        const chunks = [];
+        for await (const chunk of req) chunks.push(chunk);
+        await ingest.receive(req.params[0], Buffer.concat(chunks));
+        res.status(201).end();
+    } catch (err) {
+        console.error(`[HLS] Ingest failed for ${req.params.processId}/${req.params[0]}:`, err);
+        res.status(500).json({ error: err.message });
+    }
+});
+
+// --- Thumbnail stage (video_thumbnails.py: one decode -> poster, WebP sizes, scrub sprite) ---
+
+const THUMBNAILS_DIR = path.join(PROCESSED_DIR, 'thumbnails');
+const THUMBNAIL_SCRIPT = path.join(__dirname, '..', 'video_thumbnails.py');
+const THUMBNAIL_BUCKET = process.env.THUMBNAIL_BUCKET || 'thumbnails';
+const PYTHON_BIN = process.env.PYTHON_BIN || 'python3';
+
+// The stage needs python3 with Pillow (requirements.txt); without them /process keeps Vimeo's thumbnail
+const THUMBNAIL_STAGE_ENABLED = process.env.THUMBNAIL_STAGE === '1' && (() => {
+    try {
+        require('child_process').execFileSync(PYTHON_BIN, ['-c', 'import PIL'], { stdio: 'ignore', timeout: 10000 });
+        return true;
+    } catch (e) {
+        console.error(`[Thumbnails] THUMBNAIL_STAGE=1 but "${PYTHON_BIN}" with Pillow is not available (pip install -r requirements.txt); stage disabled`);
+        return false;
+    }
+})();
+
+function generateThumbnails(videoPath) {
+    return new Promise((resolve, reject) => {
+        const { execFile } = require('child_process');
+        execFile(PYTHON_BIN, [THUMBNAIL_SCRIPT, videoPath, '--out', THUMBNAILS_DIR, '--workers', '1', '--json'], {
+            env: { ...process.env, FFMPEG_PATH: ffmpegPath, FFPROBE_PATH: process.env.FFPROBE_PATH || require('ffprobe-static').path },
+            maxBuffer: 4 * 1024 * 1024
+        }, (err, stdout, stderr) => {
+            const line = stdout.trim().split('\n').pop();
+            let manifest = null;
+            try { manifest = line ? JSON.parse(line) : null; } catch (e) { /* fall through */ }
+            if (manifest && !manifest.error) return resolve(manifest);
+            reject(new Error(manifest?.error || stderr.trim() || err?.message || 'Thumbnail stage produced no output'));
+        });
+    });
+}
+
+// Stored under generated/ so the placeholder check still lets a later re-edit replace it
+async function uploadPoster(manifest) {
+    const key = `generated/${manifest.sha256}/poster.jpg`;
+    const body = fs.readFileSync(path.join(THUMBNAILS_DIR, manifest.sha256, manifest.poster));
+    const { error } = await supabase.storage.from(THUMBNAIL_BUCKET).upload(key, body, { contentType: 'image/jpeg', upsert: true });
+    if (error) throw error;
+    return supabase.storage.from(THUMBNAIL_BUCKET).getPublicUrl(key).data.publicUrl;
+}
+
+function thumbnailUrls(manifest) {
+    const base = `/temp/processed/thumbnails/${manifest.sha256}`;
+    return {
+        poster: `${base}/${manifest.poster}`,
+        thumbnails: Object.fromEntries(Object.entries(manifest.thumbnails).map(([w, f]) => [w, `${base}/${f}`])),
+        // No sprite when the source's duration was unknown
+        sprite: manifest.sprite ? { ...manifest.sprite, file: `${base}/${manifest.sprite.file}` } : null
+    };
+}
+
 // 3. Process & Upload (Cut, Concat, Vimeo)
 app.post('/process', async (req, res) => {
-    const { videoId, filename, cuts, title, description, drillId, lessonId, videoType, sparringId, courseId, instructorName } = req.body;
+    const { videoId, filename, cuts, title, description, drillId, lessonId, videoType, sparringId, courseId, instructorName, outputMode = 'vimeo' } = req.body;
 
     // Validate: exactly one of drillId, lessonId, sparringId, or courseId must be present
     const idCount = [drillId, lessonId, sparringId, courseId].filter(id => !!id).length;
@@ -515,27 +936,55 @@ app.post('/process', async (req, res) => {
         return res.status(400).json({ error: 'Invalid input data' });
     }
 
+    if (!['vimeo', 'hls'].includes(outputMode)) {
+        return res.status(400).json({ error: 'outputMode must be vimeo or hls' });
+    }
+    const hlsMode = outputMode === 'hls';
+
     const isLesson = !!lessonId;
     const isSparring = !!sparringId;
     const isCourse = !!courseId;
     const contentId = isLesson ? lessonId : (isSparring ? sparringId : (isCourse ? courseId : drillId));
     const tableName = isLesson ? 'lessons' : (isSparring ? 'sparring_videos' : (isCourse ? 'courses' : 'drills'));
     const processId = uuidv4();
+    const { requestId } = req;
+
+    jobStatus[processId] = {
+        status: 'processing',
+        submittedAt: new Date(),
+        type: 'process',
+        videoId,
+        outputMode,
+        requestId
+    };
+
+    // Span durations are persisted as one system_logs row per job when the trace finishes
+    const trace = processTraces.start(processId, {
+        requestId,
+        attributes: { processId, videoId, tableName, contentId, cutsCount: cuts.length },
+        onFinish: finished => {
+            const { status, totalMs, stages, spans } = finished.toJSON();
+            logToDB(processId, status === 'completed' ? 'info' : 'error', 'Trace', { requestId, status, totalMs, stages, spans });
+        }
+    });
 
     // Immediate response
     res.status(202).json({
         success: true,
         message: 'Video processing started in background',
-        processId
+        processId,
+        requestId
     });
 
-    console.log(`Starting background processing for ${videoId} (Process ID: ${processId}, ${tableName}: ${contentId})`);
-    logToDB(processId, 'info', 'Job Received', { videoId, filename, cutsCount: cuts.length, contentId, tableName });
+    console.log(`Starting background processing for ${videoId} (Process ID: ${processId}, Request ID: ${requestId}, ${tableName}: ${contentId})`);
+    logToDB(processId, 'info', 'Job Received', { videoId, filename, cutsCount: cuts.length, contentId, tableName, requestId });
 
     // Run in background
     (async () => {
         if (!supabase) {
             console.error('CRITICAL: Supabase client is not initialized');
+            trace.finish('error');
+            jobStatus[processId] = { ...jobStatus[processId], status: 'error', error: 'Supabase client is not initialized' };
             return;
         }
 
@@ -544,6 +993,159 @@ app.post('/process', async (req, res) => {
             fs.mkdirSync(processDir, { recursive: true });
         }
 
+        // Point the content row at the Vimeo video (thumbnail only replaces placeholders)
+        const updateContentRow = async (vimeoId, finalThumbnail) => {
+            const dbSpan = trace.startSpan('db_update', { table: tableName });
+            if (isLesson) {
+                // Check if existing thumbnail is custom
+                const { data: currentLesson } = await supabase.from('lessons').select('thumbnail_url').eq('id', lessonId).single();
+
+                const updateData = { vimeo_url: vimeoId };
+
+                if (videoType === 'preview') {
+                    updateData.is_preview = true;
+                }
+
+                // Only update thumbnail if it's empty, placeholder, or generic vumbnail
+                const isPlaceholder = !currentLesson?.thumbnail_url ||
+                    currentLesson.thumbnail_url.includes('placehold.co') ||
+                    currentLesson.thumbnail_url.includes('generated') ||
+                    currentLesson.thumbnail_url.includes('vumbnail.com');
+
+                // For previews, we still update thumbnail if needed
+                if (isPlaceholder) {
+                    updateData.thumbnail_url = finalThumbnail;
+                }
+
+                // Update lessons table
+                console.log(`[DEBUG] Updating lessons table for ID: ${lessonId} with`, updateData);
+                const { data: updatedData, error: updateError } = await supabase.from('lessons')
+                    .update(updateData)
+                    .eq('id', lessonId)
+                    .select();
+
+                if (updatedData && updatedData.length === 0) {
+                    console.error(`[DEBUG] CRITICAL: Lesson update returned 0 rows! ID ${lessonId} might be missing or RLS blocked.`);
+                }
+
+                if (updateError) {
+                    console.error('Supabase Update Error:', updateError);
+                    logToDB(processId, 'error', 'DB Update Failed', { error: updateError.message });
+                } else {
+                    console.log(`Supabase updated for lesson ${lessonId}`);
+                    logToDB(processId, 'info', 'Job Fully Complete', {
+                        lessonId,
+                        vimeoId,
+                        videoType
+                    });
+                }
+            } else if (isSparring) {
+                // Check if existing thumbnail is custom
+                const { data: currentSparring } = await supabase.from('sparring_videos').select('thumbnail_url').eq('id', sparringId).single();
+
+                const isPreview = videoType === 'preview';
+                const updateData = isPreview
+                    ? { preview_vimeo_id: vimeoId }
+                    : { video_url: vimeoId, is_published: true };
+
+                // Only update thumbnail if it's NOT a preview and it's currently a placeholder
+                const isPlaceholder = !currentSparring?.thumbnail_url ||
+                    currentSparring.thumbnail_url.includes('placehold.co') ||
+                    currentSparring.thumbnail_url.includes('generated') ||
+                    currentSparring.thumbnail_url.includes('vumbnail.com');
+
+                if (!isPreview && isPlaceholder) {
+                    updateData.thumbnail_url = finalThumbnail;
+                }
+
+                // Update sparring_videos table
+                console.log(`[DEBUG] Updating sparring table for ID: ${sparringId} with`, updateData);
+                const { data: updatedData, error: updateError } = await supabase.from('sparring_videos')
+                    .update(updateData)
+                    .eq('id', sparringId)
+                    .select();
+
+                if (updatedData && updatedData.length === 0) {
+                    console.error(`[DEBUG] CRITICAL: Sparring update returned 0 rows! ID ${sparringId} might be missing or RLS blocked.`);
+                }
+
+                if (updateError) {
+                    console.error('Supabase Update Error:', updateError);
+                    logToDB(processId, 'error', 'DB Update Failed', { error: updateError.message });
+                } else {
+                    console.log(`Supabase updated for sparring ${sparringId}`);
+                    sparringFeedCache.invalidate('sparring published');
+                    logToDB(processId, 'info', 'Job Fully Complete', {
+                        sparringId,
+                        vimeoId,
+                        videoType
+                    });
+                }
+            } else if (isCourse) {
+                const updateData = { preview_vimeo_id: vimeoId };
+
+                // Update courses table
+                console.log(`[DEBUG] Updating courses table for ID: ${courseId} with`, updateData);
+                const { data: updatedData, error: updateError } = await supabase.from('courses')
+                    .update(updateData)
+                    .eq('id', courseId)
+                    .select();
+
+                if (updateError) {
+                    console.error('Supabase Update Error:', updateError);
+                    logToDB(processId, 'error', 'DB Update Failed', { error: updateError.message });
+                } else {
+                    console.log(`Supabase updated for course ${courseId}`);
+                    logToDB(processId, 'info', 'Job Fully Complete', {
+                        courseId,
+                        vimeoId,
+                        videoType
+                    });
+                }
+            } else {
+                // Check if existing thumbnail is custom
+                const { data: currentDrill } = await supabase.from('drills').select('thumbnail_url').eq('id', drillId).single();
+
+                // Only update thumbnail for 'action' type video, and only if it's a placeholder
+                const isAction = videoType === 'action';
+                const isPlaceholder = !currentDrill?.thumbnail_url ||
+                    currentDrill.thumbnail_url.includes('placehold.co') ||
+                    currentDrill.thumbnail_url.includes('generated') ||
+                    currentDrill.thumbnail_url.includes('vumbnail.com');
+
+                const columnToUpdate = isAction ? 'vimeo_url' : 'description_video_url';
+                const updateData = { [columnToUpdate]: vimeoId };
+
+                if (isAction && isPlaceholder) {
+                    updateData.thumbnail_url = finalThumbnail;
+                }
+
+                // Update drills table
+                console.log(`[DEBUG] Updating drills table for ID: ${drillId} with`, updateData);
+                const { data: updatedData, error: updateError } = await supabase.from('drills')
+                    .update(updateData)
+                    .eq('id', drillId)
+                    .select();
+
+                if (updatedData && updatedData.length === 0) {
+                    console.error(`[DEBUG] CRITICAL: Drill update returned 0 rows! ID ${drillId} might be missing or RLS blocked.`);
+                }
+
+                if (updateError) {
+                    console.error('Supabase Update Error:', updateError);
+                    logToDB(processId, 'error', 'DB Update Failed', { error: updateError.message });
+                } else {
+                    console.log(`Supabase updated for drill ${drillId}`);
+                    logToDB(processId, 'info', 'Job Fully Complete', {
+                        drillId,
+                        vimeoId,
+                        videoType
+                    });
+                }
+            }
+            dbSpan.end();
+        };
+
         try {
             console.log('[DEBUG] Step 1: Downloading File');
             logToDB(processId, 'info', 'Step 1: Downloading File');
@@ -570,6 +1172,8 @@ app.post('/process', async (req, res) => {
             console.log('[DEBUG] localInputPath:', localInputPath);
             console.log('[DEBUG] fs.existsSync(localInputPath):', fs.existsSync(localInputPath));
 
+            const downloadSpan = trace.startSpan('download', { bucket: bucketName, fileKey });
+
             if (isRemote || !fs.existsSync(localInputPath)) {
                 console.log('[DEBUG] Entering download block');
                 console.log('[DEBUG] bucketName:', bucketName, 'fileKey:', fileKey);
@@ -611,19 +1215,53 @@ app.post('/process', async (req, res) => {
                 }
 
                 if (!downloadSuccess) {
+                    downloadSpan.fail(lastDownloadError, { source: 'supabase', attempts: maxDownloadRetries });
                     const errorDetails = lastDownloadError ? JSON.stringify(lastDownloadError, Object.getOwnPropertyNames(lastDownloadError)) : 'Unknown Error';
                     throw new Error(`Failed to download from Supabase after ${maxDownloadRetries} attempts. Details: ${errorDetails}`);
                 }
 
+                downloadSpan.end({ source: 'supabase', bytes: fs.statSync(localInputPath).size });
                 console.log('[DEBUG] Download Complete');
                 logToDB(processId, 'info', 'Download Complete');
             } else {
+                downloadSpan.end({ source: 'local' });
                 console.log('[DEBUG] Using Local File');
                 logToDB(processId, 'info', 'Using Local File');
             }
 
+            // This content row was already processed from the same raw bytes, cuts and title:
+            // reuse its Vimeo video, as long as Vimeo still has it
+            const inputHash = uploadStore.hashForFile(localInputPath);
+            const processedTarget = { tableName, contentId, videoType, title };
+            let reused = !hlsMode && inputHash ? uploadStore.processedOutput(inputHash, processedTarget, cuts) : null;
+            if (reused && reused.vimeoId) {
+                const status = await vimeoVideoStatus(reused.vimeoId);
+                if (status === 404) {
+                    uploadStore.forgetProcessed(r => String(r.vimeoId) === String(reused.vimeoId));
+                }
+                if (status !== 200) {
+                    logToDB(processId, 'info', 'Recorded output not reusable; processing again', { vimeoId: reused.vimeoId, status });
+                    reused = null;
+                }
+            }
+            if (reused && reused.vimeoId) {
+                logToDB(processId, 'info', 'Reusing processed output', { inputHash, ...reused });
+                await updateContentRow(reused.vimeoId, reused.thumbnail || `https://vumbnail.com/${reused.vimeoId}.jpg`);
+
+                trace.finish('completed');
+                jobStatus[processId] = {
+                    ...jobStatus[processId],
+                    status: 'completed',
+                    completedAt: new Date(),
+                    deduplicated: true,
+                    vimeoId: reused.vimeoId
+                };
+                return;
+            }
+
             // Start Processing
             const finalPath = path.join(processDir, 'final.mp4');
+            let ladderInput = null;
 
             if (cuts && cuts.length > 0) {
                 // Step 1: Create segments
@@ -646,7 +1284,7 @@ app.post('/process', async (req, res) => {
                     const segmentFileName = `part_${i}.mp4`;
                     const segmentPath = path.join(processDir, segmentFileName);
 
-                    await new Promise((resolve, reject) => {
+                    await trace.span('cut', () => new Promise((resolve, reject) => {
                         ffmpeg(inputPath)
                             .setStartTime(cut.start)
                             .setDuration(cut.end - cut.start)
@@ -658,7 +1296,7 @@ app.post('/process', async (req, res) => {
                                 reject(err);
                             })
                             .run();
-                    });
+                    }), { index: i, start: cut.start, end: cut.end });
                     segmentPaths.push(segmentFileName); // Store filename only for relative path
                 }
                 logToDB(processId, 'info', 'Cuts Created');
@@ -680,27 +1318,75 @@ app.post('/process', async (req, res) => {
                     } catch (e) { console.error(`[DEBUG] Segment ${seg} missing/error`, e); }
                 });
 
-                // Step 3: Concat segments (Using Direct Exec for stability)
-                logToDB(processId, 'info', 'Step 3: Concatenating');
+                if (hlsMode) {
+                    // The ladder reads the parts through the concat demuxer, so no joined file is written
+                    ladderInput = { input: concatListPath, concat: true };
+                } else {
+                    // Step 3: Concat segments (Using Direct Exec for stability)
+                    logToDB(processId, 'info', 'Step 3: Concatenating');
 
-                // Construct command manually to ensure -f concat comes BEFORE -i
-                const ffmpegCmd = `"${ffmpegPath}" -f concat -safe 0 -i "${concatListPath}" -c copy "${finalPath}"`;
-                console.log('[DEBUG] Manual FFmpeg Command:', ffmpegCmd);
-                logToDB(processId, 'info', 'Exec Command', { ffmpegCmd });
+                    // Construct command manually to ensure -f concat comes BEFORE -i
+                    const ffmpegCmd = `"${ffmpegPath}" -f concat -safe 0 -i "${concatListPath}" -c copy "${finalPath}"`;
+                    console.log('[DEBUG] Manual FFmpeg Command:', ffmpegCmd);
+                    logToDB(processId, 'info', 'Exec Command', { ffmpegCmd });
 
-                const execPromise = require('util').promisify(require('child_process').exec);
-                try {
-                    await execPromise(ffmpegCmd);
-                    logToDB(processId, 'info', 'Concatenation Complete', { finalPath });
-                } catch (err) {
-                    console.error('[DEBUG] Manual Exec Error:', err);
-                    throw new Error(`FFmpeg Concat Failed: ${err.message}`);
+                    const execPromise = require('util').promisify(require('child_process').exec);
+                    try {
+                        await trace.span('concat', () => execPromise(ffmpegCmd), { segments: segmentPaths.length });
+                        logToDB(processId, 'info', 'Concatenation Complete', { finalPath });
+                    } catch (err) {
+                        console.error('[DEBUG] Manual Exec Error:', err);
+                        throw new Error(`FFmpeg Concat Failed: ${err.message}`);
+                    }
                 }
             } else {
                 // No cuts - just copy the original file
                 logToDB(processId, 'info', 'No cuts provided, using original file');
-                console.log('[DEBUG] No cuts provided, copying input to final path');
-                fs.copyFileSync(localInputPath, finalPath);
+                if (hlsMode) {
+                    ladderInput = { input: localInputPath };
+                } else {
+                    console.log('[DEBUG] No cuts provided, copying input to final path');
+                    fs.copyFileSync(localInputPath, finalPath);
+                }
+            }
+
+            if (hlsMode) {
+                logToDB(processId, 'info', 'Step 4: Building HLS ladder');
+                const hls = await runHlsLadder({ processId, tableName, contentId, ladderInput, localInputPath, processDir, trace });
+                logToDB(processId, 'info', 'HLS Ladder Complete', hls);
+
+                trace.finish('completed');
+                jobStatus[processId] = {
+                    ...jobStatus[processId],
+                    status: 'completed',
+                    completedAt: new Date(),
+                    hls,
+                    previewUrl: hls.previewUrl
+                };
+                return;
+            }
+
+            // Record final.mp4's metadata under the processId alongside the upload; the GC removes the file later
+            videoMetadataCache.remember(processId, finalPath)
+                .catch(err => logToDB(processId, 'warn', 'Metadata probe failed', { error: err.message }));
+
+            // Local poster/thumbnails/sprite run alongside the Vimeo upload instead of waiting on its encoding.
+            // Resolves to the poster's storage URL, or null when the stage is off or failed
+            let posterPromise = Promise.resolve(null);
+            if (THUMBNAIL_STAGE_ENABLED) {
+                const thumbnailSpan = trace.startSpan('thumbnails');
+                posterPromise = generateThumbnails(finalPath)
+                    .then(async manifest => {
+                        const posterUrl = await uploadPoster(manifest);
+                        thumbnailSpan.end({ sha256: manifest.sha256, cached: manifest.cached });
+                        jobStatus[processId] = { ...jobStatus[processId], thumbnails: { ...thumbnailUrls(manifest), posterUrl } };
+                        return posterUrl;
+                    })
+                    .catch(err => {
+                        thumbnailSpan.fail(err);
+                        logToDB(processId, 'warn', 'Thumbnail stage failed', { error: err.message });
+                        return null;
+                    });
             }
 
             // Step 4: Upload to Vimeo with Timeout and Retry
@@ -834,7 +1520,7 @@ app.post('/process', async (req, res) => {
                         console.warn(`[Vimeo] No folder URI returned for instructor: ${instructorName}`);
                     }
 
-                    const uri = await uploadToVimeoWithTimeout(
+                    const uri = await trace.span('vimeo_upload', () => uploadToVimeoWithTimeout(
                         finalPath,
                         {
                             'name': title || 'Edited Video',
@@ -843,7 +1529,7 @@ app.post('/process', async (req, res) => {
                             ...(folderUri ? { 'folder_uri': folderUri } : {})
                         },
                         600000 // 10 minute timeout
-                    );
+                    ), { attempt, bytes: fs.statSync(finalPath).size });
 
                     // Success!
                     uploadSuccess = true;
@@ -855,166 +1541,31 @@ app.post('/process', async (req, res) => {
                     // We DO NOT update DB here anymore to prevent "premature completion" UI on frontend.
                     // The "Processing" state will remain until we confirm everything is ready.
 
-                    // Then wait for encoding (mainly for thumbnail)
-                    console.log(`[Vimeo] Waiting for encoding completion for video ${vimeoId}...`);
-                    const { waitForVimeoEncoding } = require('./vimeo-status-checker');
-                    const encodingResult = await waitForVimeoEncoding(vimeoId, 15); // Wait up to 15 min
-
-                    if (!encodingResult.success) {
-                        console.warn(`[Vimeo] Encoding timeout or error for ${vimeoId}, continuing with available data`);
-                    }
-
-                    // Use the thumbnail from Vimeo if available, else fallback to vumbnail
-                    const finalThumbnail = encodingResult.thumbnail || `https://vumbnail.com/${vimeoId}.jpg`;
-
-                    // Update the correct table based on content type
-                    if (isLesson) {
-                        // Check if existing thumbnail is custom
-                        const { data: currentLesson } = await supabase.from('lessons').select('thumbnail_url').eq('id', lessonId).single();
-
-                        const updateData = { vimeo_url: vimeoId };
-
-                        if (videoType === 'preview') {
-                            updateData.is_preview = true;
+                    // A locally generated poster stands in for Vimeo's thumbnail, so there is no encoding to wait for
+                    let finalThumbnail = await posterPromise;
+                    if (!finalThumbnail) {
+                        // Then wait for encoding (mainly for thumbnail)
+                        console.log(`[Vimeo] Waiting for encoding completion for video ${vimeoId}...`);
+                        const { waitForVimeoEncoding } = require('./vimeo-status-checker');
+                        const encodingSpan = trace.startSpan('vimeo_encoding', { vimeoId });
+                        const encodingResult = await waitForVimeoEncoding(vimeoId, 15); // Wait up to 15 min
+                        encodingSpan.end({ success: encodingResult.success, status: encodingResult.status });
+
+                        if (!encodingResult.success) {
+                            console.warn(`[Vimeo] Encoding timeout or error for ${vimeoId}, continuing with available data`);
                         }
 
-                        // Only update thumbnail if it's empty, placeholder, or generic vumbnail
-                        const isPlaceholder = !currentLesson?.thumbnail_url ||
-                            currentLesson.thumbnail_url.includes('placehold.co') ||
-                            currentLesson.thumbnail_url.includes('generated') ||
-                            currentLesson.thumbnail_url.includes('vumbnail.com');
-
-                        // For previews, we still update thumbnail if needed
-                        if (isPlaceholder) {
-                            updateData.thumbnail_url = finalThumbnail;
-                        }
-
-                        // Update lessons table
-                        console.log(`[DEBUG] Updating lessons table for ID: ${lessonId} with`, updateData);
-                        const { data: updatedData, error: updateError } = await supabase.from('lessons')
-                            .update(updateData)
-                            .eq('id', lessonId)
-                            .select();
-
-                        if (updatedData && updatedData.length === 0) {
-                            console.error(`[DEBUG] CRITICAL: Lesson update returned 0 rows! ID ${lessonId} might be missing or RLS blocked.`);
-                        }
-
-                        if (updateError) {
-                            console.error('Supabase Update Error:', updateError);
-                            logToDB(processId, 'error', 'DB Update Failed', { error: updateError.message });
-                        } else {
-                            console.log(`Supabase updated for lesson ${lessonId}`);
-                            logToDB(processId, 'info', 'Job Fully Complete', {
-                                lessonId,
-                                vimeoId,
-                                videoType
-                            });
-                        }
-                    } else if (isSparring) {
-                        // Check if existing thumbnail is custom
-                        const { data: currentSparring } = await supabase.from('sparring_videos').select('thumbnail_url').eq('id', sparringId).single();
-
-                        const isPreview = videoType === 'preview';
-                        const updateData = isPreview
-                            ? { preview_vimeo_id: vimeoId }
-                            : { video_url: vimeoId, is_published: true };
-
-                        // Only update thumbnail if it's NOT a preview and it's currently a placeholder
-                        const isPlaceholder = !currentSparring?.thumbnail_url ||
-                            currentSparring.thumbnail_url.includes('placehold.co') ||
-                            currentSparring.thumbnail_url.includes('generated') ||
-                            currentSparring.thumbnail_url.includes('vumbnail.com');
-
-                        if (!isPreview && isPlaceholder) {
-                            updateData.thumbnail_url = finalThumbnail;
-                        }
-
-                        // Update sparring_videos table
-                        console.log(`[DEBUG] Updating sparring table for ID: ${sparringId} with`, updateData);
-                        const { data: updatedData, error: updateError } = await supabase.from('sparring_videos')
-                            .update(updateData)
-                            .eq('id', sparringId)
-                            .select();
-
-                        if (updatedData && updatedData.length === 0) {
-                            console.error(`[DEBUG] CRITICAL: Sparring update returned 0 rows! ID ${sparringId} might be missing or RLS blocked.`);
-                        }
-
-                        if (updateError) {
-                            console.error('Supabase Update Error:', updateError);
-                            logToDB(processId, 'error', 'DB Update Failed', { error: updateError.message });
-                        } else {
-                            console.log(`Supabase updated for sparring ${sparringId}`);
-                            logToDB(processId, 'info', 'Job Fully Complete', {
-                                sparringId,
-                                vimeoId,
-                                videoType
-                            });
-                        }
-                    } else if (isCourse) {
-                        const updateData = { preview_vimeo_id: vimeoId };
-
-                        // Update courses table
-                        console.log(`[DEBUG] Updating courses table for ID: ${courseId} with`, updateData);
-                        const { data: updatedData, error: updateError } = await supabase.from('courses')
-                            .update(updateData)
-                            .eq('id', courseId)
-                            .select();
-
-                        if (updateError) {
-                            console.error('Supabase Update Error:', updateError);
-                            logToDB(processId, 'error', 'DB Update Failed', { error: updateError.message });
-                        } else {
-                            console.log(`Supabase updated for course ${courseId}`);
-                            logToDB(processId, 'info', 'Job Fully Complete', {
-                                courseId,
-                                vimeoId,
-                                videoType
-                            });
-                        }
-                    } else {
-                        // Check if existing thumbnail is custom
-                        const { data: currentDrill } = await supabase.from('drills').select('thumbnail_url').eq('id', drillId).single();
-
-                        // Only update thumbnail for 'action' type video, and only if it's a placeholder
-                        const isAction = videoType === 'action';
-                        const isPlaceholder = !currentDrill?.thumbnail_url ||
-                            currentDrill.thumbnail_url.includes('placehold.co') ||
-                            currentDrill.thumbnail_url.includes('generated') ||
-                            currentDrill.thumbnail_url.includes('vumbnail.com');
-
-                        const columnToUpdate = isAction ? 'vimeo_url' : 'description_video_url';
-                        const updateData = { [columnToUpdate]: vimeoId };
-
-                        if (isAction && isPlaceholder) {
-                            updateData.thumbnail_url = finalThumbnail;
-                        }
-
-                        // Update drills table
-                        console.log(`[DEBUG] Updating drills table for ID: ${drillId} with`, updateData);
-                        const { data: updatedData, error: updateError } = await supabase.from('drills')
-                            .update(updateData)
-                            .eq('id', drillId)
-                            .select();
-
-                        if (updatedData && updatedData.length === 0) {
-                            console.error(`[DEBUG] CRITICAL: Drill update returned 0 rows! ID ${drillId} might be missing or RLS blocked.`);
-                        }
+                        // Use the thumbnail from Vimeo if available, else fallback to vumbnail
+                        finalThumbnail = encodingResult.thumbnail || `https://vumbnail.com/${vimeoId}.jpg`;
+                    }
 
-                        if (updateError) {
-                            console.error('Supabase Update Error:', updateError);
-                            logToDB(processId, 'error', 'DB Update Failed', { error: updateError.message });
-                        } else {
-                            console.log(`Supabase updated for drill ${drillId}`);
-                            logToDB(processId, 'info', 'Job Fully Complete', {
-                                drillId,
-                                vimeoId,
-                                videoType
-                            });
-                        }
+                    // Let a later re-upload of the same raw file find this output
+                    if (inputHash) {
+                        uploadStore.linkProcessed(inputHash, processedTarget, cuts, { processId, vimeoId, thumbnail: finalThumbnail });
                     }
 
+                    await updateContentRow(vimeoId, finalThumbnail);
+
                 } catch (err) {
                     lastError = err;
                     logToDB(processId, 'warn', `Vimeo upload attempt ${attempt} failed`, {
@@ -1075,9 +1626,12 @@ app.post('/process', async (req, res) => {
                 throw lastError || new Error('Vimeo upload failed');
             }
 
-
+            trace.finish('completed');
+            jobStatus[processId] = { ...jobStatus[processId], status: 'completed', completedAt: new Date() };
         } catch (error) {
             console.error('Processing failed:', error);
+            trace.finish('error');
+            jobStatus[processId] = { ...jobStatus[processId], status: 'error', error: error.message };
             try {
                 fs.writeFileSync(path.join(__dirname, 'processing_error.log'), `[${new Date().toISOString()}] ${error.message}\n${error.stack}\n\n`, { flag: 'a' });
             } catch (e) { console.error('Failed to write error log', e); }
@@ -1085,7 +1639,10 @@ app.post('/process', async (req, res) => {
             logToDB(processId, 'error', 'Processing Crash', { message: error.message, stack: error.stack });
 
             try {
-                if (isLesson) {
+                if (hlsMode) {
+                    // HLS is an additional output; leave the content's Vimeo/Mux fields untouched
+                    await supabase.from(tableName).update({ hls_url: null }).eq('id', contentId);
+                } else if (isLesson) {
                     await supabase.from('lessons')
                         .update({
                             vimeo_url: `ERROR: ${error.message}`.substring(0, 100),
@@ -1239,6 +1796,7 @@ app.delete('/api/admin/vimeo/:videoId', async (req, res) => {
             });
         });
 
+        uploadStore.forgetProcessed(r => String(r.vimeoId) === videoId);
         console.log(`[Admin] Video ${videoId} deleted successfully.`);
         res.json({ success: true });
     } catch (err) {
@@ -1357,6 +1915,7 @@ app.post('/api/upload-to-mux', async (req, res) => {
             }
 
             await supabase.from(tableName).update(updateData).eq('id', contentId);
+            if (contentType === 'sparring') sparringFeedCache.invalidate('sparring video attached');
             return res.json({ success: true, playbackId });
         }
 
@@ -1442,6 +2001,7 @@ app.post('/api/upload-to-vimeo', async (req, res) => {
             else if (!updateData.thumbnail_url) updateData.thumbnail_url = `https://vumbnail.com/${vimeoId}.jpg`;
 
             await supabase.from(tableName).update(updateData).eq('id', contentId);
+            if (contentType === 'sparring') sparringFeedCache.invalidate('sparring video attached');
             return res.json({ success: true });
         }
 
@@ -1508,6 +2068,17 @@ app.post('/api/sync-vimeo-durations', async (req, res) => {
     }
 });
 
+const { CONTENT_TABLES, collectPlatformVideos, createPlatformDeleter, streamBatchDelete } = require('./content-deletion');
+const DELETE_BATCH_MAX = 1000;
+const DELETE_BATCH_CONCURRENCY = parseInt(process.env.DELETE_BATCH_CONCURRENCY || '8', 10);
+
+function createContentDeleter() {
+    return createPlatformDeleter({
+        vimeoToken: process.env.VIMEO_ACCESS_TOKEN || process.env.VITE_VIMEO_ACCESS_TOKEN,
+        muxAuthHeader: getMuxAuthHeader
+    });
+}
+
 // 4. Delete Content API (with Vimeo/Mux cleanup)
 app.post('/api/delete-content', async (req, res) => {
     try {
@@ -1538,40 +2109,7 @@ app.post('/api/delete-content', async (req, res) => {
         }
 
         // 2. Collect video IDs to delete
-        const videosToDelete = [];
-
-        if (contentType === 'drill') {
-            // Drills use Mux (playback IDs in vimeo_url and description_video_url)
-            if (record.vimeo_url && !record.vimeo_url.startsWith('ERROR')) {
-                videosToDelete.push({ platform: 'mux', id: record.vimeo_url });
-            }
-            if (record.description_video_url && !record.description_video_url.startsWith('ERROR')) {
-                videosToDelete.push({ platform: 'mux', id: record.description_video_url });
-            }
-        } else if (contentType === 'lesson') {
-            // Lessons use Vimeo
-            if (record.vimeo_url && !record.vimeo_url.startsWith('ERROR')) {
-                // Extract Vimeo ID (might be in format "id:hash")
-                const vimeoId = record.vimeo_url.split(':')[0];
-                videosToDelete.push({ platform: 'vimeo', id: vimeoId });
-            }
-        } else if (contentType === 'sparring') {
-            // Sparring uses Vimeo (or Mux for newer uploads)
-            if (record.video_url && !record.video_url.startsWith('ERROR')) {
-                // Check if it's a Mux playback ID (shorter, no colons) or Vimeo ID
-                const isMux = record.video_url.length < 20 && !record.video_url.includes(':');
-                if (isMux) {
-                    videosToDelete.push({ platform: 'mux', id: record.video_url });
-                } else {
-                    const vimeoId = record.video_url.split(':')[0];
-                    videosToDelete.push({ platform: 'vimeo', id: vimeoId });
-                }
-            }
-            if (record.preview_vimeo_id && !record.preview_vimeo_id.startsWith('ERROR')) {
-                const vimeoId = record.preview_vimeo_id.split(':')[0];
-                videosToDelete.push({ platform: 'vimeo', id: vimeoId });
-            }
-        }
+        const videosToDelete = collectPlatformVideos(contentType, record);
 
         console.log('[API/Delete] Videos to delete:', videosToDelete);
 
@@ -1622,54 +2160,15 @@ app.post('/api/delete-content', async (req, res) => {
         }
 
         // 3. Delete videos from Vimeo/Mux
-        const vimeoToken = process.env.VIMEO_ACCESS_TOKEN || process.env.VITE_VIMEO_ACCESS_TOKEN;
+        const deleter = createContentDeleter();
 
         for (const video of videosToDelete) {
-            try {
-                if (video.platform === 'vimeo') {
-                    // Delete from Vimeo
-                    console.log('[API/Delete] Deleting Vimeo video:', video.id);
-                    const vimeoRes = await fetch(`https://api.vimeo.com/videos/${video.id}`, {
-                        method: 'DELETE',
-                        headers: { 'Authorization': `Bearer ${vimeoToken}` }
-                    });
-                    if (vimeoRes.ok || vimeoRes.status === 404) {
-                        console.log('[API/Delete] Vimeo video deleted:', video.id);
-                    } else {
-                        console.warn('[API/Delete] Vimeo delete failed:', vimeoRes.status);
-                    }
-                } else if (video.platform === 'mux') {
-                    // Delete from Mux - need to get asset ID from playback ID first
-                    console.log('[API/Delete] Deleting Mux video with playback ID:', video.id);
-
-                    // Get asset ID from playback ID
-                    const playbackRes = await fetch(`https://api.mux.com/video/v1/playback-ids/${video.id}`, {
-                        headers: { Authorization: getMuxAuthHeader() }
-                    });
-
-                    if (playbackRes.ok) {
-                        const playbackData = await playbackRes.json();
-                        const assetId = playbackData.data?.object?.id;
-
-                        if (assetId) {
-                            // Delete the asset
-                            const deleteRes = await fetch(`https://api.mux.com/video/v1/assets/${assetId}`, {
-                                method: 'DELETE',
-                                headers: { Authorization: getMuxAuthHeader() }
-                            });
-                            if (deleteRes.ok || deleteRes.status === 404) {
-                                console.log('[API/Delete] Mux asset deleted:', assetId);
-                            } else {
-                                console.warn('[API/Delete] Mux delete failed:', deleteRes.status);
-                            }
-                        }
-                    } else if (playbackRes.status !== 404) {
-                        console.warn('[API/Delete] Could not find Mux asset for playback ID:', video.id);
-                    }
-                }
-            } catch (videoErr) {
-                console.error('[API/Delete] Error deleting video:', video, videoErr);
+            const result = await deleter.delete(video);
+            if (result.status === 'failed') {
                 // Continue with other deletions even if one fails
+                console.warn('[API/Delete] Platform delete failed:', result);
+            } else {
+                console.log(`[API/Delete] ${video.platform} video ${video.id}: ${result.status}`);
             }
         }
 
@@ -1684,6 +2183,8 @@ app.post('/api/delete-content', async (req, res) => {
             return res.status(500).json({ error: 'Failed to delete from database' });
         }
 
+        if (contentType === 'sparring') sparringFeedCache.invalidate('sparring deleted');
+        uploadStore.forgetProcessed(r => r.tableName === tableName && r.contentId === contentId);
         console.log('[API/Delete] Successfully deleted:', contentType, contentId);
         res.json({ success: true, deletedVideos: videosToDelete.length });
 
@@ -1693,6 +2194,431 @@ app.post('/api/delete-content', async (req, res) => {
     }
 });
 
+// 4b. Batch Delete Content API
+// Body: { items: [{ contentType, contentId }], concurrency? }
+// Streams NDJSON: one line per item as it completes, then a { summary } line
+app.post('/api/delete-content/batch', async (req, res) => {
+    try {
+        const { items } = req.body;
+        if (!Array.isArray(items) || items.length === 0) {
+            return res.status(400).json({ error: 'items must be a non-empty array' });
+        }
+        if (items.length > DELETE_BATCH_MAX) {
+            return res.status(400).json({ error: `At most ${DELETE_BATCH_MAX} items per batch` });
+        }
+        const invalid = items.findIndex(i => !i || !CONTENT_TABLES[i.contentType] || !i.contentId);
+        if (invalid !== -1) {
+            return res.status(400).json({ error: `Item ${invalid}: contentType must be drill, lesson, or sparring and contentId is required` });
+        }
+
+        const concurrency = Math.min(Math.max(parseInt(req.body.concurrency, 10) || DELETE_BATCH_CONCURRENCY, 1), 32);
+        console.log(`[API/Delete] Batch deleting ${items.length} items (concurrency ${concurrency})`);
+
+        let sparringDeleted = false;
+        await streamBatchDelete(supabase, res, items, {
+            deleter: createContentDeleter(),
+            concurrency,
+            onDeleted: item => {
+                if (item.contentType === 'sparring') sparringDeleted = true;
+                uploadStore.forgetProcessed(r => r.tableName === item.tableName && r.contentId === item.contentId);
+            }
+        });
+        if (sparringDeleted) sparringFeedCache.invalidate('sparring batch deleted');
+    } catch (err) {
+        console.error('[API/Delete] Batch error:', err);
+        // streamBatchDelete reports lookup failures in-band; this only guards against a throw after streaming began
+        if (res.headersSent) return res.end();
+        res.status(500).json({ error: err.message });
+    }
+});
+
+// --- Auth (Supabase access token in the Authorization header) ---
+
+// Sets req.user from a valid access token, else 401
+async function requireUser(req, res, next) {
+    const match = /^Bearer\s+(.+)$/i.exec(req.headers.authorization || '');
+    if (!match || !supabase) {
+        return res.status(401).json({ error: 'Authentication required' });
+    }
+    try {
+        const { data, error } = await supabase.auth.getUser(match[1]);
+        if (error || !data?.user) {
+            return res.status(401).json({ error: 'Invalid or expired session' });
+        }
+        req.user = data.user;
+        next();
+    } catch (err) {
+        console.error('[Auth] Token check failed:', err);
+        res.status(500).json({ error: err.message });
+    }
+}
+
+// requireUser, then users.is_admin
+function requireAdmin(req, res, next) {
+    requireUser(req, res, async () => {
+        const { data, error } = await supabase.from('users').select('is_admin').eq('id', req.user.id).maybeSingle();
+        if (error) return res.status(500).json({ error: error.message });
+        if (data?.is_admin !== true) return res.status(403).json({ error: 'Admin access required' });
+        next();
+    });
+}
+
+// requireUser, then the caller's own creator row as req.creator (creators.id is the auth user id,
+// as in submit_payout_request's auth.uid() lookup)
+function requireCreator(req, res, next) {
+    requireUser(req, res, async () => {
+        const { data, error } = await supabase.from('creators').select('id, payout_settings').eq('id', req.user.id).maybeSingle();
+        if (error) return res.status(500).json({ error: error.message });
+        if (!data) return res.status(403).json({ error: 'Creator profile not found' });
+        req.creator = data;
+        next();
+    });
+}
+
+// --- Creator Payout Requests ---
+// Every route acts for the authenticated creator only; payees come from their saved payout settings.
+
+const {
+    PAYOUT_REQUEST_COLUMNS,
+    UUID_PATTERN,
+    normalizePayoutRequest,
+    streamSettlementExport
+} = require('./payout-settlement');
+const { chunk } = require('./async-pool');
+
+const PAYOUT_BULK_MAX = 5000;
+const PAYOUT_INSERT_CHUNK = 500;
+
+// KRW value of one unit of each payout currency; the ledger balance is debited in KRW
+const PAYOUT_KRW_RATES = { KRW: 1 };
+if (process.env.PAYOUT_USD_KRW_RATE) PAYOUT_KRW_RATES.USD = parseFloat(process.env.PAYOUT_USD_KRW_RATE);
+
+/**
+ * Submit validated payout rows through submit_creator_payout_requests, which checks the
+ * balance and minimum and locks the funds in revenue_ledger per item.
+ * Returns one { status: 'created', id } | { status: 'failed', error } per row, in order.
+ */
+async function submitPayoutRows(rows) {
+    const results = [];
+    for (const batch of chunk(rows, PAYOUT_INSERT_CHUNK)) {
+        const { data, error } = await supabase.rpc('submit_creator_payout_requests', { p_requests: batch });
+        if (error) {
+            batch.forEach(() => results.push({ status: 'failed', error: error.message }));
+            continue;
+        }
+        data.forEach(({ status, id, error: itemError }) => {
+            results.push(status === 'created' ? { status, id } : { status, error: itemError });
+        });
+    }
+    return results;
+}
+
+// 1. Bulk submit (registered before /:id routes; body parsed with PAYOUT_BULK_BODY_LIMIT above)
+app.post('/creator/dashboard/payout-requests/bulk', requireCreator, async (req, res) => {
+    try {
+        const { requests } = req.body;
+        if (!Array.isArray(requests) || requests.length === 0) {
+            return res.status(400).json({ error: 'requests must be a non-empty array' });
+        }
+        if (requests.length > PAYOUT_BULK_MAX) {
+            return res.status(400).json({ error: `At most ${PAYOUT_BULK_MAX} payout requests per call` });
+        }
+
+        // Validate everything up front, then submit valid rows in a few large chunks
+        const results = new Array(requests.length);
+        const valid = [];
+        requests.forEach((input, index) => {
+            const { row, error } = normalizePayoutRequest(input, req.creator, PAYOUT_KRW_RATES);
+            if (error) results[index] = { index, status: 'invalid', error };
+            else valid.push({ index, row });
+        });
+
+        const submitted = await submitPayoutRows(valid.map(item => item.row));
+        valid.forEach((item, i) => {
+            results[item.index] = { index: item.index, ...submitted[i] };
+        });
+
+        const created = results.filter(r => r.status === 'created').length;
+        console.log(`[API/Payout] Bulk submit: ${created}/${requests.length} created`);
+        res.status(created > 0 ? 201 : 400).json({
+            created,
+            failed: requests.length - created,
+            results
+        });
+    } catch (err) {
+        console.error('[API/Payout] Bulk submit error:', err);
+        res.status(500).json({ error: err.message });
+    }
+});
+
+// 2. Bulk cancel (the caller's pending requests only; their locked funds are released)
+//    Ids that are not UUIDs are reported in `invalid` instead of failing the uuid[] cast for the batch
+app.delete('/creator/dashboard/payout-requests/bulk', requireCreator, async (req, res) => {
+    try {
+        const { ids } = req.body;
+        if (!Array.isArray(ids) || ids.length === 0) {
+            return res.status(400).json({ error: 'ids must be a non-empty array' });
+        }
+
+        const validIds = [];
+        const invalid = [];
+        ids.forEach(id => (typeof id === 'string' && UUID_PATTERN.test(id) ? validIds : invalid).push(id));
+
+        let deleted = 0;
+        for (const batch of chunk(validIds, PAYOUT_INSERT_CHUNK)) {
+            const { data, error } = await supabase.rpc('cancel_creator_payout_requests', { p_creator_id: req.creator.id, p_ids: batch });
+            if (error) throw error;
+            deleted += data || 0;
+        }
+
+        res.json({ success: true, deleted, invalid });
+    } catch (err) {
+        console.error('[API/Payout] Bulk delete error:', err);
+        res.status(500).json({ error: err.message });
+    }
+});
+
+// 3. Single submit
+app.post('/creator/dashboard/payout-requests', requireCreator, async (req, res) => {
+    try {
+        const { row, error: validationError, status } = normalizePayoutRequest(req.body, req.creator, PAYOUT_KRW_RATES);
+        if (validationError) {
+            return res.status(status || 400).json({ error: validationError });
+        }
+
+        const [result] = await submitPayoutRows([row]);
+        if (result.status !== 'created') {
+            return res.status(400).json({ error: result.error });
+        }
+
+        const { data, error } = await supabase
+            .from('payout_requests')
+            .select(PAYOUT_REQUEST_COLUMNS)
+            .eq('id', result.id)
+            .single();
+
+        if (error) throw error;
+        res.status(201).json(data);
+    } catch (err) {
+        console.error('[API/Payout] Submit error:', err);
+        res.status(500).json({ error: err.message });
+    }
+});
+
+app.get('/creator/dashboard/payout-requests/:id', requireCreator, async (req, res) => {
+    if (!UUID_PATTERN.test(req.params.id)) {
+        return res.status(404).json({ error: 'Payout request not found' });
+    }
+    const { data, error } = await supabase
+        .from('payout_requests')
+        .select(PAYOUT_REQUEST_COLUMNS)
+        .eq('id', req.params.id)
+        .eq('creator_id', req.creator.id)
+        .maybeSingle();
+
+    if (error) return res.status(500).json({ error: error.message });
+    if (!data) return res.status(404).json({ error: 'Payout request not found' });
+    res.json(data);
+});
+
+app.delete('/creator/dashboard/payout-requests/:id', requireCreator, async (req, res) => {
+    if (!UUID_PATTERN.test(req.params.id)) {
+        return res.status(404).json({ error: 'Pending payout request not found' });
+    }
+    const { data, error } = await supabase.rpc('cancel_creator_payout_requests', { p_creator_id: req.creator.id, p_ids: [req.params.id] });
+
+    if (error) return res.status(500).json({ error: error.message });
+    if (!data) return res.status(404).json({ error: 'Pending payout request not found' });
+    res.status(204).send();
+});
+
+// 4. Admin settlement export, grouped by currency and provider (?format=csv|ndjson&status=pending)
+//    Contains every creator's payee details, so the admin check runs before anything is streamed
+app.get('/api/admin/payouts/settlement-export', requireAdmin, async (req, res) => {
+    const format = req.query.format === 'ndjson' ? 'ndjson' : 'csv';
+    const status = req.query.status || 'pending';
+
+    try {
+        console.log(`[Admin] Streaming ${format} settlement export for status=${status}`);
+        await streamSettlementExport(supabase, res, { format, status });
+    } catch (err) {
+        console.error('[Admin] Settlement export failed:', err);
+        // Headers are already sent once streaming starts; just cut the response short
+        if (res.headersSent) return res.end();
+        res.status(500).json({ error: err.message });
+    }
+});
+
+// --- Housekeeping (TTL eviction for in-memory maps, temp file GC) ---
+
+const { createTtlSweeper, collectGarbage, runtimeStats } = require('./housekeeping');
+const HOUR_MS = 60 * 60 * 1000;
+const JOB_STATUS_TTL_MS = parseFloat(process.env.JOB_STATUS_TTL_HOURS || '6') * HOUR_MS;
+const VIMEO_FOLDER_TTL_MS = parseFloat(process.env.VIMEO_FOLDER_TTL_HOURS || '24') * HOUR_MS;
+const TEMP_FILE_TTL_MS = parseFloat(process.env.TEMP_FILE_TTL_HOURS || '24') * HOUR_MS;
+const HOUSEKEEPING_INTERVAL_MS = parseInt(process.env.HOUSEKEEPING_INTERVAL_MS || String(10 * 60 * 1000), 10);
+const PROCESSING_DIR = path.join(TEMP_DIR, 'processing');
+
+const isActiveJob = job => job.status === 'processing';
+const sweepJobStatus = createTtlSweeper(jobStatus, {
+    ttlMs: JOB_STATUS_TTL_MS,
+    isActive: isActiveJob,
+    timestampOf: job => job.completedAt || job.submittedAt
+});
+const sweepVimeoFolders = createTtlSweeper(vimeoFolderCache, { ttlMs: VIMEO_FOLDER_TTL_MS });
+const housekeepingStats = { runs: 0, lastRunAt: null, evictedJobs: 0, evictedFolders: 0, removedFiles: 0, freedBytes: 0 };
+
+async function runHousekeeping() {
+    const activeJobs = Object.entries(jobStatus).filter(([, job]) => isActiveJob(job));
+    const activeVideoIds = new Set(activeJobs.map(([, job]) => job.videoId));
+    const activeProcessIds = new Set(activeJobs.map(([id]) => id));
+
+    const evictedJobs = sweepJobStatus();
+    const evictedFolders = sweepVimeoFolders();
+
+    const results = await Promise.all([
+        collectGarbage(UPLOADS_DIR, {
+            maxAgeMs: TEMP_FILE_TTL_MS,
+            inUse: name => activeVideoIds.has(path.parse(name).name),
+            // Aliases are hard links, so the bytes stay indexed while any other name for them remains
+            onRemove: name => uploadStore.release(name)
+        }),
+        collectGarbage(PROCESSING_DIR, { maxAgeMs: TEMP_FILE_TTL_MS, inUse: name => activeProcessIds.has(name) }),
+        collectGarbage(PROCESSED_DIR, { maxAgeMs: TEMP_FILE_TTL_MS, match: name => name.endsWith('_preview.mp4') }),
+        // <sha256>/ per video; reuse refreshes the manifest's mtime
+        collectGarbage(THUMBNAILS_DIR, { maxAgeMs: TEMP_FILE_TTL_MS }),
+        // <contentId>/<processId>/ ladders written by local HLS storage
+        collectGarbage(HLS_LOCAL_DIR, { maxAgeMs: TEMP_FILE_TTL_MS }),
+        // <sha256>.json probe results; cache hits refresh the mtime. ids/ records outlive the videos and are capped by count
+        collectGarbage(videoMetadataCache.cacheDir, { maxAgeMs: TEMP_FILE_TTL_MS, match: name => name.endsWith('.json') }),
+        // A session is <uploadId>.json + <uploadId>.part, aged on whichever was written last
+        collectGarbage(uploadStore.sessionsDir, {
+            maxAgeMs: TEMP_FILE_TTL_MS,
+            group: name => name.split('.')[0],
+            onRemove: name => uploadStore.hashes.delete(name.split('.')[0])
+        })
+    ]);
+
+    const removedFiles = results.reduce((sum, r) => sum + r.removed, 0);
+    const freedBytes = results.reduce((sum, r) => sum + r.bytes, 0);
+    Object.assign(housekeepingStats, {
+        runs: housekeepingStats.runs + 1,
+        lastRunAt: new Date(),
+        evictedJobs: housekeepingStats.evictedJobs + evictedJobs,
+        evictedFolders: housekeepingStats.evictedFolders + evictedFolders,
+        removedFiles: housekeepingStats.removedFiles + removedFiles,
+        freedBytes: housekeepingStats.freedBytes + freedBytes
+    });
+    if (evictedJobs || evictedFolders || removedFiles) {
+        console.log(`[Housekeeping] Evicted ${evictedJobs} jobs, ${evictedFolders} folders; removed ${removedFiles} temp entries (${Math.round(freedBytes / 1024 / 1024)} MB)`);
+    }
+}
+
+setInterval(() => {
+    runHousekeeping().catch(err => console.error('[Housekeeping] Run failed:', err));
+}, HOUSEKEEPING_INTERVAL_MS).unref();
+
+// Process-level resource usage, sampled by testsprite_tests/soak_test.py
+app.get('/metrics/runtime', async (req, res) => {
+    try {
+        const stats = await runtimeStats({
+            uploads: UPLOADS_DIR,
+            processing: PROCESSING_DIR,
+            processed: PROCESSED_DIR,
+            uploadSessions: uploadStore.sessionsDir
+        });
+        res.json({
+            ...stats,
+            maps: {
+                jobStatus: Object.keys(jobStatus).length,
+                vimeoFolderCache: Object.keys(vimeoFolderCache).length,
+                processTraces: processTraces.traces.size,
+                uploadHashes: uploadStore.hashes.size
+            },
+            housekeeping: housekeepingStats
+        });
+    } catch (err) {
+        console.error('[Metrics] Runtime stats failed:', err);
+        res.status(500).json({ error: err.message });
+    }
+});
+
+// --- Test Fixtures (bulk seed / namespaced wipe for testsprite_tests) ---
+// Only mounted when ENABLE_TEST_FIXTURES=1; never enable on production.
+
+if (process.env.ENABLE_TEST_FIXTURES === '1') {
+    console.warn('[Fixtures] Test fixture endpoints are ENABLED');
+
+    app.post('/test-fixtures/seed', async (req, res) => {
+        try {
+            const { dataset, params = {} } = req.body;
+            const namespace = req.body.namespace || `tc-${uuidv4().slice(0, 8)}`;
+            if (!dataset) {
+                return res.status(400).json({ error: 'dataset is required' });
+            }
+
+            const started = Date.now();
+            const { data, error } = await supabase.rpc('seed_test_fixture', {
+                p_namespace: namespace,
+                p_dataset: dataset,
+                p_params: params
+            });
+            if (error) throw error;
+
+            console.log(`[Fixtures] Seeded ${dataset} as ${namespace} in ${Date.now() - started}ms`);
+            res.status(201).json(data);
+        } catch (err) {
+            console.error('[Fixtures] Seed failed:', err);
+            res.status(500).json({ error: err.message });
+        }
+    });
+
+    // Access token for a user seeded under :namespace, so tests can call authenticated routes as them
+    app.post('/test-fixtures/:namespace/sessions', async (req, res) => {
+        try {
+            const { userId } = req.body;
+            if (typeof userId !== 'string' || !UUID_PATTERN.test(userId)) {
+                return res.status(400).json({ error: 'userId must be a UUID' });
+            }
+
+            const { data: row, error: rowError } = await supabase.from('test_fixture_rows')
+                .select('row_id')
+                .eq('namespace', req.params.namespace)
+                .eq('table_name', 'auth.users')
+                .eq('row_id', userId)
+                .maybeSingle();
+            if (rowError) throw rowError;
+            if (!row) return res.status(404).json({ error: 'Not a fixture user of this namespace' });
+
+            const { data: userData, error: userError } = await supabase.auth.admin.getUserById(userId);
+            if (userError) throw userError;
+            const { data: link, error: linkError } = await supabase.auth.admin.generateLink({ type: 'magiclink', email: userData.user.email });
+            if (linkError) throw linkError;
+
+            // verifyOtp keeps the session on the client that calls it, so never use the service client here
+            const verifier = createClient(supabaseUrl, supabaseKey, { auth: { persistSession: false, autoRefreshToken: false } });
+            const { data, error } = await verifier.auth.verifyOtp({ token_hash: link.properties.hashed_token, type: 'magiclink' });
+            if (error) throw error;
+            res.status(201).json({ userId, accessToken: data.session.access_token });
+        } catch (err) {
+            console.error('[Fixtures] Session failed:', err);
+            res.status(500).json({ error: err.message });
+        }
+    });
+
+    app.delete('/test-fixtures/:namespace', async (req, res) => {
+        try {
+            const { data, error } = await supabase.rpc('wipe_test_fixture', { p_namespace: req.params.namespace });
+            if (error) throw error;
+            sparringFeedCache.invalidate('fixture wipe');
+            res.json(data);
+        } catch (err) {
+            console.error('[Fixtures] Wipe failed:', err);
+            res.status(500).json({ error: err.message });
+        }
+    });
+}
+
 // Start Server
 
 app.listen(PORT, '0.0.0.0', () => {
@@ -0,0 +1,172 @@
+const { v4: uuidv4 } = require('uuid');
+
+/**
+ * Lightweight span timing for background jobs, keyed by a server-generated job ID
+ * (the /process processId). The caller's x-request-id is kept as an attribute only,
+ * so a reused or colliding request ID can never overwrite another job's trace.
+ */
+
+const STAGE_SAMPLE_WINDOW = 200;
+
+class Trace {
+    constructor(traceId, { requestId = null, attributes = {}, onSpanEnd, onFinish } = {}) {
+        this.traceId = traceId;
+        this.requestId = requestId;
+        this.attributes = attributes;
+        this.startedAt = Date.now();
+        this.startHr = process.hrtime.bigint();
+        this.endedAt = null;
+        this.status = 'running';
+        this.spans = [];
+        this.onSpanEnd = onSpanEnd;
+        this.onFinish = onFinish;
+    }
+
+    elapsedMs(since = this.startHr) {
+        return Number(process.hrtime.bigint() - since) / 1e6;
+    }
+
+    /**
+     * Open a span; call end(extraAttributes) when the stage is done.
+     */
+    startSpan(name, attributes = {}) {
+        const span = {
+            name,
+            attributes,
+            offsetMs: Math.round(this.elapsedMs() * 10) / 10,
+            durationMs: null,
+            status: 'running'
+        };
+        const startHr = process.hrtime.bigint();
+        this.spans.push(span);
+
+        const close = (status, extra) => {
+            if (span.durationMs !== null) return span;
+            span.durationMs = Math.round(this.elapsedMs(startHr) * 10) / 10;
+            span.status = status;
+            Object.assign(span.attributes, extra);
+            if (this.onSpanEnd) this.onSpanEnd(span, this);
+            return span;
+        };
+
+        return {
+            end: (extra = {}) => close('ok', extra),
+            fail: (err, extra = {}) => close('error', { ...extra, error: err?.message })
+        };
+    }
+
+    /**
+     * Time an async function as a span.
+     */
+    async span(name, fn, attributes = {}) {
+        const span = this.startSpan(name, attributes);
+        try {
+            const result = await fn();
+            span.end();
+            return result;
+        } catch (err) {
+            span.fail(err);
+            throw err;
+        }
+    }
+
+    finish(status = 'completed') {
+        this.status = status;
+        this.endedAt = Date.now();
+        // Close anything left open by an early throw
+        this.spans.filter(s => s.durationMs === null).forEach(s => {
+            s.durationMs = Math.round((this.elapsedMs() - s.offsetMs) * 10) / 10;
+            s.status = 'aborted';
+        });
+        if (this.onFinish) this.onFinish(this);
+    }
+
+    /**
+     * Total duration per stage name (e.g. all 'cut' spans summed).
+     */
+    stageTotals() {
+        return this.spans.reduce((acc, s) => {
+            if (s.durationMs !== null) acc[s.name] = Math.round(((acc[s.name] || 0) + s.durationMs) * 10) / 10;
+            return acc;
+        }, {});
+    }
+
+    toJSON() {
+        return {
+            traceId: this.traceId,
+            requestId: this.requestId,
+            status: this.status,
+            attributes: this.attributes,
+            startedAt: new Date(this.startedAt).toISOString(),
+            endedAt: this.endedAt ? new Date(this.endedAt).toISOString() : null,
+            totalMs: Math.round((this.endedAt ? this.endedAt - this.startedAt : Date.now() - this.startedAt) * 10) / 10,
+            stages: this.stageTotals(),
+            spans: this.spans
+        };
+    }
+}
+
+/**
+ * Recent traces by trace ID plus rolling per-stage duration stats.
+ */
+class TraceStore {
+    constructor({ maxTraces = 500 } = {}) {
+        this.maxTraces = maxTraces;
+        this.traces = new Map();
+        this.stageSamples = {};
+    }
+
+    start(traceId, options = {}) {
+        const userOnSpanEnd = options.onSpanEnd;
+        const trace = new Trace(traceId, {
+            ...options,
+            onSpanEnd: (span, t) => {
+                this.recordStage(span.name, span.durationMs);
+                if (userOnSpanEnd) userOnSpanEnd(span, t);
+            }
+        });
+        this.traces.delete(traceId);
+        this.traces.set(traceId, trace);
+        while (this.traces.size > this.maxTraces) {
+            this.traces.delete(this.traces.keys().next().value);
+        }
+        return trace;
+    }
+
+    get(traceId) {
+        return this.traces.get(traceId) || null;
+    }
+
+    recordStage(name, durationMs) {
+        const samples = this.stageSamples[name] || (this.stageSamples[name] = []);
+        samples.push(durationMs);
+        if (samples.length > STAGE_SAMPLE_WINDOW) samples.shift();
+    }
+
+    stageSummary() {
+        const percentile = (sorted, p) => sorted[Math.min(sorted.length - 1, Math.floor(p * sorted.length))];
+        return Object.fromEntries(Object.entries(this.stageSamples).map(([name, samples]) => {
+            const sorted = [...samples].sort((a, b) => a - b);
+            const total = sorted.reduce((sum, v) => sum + v, 0);
+            return [name, {
+                count: sorted.length,
+                meanMs: Math.round((total / sorted.length) * 10) / 10,
+                p50Ms: percentile(sorted, 0.5),
+                p95Ms: percentile(sorted, 0.95),
+                maxMs: sorted[sorted.length - 1]
+            }];
+        }));
+    }
+}
+
+/**
+ * Express middleware: reuse the caller's x-request-id or mint one, and echo it back.
+ */
+function requestIdMiddleware(req, res, next) {
+    const incoming = req.get('x-request-id');
+    req.requestId = incoming && /^[\w.:-]{1,128}$/.test(incoming) ? incoming : uuidv4();
+    res.set('x-request-id', req.requestId);
+    next();
+}
+
+module.exports = { Trace, TraceStore, requestIdMiddleware };
@@ -0,0 +1,138 @@
+const crypto = require('crypto');
+const fs = require('fs');
+const path = require('path');
+
+/**
+ * Sampled, scrubbed request/response capture to an append-only NDJSON log.
+ *
+ * One compact line per sampled request:
+ *   { t, id, m, p, h, b, mp, s, d, rb, rh }
+ *   t  = start time (epoch ms)        m/p = method, path + query
+ *   h  = content-type / accept        b   = scrubbed JSON body (omitted for multipart, mp = 1)
+ *   s  = status                       d   = duration ms
+ *   rb = response bytes               rh  = short sha1 of the response body
+ *   sr = sample rate the record was captured at (replay scales by 1 / sr)
+ * The testsprite traffic_replay.py tool re-issues these records against a target.
+ */
+
+const SENSITIVE_KEY = /pass(word)?|token|secret|authorization|api[-_]?key|cookie|email|phone|account|card|holder/i;
+const SKIP_PATHS = ['/debug-logs', '/traces', '/metrics'];
+
+function scrub(value, depth = 0) {
+    if (depth > 6) return '[truncated]';
+    if (Array.isArray(value)) return value.map(v => scrub(v, depth + 1));
+    if (value && typeof value === 'object') {
+        return Object.fromEntries(Object.entries(value).map(([k, v]) => (
+            [k, SENSITIVE_KEY.test(k) ? '[scrubbed]' : scrub(v, depth + 1)]
+        )));
+    }
+    return value;
+}
+
+function scrubUrl(originalUrl) {
+    const [pathname, query] = originalUrl.split('?');
+    if (!query) return pathname;
+    const params = new URLSearchParams(query);
+    for (const key of [...params.keys()]) {
+        if (SENSITIVE_KEY.test(key)) params.set(key, '[scrubbed]');
+    }
+    return `${pathname}?${params.toString()}`;
+}
+
+function createTrafficCapture({
+    logPath = path.join(__dirname, 'traffic_capture.ndjson'),
+    sampleRate = 0.1,
+    maxBodyBytes = 16 * 1024,
+    maxLogBytes = 256 * 1024 * 1024
+} = {}) {
+    let stream = fs.createWriteStream(logPath, { flags: 'a' });
+    let logBytes = fs.existsSync(logPath) ? fs.statSync(logPath).size : 0;
+    let rotating = null; // lines queued while the old stream closes
+
+    function rotate() {
+        // Close before renaming: an open handle blocks the rename on Windows
+        rotating = [];
+        stream.end(() => {
+            try {
+                fs.renameSync(logPath, `${logPath}.1`);
+            } catch (e) {
+                console.error('[Capture] Failed to rotate log:', e.message);
+            }
+            stream = fs.createWriteStream(logPath, { flags: 'a' });
+            const queued = rotating;
+            rotating = null;
+            queued.forEach(line => stream.write(line));
+        });
+    }
+
+    function append(record) {
+        const line = `${JSON.stringify(record)}\n`;
+        const bytes = Buffer.byteLength(line);
+        // Rotate once to <log>.1 so capture can stay on without filling the disk
+        if (!rotating && logBytes + bytes > maxLogBytes) {
+            rotate();
+            logBytes = 0;
+        }
+        logBytes += bytes;
+        if (rotating) rotating.push(line);
+        else stream.write(line);
+    }
+
+    return function trafficCapture(req, res, next) {
+        if (Math.random() >= sampleRate || SKIP_PATHS.some(p => req.path.startsWith(p))) {
+            return next();
+        }
+
+        const startedAt = Date.now();
+        const startHr = process.hrtime.bigint();
+        const hash = crypto.createHash('sha1');
+        let responseBytes = 0;
+
+        const originalWrite = res.write;
+        const originalEnd = res.end;
+        const track = (chunk, encoding) => {
+            if (!chunk || typeof chunk === 'function') return;
+            const buf = Buffer.isBuffer(chunk) ? chunk : Buffer.from(chunk, typeof encoding === 'string' ? encoding : 'utf8');
+            responseBytes += buf.length;
+            hash.update(buf);
+        };
+        res.write = function (chunk, encoding, cb) {
+            track(chunk, encoding);
+            return originalWrite.call(this, chunk, encoding, cb);
+        };
+        res.end = function (chunk, encoding, cb) {
+            track(chunk, encoding);
+            return originalEnd.call(this, chunk, encoding, cb);
+        };
+
+        res.on('finish', () => {
+            const contentType = req.get('content-type') || '';
+            const isMultipart = contentType.startsWith('multipart/');
+            const record = {
+                t: startedAt,
+                id: req.requestId,
+                m: req.method,
+                p: scrubUrl(req.originalUrl),
+                h: { 'content-type': contentType || undefined, accept: req.get('accept') || undefined },
+                s: res.statusCode,
+                d: Math.round(Number(process.hrtime.bigint() - startHr) / 1e5) / 10,
+                rb: responseBytes,
+                rh: hash.digest('hex').slice(0, 12),
+                sr: sampleRate
+            };
+
+            if (isMultipart) {
+                record.mp = 1;
+            } else if (req.body && Object.keys(req.body).length > 0) {
+                const body = JSON.stringify(scrub(req.body));
+                record.b = Buffer.byteLength(body) <= maxBodyBytes ? JSON.parse(body) : '[too large]';
+            }
+
+            try { append(record); } catch (e) { console.error('[Capture] Failed to append record:', e.message); }
+        });
+
+        next();
+    };
+}
+
+module.exports = { createTrafficCapture, scrub, scrubUrl };
@@ -0,0 +1,480 @@
+const crypto = require('crypto');
+const fs = require('fs');
+const path = require('path');
+const { pipeline } = require('stream');
+const { promisify } = require('util');
+const { v4: uuidv4 } = require('uuid');
+
+const streamPipeline = promisify(pipeline);
+
+/**
+ * Content-addressed raw uploads.
+ *
+ * Every stored upload is indexed by the sha256 of its bytes in <indexDir>/<sha256>.json
+ * ({ videoId, filename, aliases, size, processed }). Bytes are hashed while they are
+ * received, so a re-upload of a file we already have is detected without a second pass
+ * over the disk. The re-upload still gets its own videoId: its filename is a hard link
+ * to the stored bytes (listed in aliases), so nothing of the first uploader's is handed out.
+ *
+ * Processed output is recorded per content row (table, id, video type and title) and cut
+ * list, so only re-processing the same row can reuse a Vimeo video.
+ *
+ * Resumable sessions keep their bytes in <sessionsDir>/<uploadId>.part; the part file's
+ * size is the source of truth for how much has been received, so a client can resume
+ * after a dropped connection or a server restart. A session that announces a sha256 also
+ * gets a challenge of random byte ranges: if that content is stored, answering it with
+ * the hash of those ranges completes the upload without sending the body. Knowing the
+ * hash alone is not enough.
+ */
+
+const DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024;
+const PROOF_RANGES = 4;
+const PROOF_RANGE_BYTES = 64 * 1024;
+
+class UploadError extends Error {
+    constructor(status, message, details = {}) {
+        super(message);
+        this.status = status;
+        this.details = details;
+    }
+}
+
+class UploadStore {
+    constructor({ uploadsDir, indexDir, sessionsDir, chunkSize = DEFAULT_CHUNK_SIZE }) {
+        this.uploadsDir = uploadsDir;
+        this.indexDir = indexDir;
+        this.sessionsDir = sessionsDir;
+        this.chunkSize = chunkSize;
+        this.hashes = new Map(); // uploadId -> { hash, bytes } for sessions hashed incrementally
+        this.locks = new Map(); // uploadId -> tail of the promise chain serializing that session's writes
+        this.byFilename = new Map(); // stored filename (original or alias) -> sha256
+        this.processedHashes = new Set(); // sha256 of entries with processed output recorded
+        this.stats = { stored: 0, deduplicated: 0, proven: 0 };
+
+        [indexDir, sessionsDir].forEach(dir => fs.mkdirSync(dir, { recursive: true }));
+        for (const file of fs.readdirSync(indexDir)) {
+            if (!file.endsWith('.json')) continue;
+            try {
+                this.indexEntry(path.basename(file, '.json'), JSON.parse(fs.readFileSync(path.join(indexDir, file), 'utf8')));
+            } catch (e) {
+                console.warn(`[Uploads] Skipping unreadable index entry ${file}:`, e.message);
+            }
+        }
+    }
+
+    // --- Content index ---
+
+    indexPath(hash) {
+        return path.join(this.indexDir, `${hash}.json`);
+    }
+
+    readEntry(hash) {
+        try {
+            return JSON.parse(fs.readFileSync(this.indexPath(hash), 'utf8'));
+        } catch (e) {
+            return null;
+        }
+    }
+
+    indexEntry(hash, entry) {
+        for (const filename of [entry.filename, ...(entry.aliases || [])]) this.byFilename.set(filename, hash);
+        if (entry.processed && Object.keys(entry.processed).length > 0) {
+            this.processedHashes.add(hash);
+        } else {
+            this.processedHashes.delete(hash);
+        }
+    }
+
+    /**
+     * Index entry for a content hash, or null if unknown or every stored name is gone.
+     * A hit refreshes the stored file's mtime (shared by its hard-linked aliases), so
+     * temp-file GC (which ages uploads by mtime) never deletes a file that was just
+     * handed out again.
+     */
+    lookup(hash) {
+        if (!/^[a-f0-9]{64}$/.test(hash || '')) return null;
+        const entry = this.readEntry(hash);
+        if (!entry) return null;
+        const stored = path.join(this.uploadsDir, entry.filename);
+        try {
+            const now = new Date();
+            fs.utimesSync(stored, now, now);
+        } catch (e) {
+            // Fall back to a surviving alias, if any
+            this.release(entry.filename, hash);
+            return this.lookup(hash);
+        }
+        return { hash, ...entry };
+    }
+
+    hashForFile(filePath) {
+        return path.dirname(filePath) === this.uploadsDir ? this.byFilename.get(path.basename(filePath)) || null : null;
+    }
+
+    record(hash, entry) {
+        // Write-then-rename so a crash never leaves a half-written index entry
+        const target = this.indexPath(hash);
+        const tmp = `${target}.${process.pid}.tmp`;
+        fs.writeFileSync(tmp, JSON.stringify(entry));
+        fs.renameSync(tmp, target);
+        this.indexEntry(hash, entry);
+    }
+
+    /**
+     * Drop one stored name (a removed upload or alias). The content stays indexed, under
+     * a surviving alias, until its last name is gone.
+     */
+    release(filename, hash = this.byFilename.get(filename)) {
+        this.byFilename.delete(filename);
+        const entry = hash && this.readEntry(hash);
+        if (!entry) return;
+
+        const names = [entry.filename, ...(entry.aliases || [])].filter(name => name !== filename);
+        if (names.length === 0) {
+            this.processedHashes.delete(hash);
+            try { fs.unlinkSync(this.indexPath(hash)); } catch (e) { /* already gone */ }
+            return;
+        }
+        this.record(hash, { ...entry, videoId: path.parse(names[0]).name, filename: names[0], aliases: names.slice(1) });
+    }
+
+    /**
+     * Remember processed output for a stored upload, keyed by the content row it was made
+     * for ({ tableName, contentId, videoType, title }) and the cut list that produced it.
+     */
+    linkProcessed(hash, target, cuts, output) {
+        const entry = this.lookup(hash);
+        if (!entry) return;
+        const { hash: _, ...stored } = entry;
+        const record = {
+            tableName: target.tableName,
+            contentId: target.contentId,
+            videoType: target.videoType || null,
+            title: target.title || null,
+            ...output,
+            at: new Date().toISOString()
+        };
+        stored.processed = { ...(stored.processed || {}), [processedKey(target, cuts)]: record };
+        this.record(hash, stored);
+    }
+
+    /**
+     * Processed output recorded for this upload, content row and cut list, or null.
+     * A changed title means the recorded video no longer matches, so it is not reused.
+     */
+    processedOutput(hash, target, cuts) {
+        const entry = this.lookup(hash);
+        const record = entry && entry.processed && entry.processed[processedKey(target, cuts)];
+        return record && record.title === (target.title || null) ? record : null;
+    }
+
+    /**
+     * Drop every processed record matching `match(record)`, e.g. when its content row or
+     * Vimeo video is deleted. Returns the number of records removed.
+     */
+    forgetProcessed(match) {
+        let removed = 0;
+        for (const hash of [...this.processedHashes]) {
+            const entry = this.readEntry(hash);
+            if (!entry || !entry.processed) {
+                this.processedHashes.delete(hash);
+                continue;
+            }
+            const kept = Object.fromEntries(Object.entries(entry.processed).filter(([, record]) => !match(record)));
+            const dropped = Object.keys(entry.processed).length - Object.keys(kept).length;
+            if (dropped > 0) {
+                this.record(hash, { ...entry, processed: kept });
+                removed += dropped;
+            }
+        }
+        return removed;
+    }
+
+    /**
+     * Give a re-upload of stored content its own videoId and filename: a hard link to the
+     * stored bytes (a copy where links are unsupported), recorded as an alias.
+     */
+    alias(existing) {
+        const videoId = uuidv4();
+        const filename = `${videoId}${path.extname(existing.filename)}`;
+        const source = path.join(this.uploadsDir, existing.filename);
+        const target = path.join(this.uploadsDir, filename);
+        try {
+            fs.linkSync(source, target);
+        } catch (e) {
+            fs.copyFileSync(source, target);
+        }
+        const { hash, ...stored } = existing;
+        this.record(hash, { ...stored, aliases: [...(stored.aliases || []), filename] });
+        this.stats.deduplicated++;
+        return { deduplicated: true, hash, videoId, filename, size: existing.size, createdAt: new Date().toISOString() };
+    }
+
+    /**
+     * Index a freshly received file. If identical bytes are already stored, the new copy
+     * is deleted and the upload becomes an alias of the stored file (deduplicated: true).
+     */
+    adopt(hash, filePath, originalName) {
+        const existing = this.lookup(hash);
+        if (existing) {
+            fs.unlinkSync(filePath);
+            return this.alias(existing);
+        }
+
+        const videoId = uuidv4();
+        const filename = `${videoId}${path.extname(originalName || '') || '.mp4'}`;
+        fs.renameSync(filePath, path.join(this.uploadsDir, filename));
+        const entry = { videoId, filename, size: fs.statSync(path.join(this.uploadsDir, filename)).size, createdAt: new Date().toISOString() };
+        this.record(hash, entry);
+        this.stats.stored++;
+        return { deduplicated: false, hash, ...entry };
+    }
+
+    // --- Resumable sessions ---
+
+    sessionPath(uploadId, ext) {
+        if (!/^[\w-]+$/.test(uploadId)) throw new UploadError(404, 'Upload session not found');
+        return path.join(this.sessionsDir, `${uploadId}.${ext}`);
+    }
+
+    createSession({ filename, size, sha256 }) {
+        if (!Number.isInteger(size) || size <= 0) {
+            throw new UploadError(400, 'size must be a positive integer');
+        }
+        const uploadId = uuidv4();
+        const session = { uploadId, filename, size, sha256: sha256 || null, createdAt: new Date().toISOString() };
+        // Issued whether or not the hash is known, so the response says nothing about stored uploads
+        if (sha256) session.challenge = makeChallenge(size);
+        fs.writeFileSync(this.sessionPath(uploadId, 'json'), JSON.stringify(session));
+        fs.writeFileSync(this.sessionPath(uploadId, 'part'), '');
+        this.hashes.set(uploadId, { hash: crypto.createHash('sha256'), bytes: 0 });
+        return { ...session, received: 0, chunkSize: this.chunkSize };
+    }
+
+    getSession(uploadId) {
+        let session;
+        try {
+            session = JSON.parse(fs.readFileSync(this.sessionPath(uploadId, 'json'), 'utf8'));
+        } catch (e) {
+            if (e instanceof UploadError) throw e;
+            throw new UploadError(404, 'Upload session not found');
+        }
+        const received = fs.statSync(this.sessionPath(uploadId, 'part')).size;
+        return { ...session, received, chunkSize: this.chunkSize };
+    }
+
+    // Hash state lives in memory; after a restart (or a torn chunk) rebuild it from the part file
+    async sessionHash(uploadId, received) {
+        const known = this.hashes.get(uploadId);
+        if (known && known.bytes === received) return known;
+
+        const state = { hash: crypto.createHash('sha256'), bytes: received };
+        if (received > 0) {
+            await streamPipeline(
+                fs.createReadStream(this.sessionPath(uploadId, 'part'), { highWaterMark: 1024 * 1024 }),
+                async function* (source) { for await (const chunk of source) state.hash.update(chunk); }
+            );
+        }
+        this.hashes.set(uploadId, state);
+        return state;
+    }
+
+    // Run fn once every earlier write to the same session has settled
+    withSessionLock(uploadId, fn) {
+        const previous = this.locks.get(uploadId) || Promise.resolve();
+        const run = previous.then(fn, fn);
+        const tail = run.catch(() => {});
+        this.locks.set(uploadId, tail);
+        tail.then(() => {
+            if (this.locks.get(uploadId) === tail) this.locks.delete(uploadId);
+        });
+        return run;
+    }
+
+    /**
+     * Append one chunk streamed from `readable` at `offset`. Chunks must arrive in order;
+     * a wrong offset is rejected with 409 and the current received count so the client
+     * can resume from there. Returns the session, plus the stored upload once complete.
+     * Writes to one session are serialized, so the offset is checked against the part
+     * file as it stands once every earlier chunk has landed.
+     */
+    appendChunk(uploadId, offset, readable) {
+        return this.withSessionLock(uploadId, () => this.appendChunkLocked(uploadId, offset, readable));
+    }
+
+    async appendChunkLocked(uploadId, offset, readable) {
+        const session = this.getSession(uploadId);
+        if (offset !== session.received) {
+            throw new UploadError(409, 'Offset does not match received bytes', { received: session.received });
+        }
+
+        const state = await this.sessionHash(uploadId, session.received);
+        const partPath = this.sessionPath(uploadId, 'part');
+        const limit = session.size - session.received;
+        let written = 0;
+
+        try {
+            await streamPipeline(
+                readable,
+                async function* (source) {
+                    for await (const chunk of source) {
+                        written += chunk.length;
+                        if (written > limit) throw new UploadError(413, 'Chunk runs past the declared size');
+                        state.hash.update(chunk);
+                        yield chunk;
+                    }
+                },
+                fs.createWriteStream(partPath, { flags: 'a' })
+            );
+        } catch (err) {
+            // The hash may have consumed bytes that never reached disk; rebuild it on the next chunk
+            this.hashes.delete(uploadId);
+            throw err;
+        }
+        state.bytes += written;
+
+        const received = session.received + written;
+        if (received < session.size) {
+            return { ...session, received, complete: false };
+        }
+        return { ...session, received, complete: true, upload: this.finalize(uploadId, session, state) };
+    }
+
+    finalize(uploadId, session, state) {
+        const hash = state.hash.digest('hex');
+        this.hashes.delete(uploadId);
+        const partPath = this.sessionPath(uploadId, 'part');
+
+        if (session.sha256 && session.sha256 !== hash) {
+            fs.unlinkSync(partPath);
+            fs.unlinkSync(this.sessionPath(uploadId, 'json'));
+            throw new UploadError(422, 'Content hash mismatch', { expected: session.sha256, actual: hash });
+        }
+
+        const result = this.adopt(hash, partPath, session.filename);
+        fs.unlinkSync(this.sessionPath(uploadId, 'json'));
+        return result;
+    }
+
+    /**
+     * Complete a session without its body by answering its challenge: the hex sha256 of
+     * the challenge's byte ranges, concatenated in order. Each challenge allows one attempt.
+     * A wrong proof and unknown content fail the same way (409), and the session can
+     * still be uploaded normally.
+     */
+    proveSession(uploadId, proof) {
+        return this.withSessionLock(uploadId, async () => {
+            const { received, chunkSize, challenge, ...session } = this.getSession(uploadId);
+            if (!challenge) {
+                throw new UploadError(409, 'Session has no open challenge; upload the bytes', { received });
+            }
+            fs.writeFileSync(this.sessionPath(uploadId, 'json'), JSON.stringify(session));
+
+            const existing = this.lookup(session.sha256);
+            const expected = existing && existing.size === session.size
+                ? await hashRanges(path.join(this.uploadsDir, existing.filename), challenge.ranges)
+                : null;
+            if (!expected || !/^[a-f0-9]{64}$/i.test(proof || '') ||
+                !crypto.timingSafeEqual(Buffer.from(expected, 'hex'), Buffer.from(proof, 'hex'))) {
+                throw new UploadError(409, 'Proof of possession failed; upload the bytes', { received });
+            }
+
+            this.hashes.delete(uploadId);
+            for (const ext of ['part', 'json']) {
+                try { fs.unlinkSync(this.sessionPath(uploadId, ext)); } catch (e) { /* already gone */ }
+            }
+            this.stats.proven++;
+            return { ...session, received, complete: true, upload: this.alias(existing) };
+        });
+    }
+
+    abortSession(uploadId) {
+        const partPath = this.sessionPath(uploadId, 'part');
+        const jsonPath = this.sessionPath(uploadId, 'json');
+        return this.withSessionLock(uploadId, () => {
+            this.hashes.delete(uploadId);
+            for (const file of [partPath, jsonPath]) {
+                try { fs.unlinkSync(file); } catch (e) { /* already gone */ }
+            }
+        });
+    }
+
+    // --- multer integration ---
+
+    /**
+     * multer storage engine that hashes while writing to the uploads directory and hands
+     * the file to adopt(), so the classic multipart /upload deduplicates as well.
+     */
+    multerStorage() {
+        const store = this;
+        return {
+            _handleFile(req, file, cb) {
+                const tmpPath = path.join(store.sessionsDir, `${uuidv4()}.multipart`);
+                const hash = crypto.createHash('sha256');
+                let size = 0;
+                streamPipeline(
+                    file.stream,
+                    async function* (source) {
+                        for await (const chunk of source) {
+                            size += chunk.length;
+                            hash.update(chunk);
+                            yield chunk;
+                        }
+                    },
+                    fs.createWriteStream(tmpPath)
+                ).then(() => {
+                    const stored = store.adopt(hash.digest('hex'), tmpPath, file.originalname);
+                    cb(null, {
+                        destination: store.uploadsDir,
+                        filename: stored.filename,
+                        path: path.join(store.uploadsDir, stored.filename),
+                        size,
+                        stored
+                    });
+                }).catch(err => {
+                    fs.unlink(tmpPath, () => cb(err));
+                });
+            },
+            _removeFile(req, file, cb) {
+                // Every upload (alias or not) has its own name; the bytes stay while another name links them
+                if (file.stored) store.release(file.stored.filename, file.stored.hash);
+                fs.unlink(file.path, cb);
+            }
+        };
+    }
+}
+
+function cutsKey(cuts) {
+    if (!cuts || cuts.length === 0) return 'full';
+    return cuts.map(c => `${c.start}-${c.end}`).join(',');
+}
+
+function processedKey(target, cuts) {
+    return `${target.tableName}:${target.contentId}:${target.videoType || ''}|${cutsKey(cuts)}`;
+}
+
+function makeChallenge(size) {
+    const length = Math.min(PROOF_RANGE_BYTES, size);
+    const ranges = [];
+    for (let i = 0; i < PROOF_RANGES; i++) {
+        ranges.push({ offset: crypto.randomInt(0, size - length + 1), length });
+    }
+    return { ranges };
+}
+
+async function hashRanges(filePath, ranges) {
+    const hash = crypto.createHash('sha256');
+    const file = await fs.promises.open(filePath, 'r');
+    try {
+        for (const { offset, length } of ranges) {
+            const buffer = Buffer.alloc(length);
+            const { bytesRead } = await file.read(buffer, 0, length, offset);
+            hash.update(buffer.subarray(0, bytesRead));
+        }
+    } finally {
+        await file.close();
+    }
+    return hash.digest('hex');
+}
+
+module.exports = { UploadStore, UploadError, cutsKey };
@@ -0,0 +1,301 @@
+const ffmpeg = require('fluent-ffmpeg');
+const ffprobeStatic = require('ffprobe-static');
+const crypto = require('crypto');
+const fs = require('fs');
+const path = require('path');
+const os = require('os');
+const { mapWithConcurrency } = require('./async-pool');
+
+/**
+ * ffprobe metadata with a persistent cache keyed by file content hash.
+ *
+ * Probe results live in <cacheDir>/<sha256>.json, so a file that is copied, renamed
+ * or re-uploaded is only ever probed once. An in-memory (path, size, mtime) index
+ * avoids re-hashing files that have not changed since the last lookup.
+ *
+ * Both are LRU-capped: the index by entry count, the cache directory by file count
+ * (a hit refreshes the cache file's mtime, and the oldest files are pruned first).
+ *
+ * Outputs that are themselves temporary (a job's final.mp4, a preview) can be recorded
+ * under an id in <cacheDir>/ids/<id>.json, so their metadata stays available after the
+ * temp-file GC has removed the video. Id records hold the summary itself and are pruned
+ * by the same file cap.
+ */
+
+ffmpeg.setFfprobePath(process.env.FFPROBE_PATH || ffprobeStatic.path);
+
+const DEFAULT_CACHE_DIR = path.join(__dirname, 'temp', 'probe-cache');
+const DEFAULT_CONCURRENCY = Math.max(2, Math.min(os.cpus().length, 8));
+const DEFAULT_MAX_INDEX_ENTRIES = 5000;
+const DEFAULT_MAX_CACHE_FILES = 20000;
+const PRUNE_EVERY_WRITES = 100;
+
+function hashFile(filePath) {
+    return new Promise((resolve, reject) => {
+        const hash = crypto.createHash('sha256');
+        fs.createReadStream(filePath, { highWaterMark: 1024 * 1024 })
+            .on('data', chunk => hash.update(chunk))
+            .on('end', () => resolve(hash.digest('hex')))
+            .on('error', reject);
+    });
+}
+
+function ffprobe(filePath) {
+    return new Promise((resolve, reject) => {
+        ffmpeg.ffprobe(filePath, (err, data) => (err ? reject(err) : resolve(data)));
+    });
+}
+
+function parseFrameRate(rate) {
+    if (!rate || rate === '0/0') return null;
+    const [num, den] = rate.split('/').map(Number);
+    return den ? Math.round((num / den) * 1000) / 1000 : num;
+}
+
+/**
+ * Reduce raw ffprobe output to the fields the API and audits use.
+ */
+function summarizeProbe(probe) {
+    const video = probe.streams.find(s => s.codec_type === 'video');
+    const audio = probe.streams.find(s => s.codec_type === 'audio');
+    const width = video?.width || null;
+    const height = video?.height || null;
+
+    return {
+        duration: Number(probe.format.duration) || 0,
+        format: probe.format.format_name,
+        size: Number(probe.format.size) || null,
+        bitRate: Number(probe.format.bit_rate) || null,
+        width,
+        height,
+        aspectRatio: width && height ? Math.round((width / height) * 1000) / 1000 : null,
+        videoCodec: video?.codec_name || null,
+        frameRate: parseFrameRate(video?.avg_frame_rate || video?.r_frame_rate),
+        audioCodec: audio?.codec_name || null
+    };
+}
+
+class VideoMetadataCache {
+    constructor({
+        cacheDir = DEFAULT_CACHE_DIR,
+        concurrency = DEFAULT_CONCURRENCY,
+        maxIndexEntries = DEFAULT_MAX_INDEX_ENTRIES,
+        maxCacheFiles = DEFAULT_MAX_CACHE_FILES
+    } = {}) {
+        this.cacheDir = cacheDir;
+        this.idsDir = path.join(cacheDir, 'ids');
+        this.concurrency = concurrency;
+        this.maxIndexEntries = maxIndexEntries;
+        this.maxCacheFiles = maxCacheFiles;
+        this.hashIndex = new Map(); // path -> { size, mtimeMs, hash }, least recently used first
+        this.inflight = new Map(); // hash -> Promise<metadata>
+        this.writesSincePrune = 0;
+        this.stats = { hits: 0, probes: 0, pruned: 0 };
+        fs.mkdirSync(this.idsDir, { recursive: true });
+    }
+
+    async contentHash(filePath) {
+        const stat = await fs.promises.stat(filePath);
+        const known = this.hashIndex.get(filePath);
+        this.hashIndex.delete(filePath);
+        if (known && known.size === stat.size && known.mtimeMs === stat.mtimeMs) {
+            this.hashIndex.set(filePath, known);
+            return known.hash;
+        }
+        const hash = await hashFile(filePath);
+        this.indexHash(filePath, stat, hash);
+        return hash;
+    }
+
+    indexHash(filePath, stat, hash) {
+        this.hashIndex.delete(filePath);
+        this.hashIndex.set(filePath, { size: stat.size, mtimeMs: stat.mtimeMs, hash });
+        // Map preserves insertion order, so the first keys are the least recently used
+        while (this.hashIndex.size > this.maxIndexEntries) {
+            this.hashIndex.delete(this.hashIndex.keys().next().value);
+        }
+    }
+
+    cachePath(hash) {
+        return path.join(this.cacheDir, `${hash}.json`);
+    }
+
+    async readCached(hash) {
+        try {
+            const metadata = JSON.parse(await fs.promises.readFile(this.cachePath(hash), 'utf8'));
+            // Refresh mtime so pruning treats this entry as recently used
+            const now = new Date();
+            await fs.promises.utimes(this.cachePath(hash), now, now).catch(() => {});
+            return metadata;
+        } catch (e) {
+            return null;
+        }
+    }
+
+    async writeCached(hash, metadata) {
+        await writeJson(this.cachePath(hash), metadata);
+        await this.countWrite();
+    }
+
+    async countWrite() {
+        if (++this.writesSincePrune >= PRUNE_EVERY_WRITES) {
+            this.writesSincePrune = 0;
+            await this.prune();
+        }
+    }
+
+    /**
+     * Delete the least recently used cache files and id records beyond maxCacheFiles each.
+     */
+    async prune() {
+        let pruned = 0;
+        for (const dir of [this.cacheDir, this.idsDir]) {
+            const names = (await fs.promises.readdir(dir).catch(() => [])).filter(n => n.endsWith('.json'));
+            if (names.length <= this.maxCacheFiles) continue;
+
+            const entries = await Promise.all(names.map(async name => {
+                const stat = await fs.promises.stat(path.join(dir, name)).catch(() => null);
+                return { name, mtimeMs: stat ? stat.mtimeMs : 0 };
+            }));
+            entries.sort((a, b) => a.mtimeMs - b.mtimeMs);
+
+            const excess = entries.slice(0, entries.length - this.maxCacheFiles);
+            for (const { name } of excess) {
+                await fs.promises.rm(path.join(dir, name), { force: true });
+            }
+            pruned += excess.length;
+        }
+        this.stats.pruned += pruned;
+        return pruned;
+    }
+
+    /**
+     * Metadata for a single file. Resolves to { hash, cached, ...summary }.
+     */
+    async get(filePath) {
+        const hash = await this.contentHash(filePath);
+
+        const cached = await this.readCached(hash);
+        if (cached) {
+            this.stats.hits++;
+            return { hash, cached: true, ...cached };
+        }
+
+        // Identical files requested concurrently share one ffprobe run
+        if (!this.inflight.has(hash)) {
+            this.inflight.set(hash, (async () => {
+                this.stats.probes++;
+                const metadata = summarizeProbe(await ffprobe(filePath));
+                await this.writeCached(hash, metadata);
+                return metadata;
+            })().finally(() => this.inflight.delete(hash)));
+        }
+
+        return { hash, cached: false, ...(await this.inflight.get(hash)) };
+    }
+
+    /**
+     * Metadata without reading the whole file to hash it, for one-off reads of large
+     * sources (e.g. the HLS ladder reading the source height). Goes through the cache when
+     * the content hash is already known, either passed in (the upload store's hash) or
+     * indexed from an earlier lookup; otherwise probes once without storing the result.
+     */
+    async getWithoutHashing(filePath, knownHash = null) {
+        if (knownHash) {
+            this.indexHash(filePath, await fs.promises.stat(filePath), knownHash);
+            return this.get(filePath);
+        }
+        const known = this.hashIndex.get(filePath);
+        if (known) {
+            const stat = await fs.promises.stat(filePath);
+            if (known.size === stat.size && known.mtimeMs === stat.mtimeMs) return this.get(filePath);
+        }
+        this.stats.probes++;
+        return { hash: null, cached: false, ...(await probeVideo(filePath)) };
+    }
+
+    /**
+     * Probe filePath through the cache and keep its summary under id, so recall(id)
+     * still answers once the file itself has been cleaned up.
+     */
+    async remember(id, filePath) {
+        const metadata = await this.get(filePath);
+        await writeJson(path.join(this.idsDir, `${id}.json`), metadata);
+        await this.countWrite();
+        return metadata;
+    }
+
+    /**
+     * Summary recorded by remember(id), or null.
+     */
+    async recall(id) {
+        if (!/^[\w-]+$/.test(id)) return null;
+        try {
+            return { ...JSON.parse(await fs.promises.readFile(path.join(this.idsDir, `${id}.json`), 'utf8')), cached: true };
+        } catch (e) {
+            return null;
+        }
+    }
+
+    /**
+     * Metadata for many files; uncached files are probed with bounded parallelism.
+     * Per-file failures are reported inline instead of failing the batch.
+     */
+    getMany(filePaths) {
+        return mapWithConcurrency(filePaths, this.concurrency, async filePath => {
+            try {
+                return { path: filePath, ...(await this.get(filePath)) };
+            } catch (err) {
+                return { path: filePath, error: err.message };
+            }
+        });
+    }
+}
+
+/**
+ * Uncached probe summary of one file.
+ */
+async function probeVideo(filePath) {
+    return summarizeProbe(await ffprobe(filePath));
+}
+
+// Write-then-rename so a crash never leaves a half-written cache entry
+async function writeJson(target, value) {
+    const tmp = `${target}.${process.pid}.tmp`;
+    await fs.promises.writeFile(tmp, JSON.stringify(value));
+    await fs.promises.rename(tmp, target);
+}
+
+module.exports = { VideoMetadataCache, summarizeProbe, hashFile, probeVideo };
+
+// CLI: node video-metadata.js <dir-or-file>... (duration / aspect-ratio audit over local files)
+if (require.main === module) {
+    const targets = process.argv.slice(2);
+    if (targets.length === 0) {
+        console.error('Usage: node video-metadata.js <dir-or-file>...');
+        process.exit(1);
+    }
+
+    const files = targets.flatMap(target => (
+        fs.statSync(target).isDirectory()
+            ? fs.readdirSync(target).filter(f => /\.(mp4|mov|mkv|webm|m4v)$/i.test(f)).map(f => path.join(target, f))
+            : [target]
+    ));
+
+    const cache = new VideoMetadataCache();
+    const started = Date.now();
+    cache.getMany(files).then(results => {
+        for (const r of results) {
+            if (r.error) {
+                console.log(`[${path.basename(r.path)}] ERROR: ${r.error}`);
+                continue;
+            }
+            const is16_9 = r.aspectRatio && Math.abs(r.aspectRatio - (16 / 9)) < 0.05;
+            console.log(`[${path.basename(r.path)}] ${r.duration.toFixed(1)}s ${r.width}x${r.height} ${is16_9 ? '✅ 16:9' : `⚠️ ${r.aspectRatio}`}${r.cached ? ' (cached)' : ''}`);
+        }
+        console.log(`\n${results.length} files, ${cache.stats.probes} probed, ${cache.stats.hits} cached, ${Date.now() - started}ms`);
+    }).catch(err => {
+        console.error('Metadata audit failed:', err);
+        process.exit(1);
+    });
+}
@@ -19,6 +19,7 @@ export const PayoutSettingsTab: React.FC = () => {
     const [accountNumber, setAccountNumber] = useState('');
     const [accountHolder, setAccountHolder] = useState('');
     const [residentRegistrationNumber, setResidentRegistrationNumber] = useState('');
+    const [portonePhone, setPortonePhone] = useState('');
 
     // PayPal fields
     const [paypalEmail, setPaypalEmail] = useState('');
@@ -46,6 +47,7 @@ export const PayoutSettingsTab: React.FC = () => {
                     setAccountNumber(data.payoutSettings.accountNumber || '');
                     setAccountHolder(data.payoutSettings.accountHolder || '');
                     setResidentRegistrationNumber(data.payoutSettings.residentRegistrationNumber || '');
+                    setPortonePhone(data.payoutSettings.portonePhone || '');
 
                     // Load PayPal info
                     setPaypalEmail(data.payoutSettings.paypalEmail || data.payoutSettings.wiseEmail || '');
@@ -73,6 +75,7 @@ export const PayoutSettingsTab: React.FC = () => {
                 accountNumber,
                 accountHolder,
                 residentRegistrationNumber,
+                portonePhone,
                 // PayPal fields
                 paypalEmail,
                 isKoreanResident
@@ -211,6 +214,19 @@ export const PayoutSettingsTab: React.FC = () => {
                                 3.3% 사업소득세 원천징수 신고를 위해 필요합니다.
                             </p>
                         </div>
+
+                        <div>
+                            <label className="block text-sm font-medium text-zinc-300 mb-2">
+                                휴대폰 번호 (Portone 정산)
+                            </label>
+                            <input
+                                type="tel"
+                                value={portonePhone}
+                                onChange={(e) => setPortonePhone(e.target.value)}
+                                placeholder="예: 010-1234-5678"
+                                className="w-full px-4 py-2 bg-zinc-900/50 border border-zinc-700 rounded-lg text-white focus:outline-none focus:ring-2 focus:ring-violet-500"
+                            />
+                        </div>
                     </div>
                 </div>
             ) : (
@@ -1913,6 +1913,7 @@ export async function updatePayoutSettings(
         accountNumber?: string;
         accountHolder?: string;
         residentRegistrationNumber?: string; // For tax withholding (3.3%)
+        portonePhone?: string; // Portone payouts are sent to this number
     }
 ) {
     const { error } = await supabase
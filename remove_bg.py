@@ -22,10 +22,11 @@ def remove_background(input_path, output_path):
     except Exception as e:
         print(f"Error: {e}")
 
-input_path = "public/logo_v2.png"
-output_path = "public/logo_v2_final.png"
+if __name__ == "__main__":
+    input_path = "public/logo_v2.png"
+    output_path = "public/logo_v2_final.png"
 
-if os.path.exists(input_path):
-    remove_background(input_path, output_path)
-else:
-    print(f"Input file not found: {input_path}")
+    if os.path.exists(input_path):
+        remove_background(input_path, output_path)
+    else:
+        print(f"Input file not found: {input_path}")
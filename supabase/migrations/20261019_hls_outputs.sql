@@ -0,0 +1,26 @@
+-- HLS ladder output for /process (outputMode: 'hls')
+-- The backend writes playlists and CMAF segments to the hls_videos bucket with the service role
+-- and stores the master playlist URL on the content row.
+
+ALTER TABLE lessons ADD COLUMN IF NOT EXISTS hls_url TEXT;
+ALTER TABLE drills ADD COLUMN IF NOT EXISTS hls_url TEXT;
+ALTER TABLE sparring_videos ADD COLUMN IF NOT EXISTS hls_url TEXT;
+ALTER TABLE courses ADD COLUMN IF NOT EXISTS hls_url TEXT;
+
+insert into storage.buckets (id, name, public, file_size_limit, allowed_mime_types)
+values (
+    'hls_videos',
+    'hls_videos',
+    true,
+    null,
+    '{application/vnd.apple.mpegurl,video/iso.segment,video/mp4}'
+)
+on conflict (id) do update
+set public = true,
+    allowed_mime_types = '{application/vnd.apple.mpegurl,video/iso.segment,video/mp4}';
+
+-- Players fetch playlists and segments anonymously; only the service role writes
+drop policy if exists "Public Select hls" on storage.objects;
+create policy "Public Select hls"
+on storage.objects for select
+using ( bucket_id = 'hls_videos' );
@@ -0,0 +1,19 @@
+-- Multi-currency / multi-provider payout requests (PayPal for USD, Portone for KRW)
+ALTER TABLE payout_requests
+ADD COLUMN IF NOT EXISTS currency TEXT NOT NULL DEFAULT 'KRW',
+ADD COLUMN IF NOT EXISTS payment_method TEXT,
+ADD COLUMN IF NOT EXISTS paypal_email TEXT,
+ADD COLUMN IF NOT EXISTS portone_phone TEXT;
+
+-- Allow 'processing' while an admin settlement run is in flight
+ALTER TABLE payout_requests DROP CONSTRAINT IF EXISTS payout_requests_status_check;
+ALTER TABLE payout_requests
+ADD CONSTRAINT payout_requests_status_check
+CHECK (status IN ('pending', 'processing', 'completed', 'rejected'));
+
+-- Settlement export reads pending requests ordered by (currency, payment_method)
+CREATE INDEX IF NOT EXISTS idx_payout_requests_settlement
+ON payout_requests (status, currency, payment_method, requested_at, id);
+
+COMMENT ON COLUMN payout_requests.currency IS 'ISO currency code: USD, KRW';
+COMMENT ON COLUMN payout_requests.payment_method IS 'Payout provider: PayPal, Portone';
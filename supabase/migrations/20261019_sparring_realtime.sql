@@ -0,0 +1,14 @@
+-- Publish sparring_videos changes so the backend can invalidate its public feed cache
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_publication_tables
+        WHERE pubname = 'supabase_realtime' AND schemaname = 'public' AND tablename = 'sparring_videos'
+    ) THEN
+        ALTER PUBLICATION supabase_realtime ADD TABLE sparring_videos;
+    END IF;
+END $$;
+
+-- Cursor pagination for /api/sparring/public orders by (created_at, id)
+CREATE INDEX IF NOT EXISTS idx_sparring_videos_created_at_id
+ON sparring_videos (created_at DESC, id DESC);
@@ -0,0 +1,99 @@
+-- Backend (service role) payout submission with the same guarantees as submit_payout_request:
+-- balance check, 10,000 KRW minimum and a negative revenue_ledger entry that locks the funds.
+-- The ledger is kept in KRW, so each item carries ledger_amount (KRW) alongside the payout
+-- amount in its own currency.
+
+-- 1. Submit one or more requests; each item succeeds or fails on its own
+--    [{ "creator_id", "amount", "currency", "payment_method", "paypal_email", "portone_phone", "ledger_amount" }]
+CREATE OR REPLACE FUNCTION submit_creator_payout_requests(p_requests jsonb)
+RETURNS json
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    v_item jsonb;
+    v_index int := 0;
+    v_creator_id uuid;
+    v_ledger_amount numeric;
+    v_request_id uuid;
+    v_results jsonb := '[]'::jsonb;
+BEGIN
+    FOR v_item IN SELECT value FROM jsonb_array_elements(p_requests) LOOP
+        BEGIN
+            v_creator_id := (v_item->>'creator_id')::uuid;
+            v_ledger_amount := (v_item->>'ledger_amount')::numeric;
+
+            -- Serialize submissions per creator so concurrent calls cannot spend the same balance twice
+            PERFORM 1 FROM creators WHERE id = v_creator_id FOR UPDATE;
+            IF NOT FOUND THEN
+                RAISE EXCEPTION 'Creator profile not found';
+            END IF;
+
+            IF v_ledger_amount IS NULL OR v_ledger_amount < 10000 THEN
+                RAISE EXCEPTION 'Minimum payout amount is 10,000 KRW';
+            END IF;
+
+            IF get_creator_balance(v_creator_id) < v_ledger_amount THEN
+                RAISE EXCEPTION 'Insufficient balance';
+            END IF;
+
+            INSERT INTO payout_requests (creator_id, amount, currency, payment_method, paypal_email, portone_phone, status)
+            VALUES (
+                v_creator_id,
+                (v_item->>'amount')::numeric,
+                v_item->>'currency',
+                v_item->>'payment_method',
+                v_item->>'paypal_email',
+                v_item->>'portone_phone',
+                'pending'
+            ) RETURNING id INTO v_request_id;
+
+            -- Lock Funds in Ledger (Negative Entry)
+            INSERT INTO revenue_ledger (
+                creator_id, amount, revenue_type, product_type, description, status, recognition_date, payout_request_id
+            ) VALUES (
+                v_creator_id, -v_ledger_amount, 'withdrawal', 'withdrawal', 'Payout Request ' || v_request_id,
+                'pending', CURRENT_DATE, v_request_id
+            );
+
+            v_results := v_results || jsonb_build_object('index', v_index, 'status', 'created', 'id', v_request_id);
+        EXCEPTION WHEN OTHERS THEN
+            v_results := v_results || jsonb_build_object('index', v_index, 'status', 'failed', 'error', SQLERRM);
+        END;
+        v_index := v_index + 1;
+    END LOOP;
+
+    RETURN v_results::json;
+END;
+$$;
+
+-- 2. Cancel one creator's pending requests and release their locked funds
+--    (ledger rows first: they reference the request). Ids of other creators are ignored.
+DROP FUNCTION IF EXISTS cancel_creator_payout_requests(uuid[]);
+CREATE OR REPLACE FUNCTION cancel_creator_payout_requests(p_creator_id uuid, p_ids uuid[])
+RETURNS integer
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    v_deleted int;
+BEGIN
+    DELETE FROM revenue_ledger
+    WHERE payout_request_id IN (
+        SELECT id FROM payout_requests WHERE id = ANY(p_ids) AND creator_id = p_creator_id AND status = 'pending'
+    );
+
+    WITH d AS (
+        DELETE FROM payout_requests
+        WHERE id = ANY(p_ids) AND creator_id = p_creator_id AND status = 'pending'
+        RETURNING 1
+    ) SELECT count(*) INTO v_deleted FROM d;
+
+    RETURN v_deleted;
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION submit_creator_payout_requests(jsonb) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION cancel_creator_payout_requests(uuid, uuid[]) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION submit_creator_payout_requests(jsonb) TO service_role;
+GRANT EXECUTE ON FUNCTION cancel_creator_payout_requests(uuid, uuid[]) TO service_role;
@@ -0,0 +1,249 @@
+-- Bulk seeding and namespaced teardown for the API test suite (testsprite_tests/fixtures.py)
+-- Every seeded row is recorded in test_fixture_rows so a wipe only ever touches fixture data.
+
+CREATE TABLE IF NOT EXISTS test_fixture_rows (
+    namespace TEXT NOT NULL,
+    table_name TEXT NOT NULL,
+    row_id UUID NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (namespace, table_name, row_id)
+);
+
+-- No policies: only the service role (backend) can read or write fixture bookkeeping
+ALTER TABLE test_fixture_rows ENABLE ROW LEVEL SECURITY;
+
+-- 1. Seed a named dataset in one transaction
+--    users_with_subscriptions   { "users": 10, "plan_interval": "month", "amount": 29000, "admin": false, "subscribed": true }
+--    creators_with_transactions { "creators": 3, "transactions": 20, "amount": 10000, "creator_share": 0.8 }
+--    content_with_videos        { "creators": 1, "lessons": 5, "drills": 5, "sparring": 5 }
+CREATE OR REPLACE FUNCTION seed_test_fixture(p_namespace text, p_dataset text, p_params jsonb DEFAULT '{}'::jsonb)
+RETURNS json
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    v_creators int := COALESCE((p_params->>'creators')::int, 1);
+    v_result json;
+BEGIN
+    IF p_namespace !~ '^[a-z0-9_-]{1,64}$' THEN
+        RAISE EXCEPTION 'Invalid fixture namespace: %', p_namespace;
+    END IF;
+
+    IF p_dataset = 'users_with_subscriptions' THEN
+        WITH new_users AS (
+            INSERT INTO auth.users (id, instance_id, aud, role, email, encrypted_password,
+                                    email_confirmed_at, created_at, updated_at, raw_app_meta_data, raw_user_meta_data)
+            SELECT uuid_generate_v4(), '00000000-0000-0000-0000-000000000000', 'authenticated', 'authenticated',
+                   p_namespace || '+' || g || '@fixtures.grapplay.test', '', NOW(), NOW(), NOW(),
+                   '{"provider":"email","providers":["email"]}'::jsonb,
+                   jsonb_build_object('fixture_namespace', p_namespace)
+            FROM generate_series(1, COALESCE((p_params->>'users')::int, 10)) g
+            RETURNING id
+        )
+        INSERT INTO test_fixture_rows (namespace, table_name, row_id)
+        SELECT p_namespace, 'auth.users', id FROM new_users;
+
+        -- public.users is normally filled by the on_auth_user_created trigger
+        INSERT INTO users (id, email, is_subscriber, is_admin)
+        SELECT u.id, u.email, COALESCE((p_params->>'subscribed')::boolean, true), COALESCE((p_params->>'admin')::boolean, false)
+        FROM auth.users u
+        JOIN test_fixture_rows f ON f.row_id = u.id AND f.namespace = p_namespace AND f.table_name = 'auth.users'
+        ON CONFLICT (id) DO UPDATE SET is_subscriber = EXCLUDED.is_subscriber, is_admin = EXCLUDED.is_admin;
+
+        WITH new_subscriptions AS (
+            INSERT INTO subscriptions (user_id, plan_interval, amount, status, current_period_start, current_period_end)
+            SELECT f.row_id,
+                   COALESCE(p_params->>'plan_interval', 'month'),
+                   COALESCE((p_params->>'amount')::int, 29000),
+                   'active',
+                   NOW(),
+                   NOW() + CASE WHEN p_params->>'plan_interval' = 'year' THEN INTERVAL '1 year' ELSE INTERVAL '1 month' END
+            FROM test_fixture_rows f
+            WHERE f.namespace = p_namespace AND f.table_name = 'auth.users'
+              AND COALESCE((p_params->>'subscribed')::boolean, true)  -- subscribed=false seeds users who have yet to pay
+            RETURNING id
+        )
+        INSERT INTO test_fixture_rows (namespace, table_name, row_id)
+        SELECT p_namespace, 'subscriptions', id FROM new_subscriptions;
+
+    ELSIF p_dataset = 'creators_with_transactions' THEN
+        -- Creators are signed-in users (creators.id = auth uid), so tests can act as them
+        WITH new_users AS (
+            INSERT INTO auth.users (id, instance_id, aud, role, email, encrypted_password,
+                                    email_confirmed_at, created_at, updated_at, raw_app_meta_data, raw_user_meta_data)
+            SELECT uuid_generate_v4(), '00000000-0000-0000-0000-000000000000', 'authenticated', 'authenticated',
+                   p_namespace || '+creator' || g || '@fixtures.grapplay.test', '', NOW(), NOW(), NOW(),
+                   '{"provider":"email","providers":["email"]}'::jsonb,
+                   jsonb_build_object('fixture_namespace', p_namespace)
+            FROM generate_series(1, v_creators) g
+            RETURNING id
+        )
+        INSERT INTO test_fixture_rows (namespace, table_name, row_id)
+        SELECT p_namespace, 'auth.users', id FROM new_users;
+
+        INSERT INTO users (id, email)
+        SELECT u.id, u.email
+        FROM auth.users u
+        JOIN test_fixture_rows f ON f.row_id = u.id AND f.namespace = p_namespace AND f.table_name = 'auth.users'
+        ON CONFLICT (id) DO NOTHING;
+
+        WITH new_creators AS (
+            INSERT INTO creators (id, name, bio, approved, payout_settings)
+            SELECT f.row_id, 'Fixture Creator ' || p_namespace || ' ' || f.n, 'Seeded test creator', true,
+                   jsonb_build_object('bankName', 'Fixture Bank', 'accountNumber', '000-' || f.n, 'accountHolder', 'Fixture ' || f.n,
+                                      'paypalEmail', p_namespace || '+creator' || f.n || '@fixtures.grapplay.test',
+                                      'portonePhone', '010-0000-' || lpad(f.n::text, 4, '0'))
+            FROM (
+                SELECT row_id, row_number() OVER (ORDER BY created_at, row_id) AS n
+                FROM test_fixture_rows
+                WHERE namespace = p_namespace AND table_name = 'auth.users'
+            ) f
+            RETURNING id
+        )
+        INSERT INTO test_fixture_rows (namespace, table_name, row_id)
+        SELECT p_namespace, 'creators', id FROM new_creators;
+
+        WITH new_ledger AS (
+            INSERT INTO revenue_ledger (creator_id, amount, creator_revenue, platform_fee, product_type, status, recognition_date)
+            SELECT f.row_id,
+                   COALESCE((p_params->>'amount')::int, 10000),
+                   ROUND(COALESCE((p_params->>'amount')::int, 10000) * COALESCE((p_params->>'creator_share')::numeric, 0.8)),
+                   COALESCE((p_params->>'amount')::int, 10000)
+                       - ROUND(COALESCE((p_params->>'amount')::int, 10000) * COALESCE((p_params->>'creator_share')::numeric, 0.8)),
+                   'subscription',
+                   'processed',
+                   CURRENT_DATE - (g % 28)
+            FROM test_fixture_rows f
+            CROSS JOIN generate_series(1, COALESCE((p_params->>'transactions')::int, 20)) g
+            WHERE f.namespace = p_namespace AND f.table_name = 'creators'
+            RETURNING id
+        )
+        INSERT INTO test_fixture_rows (namespace, table_name, row_id)
+        SELECT p_namespace, 'revenue_ledger', id FROM new_ledger;
+
+    ELSIF p_dataset = 'content_with_videos' THEN
+        WITH new_creators AS (
+            INSERT INTO creators (name, bio, approved)
+            SELECT 'Fixture Creator ' || p_namespace || ' ' || g, 'Seeded test creator', true
+            FROM generate_series(1, v_creators) g
+            RETURNING id
+        )
+        INSERT INTO test_fixture_rows (namespace, table_name, row_id)
+        SELECT p_namespace, 'creators', id FROM new_creators;
+
+        WITH new_courses AS (
+            INSERT INTO courses (title, description, creator_id)
+            SELECT 'Fixture Course ' || p_namespace, 'Seeded test course', f.row_id
+            FROM test_fixture_rows f
+            WHERE f.namespace = p_namespace AND f.table_name = 'creators'
+            RETURNING id
+        )
+        INSERT INTO test_fixture_rows (namespace, table_name, row_id)
+        SELECT p_namespace, 'courses', id FROM new_courses;
+
+        WITH new_lessons AS (
+            INSERT INTO lessons (title, course_id, lesson_number, vimeo_url, length)
+            SELECT 'Fixture Lesson ' || g, f.row_id, g, 'fixture-vimeo-' || g, '1:00'
+            FROM test_fixture_rows f
+            CROSS JOIN generate_series(1, COALESCE((p_params->>'lessons')::int, 5)) g
+            WHERE f.namespace = p_namespace AND f.table_name = 'courses'
+            RETURNING id
+        )
+        INSERT INTO test_fixture_rows (namespace, table_name, row_id)
+        SELECT p_namespace, 'lessons', id FROM new_lessons;
+
+        WITH new_drills AS (
+            INSERT INTO drills (title, creator_id, vimeo_url, description_video_url)
+            SELECT 'Fixture Drill ' || g, f.row_id, 'fixture-mux-' || g, 'fixture-mux-desc-' || g
+            FROM test_fixture_rows f
+            CROSS JOIN generate_series(1, COALESCE((p_params->>'drills')::int, 5)) g
+            WHERE f.namespace = p_namespace AND f.table_name = 'creators'
+            RETURNING id
+        )
+        INSERT INTO test_fixture_rows (namespace, table_name, row_id)
+        SELECT p_namespace, 'drills', id FROM new_drills;
+
+        WITH new_sparring AS (
+            INSERT INTO sparring_videos (title, creator_id, video_url, is_published)
+            SELECT 'Fixture Sparring ' || g, f.row_id, 'fixture-vimeo-sparring-' || g, true
+            FROM test_fixture_rows f
+            CROSS JOIN generate_series(1, COALESCE((p_params->>'sparring')::int, 5)) g
+            WHERE f.namespace = p_namespace AND f.table_name = 'creators'
+            RETURNING id
+        )
+        INSERT INTO test_fixture_rows (namespace, table_name, row_id)
+        SELECT p_namespace, 'sparring_videos', id FROM new_sparring;
+
+    ELSE
+        RAISE EXCEPTION 'Unknown fixture dataset: %', p_dataset;
+    END IF;
+
+    SELECT json_object_agg(table_name, ids) INTO v_result
+    FROM (
+        SELECT table_name, json_agg(row_id ORDER BY created_at, row_id) AS ids
+        FROM test_fixture_rows
+        WHERE namespace = p_namespace
+        GROUP BY table_name
+    ) t;
+
+    RETURN json_build_object('namespace', p_namespace, 'dataset', p_dataset, 'ids', COALESCE(v_result, '{}'::json));
+END;
+$$;
+
+-- 2. Wipe everything seeded under a namespace, plus rows the tests created against fixture creators
+CREATE OR REPLACE FUNCTION wipe_test_fixture(p_namespace text)
+RETURNS json
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    -- Children before parents
+    v_tables text[] := ARRAY['revenue_ledger', 'subscriptions', 'sparring_videos', 'drills', 'lessons',
+                             'courses', 'creators', 'users', 'auth.users'];
+    v_table text;
+    v_deleted int;
+    v_counts jsonb := '{}'::jsonb;
+BEGIN
+    -- Rows created through the API during the test (payout requests, ledger entries) hang off fixture creators.
+    -- revenue_ledger.payout_request_id references payout_requests, so ledger rows linked to those
+    -- requests (withdrawal locks, and any fixture-seeded row pointing at one) go first
+    DELETE FROM revenue_ledger
+    WHERE payout_request_id IN (
+        SELECT id FROM payout_requests
+        WHERE creator_id IN (SELECT row_id FROM test_fixture_rows WHERE namespace = p_namespace AND table_name = 'creators')
+    );
+
+    WITH d AS (
+        DELETE FROM payout_requests
+        WHERE creator_id IN (SELECT row_id FROM test_fixture_rows WHERE namespace = p_namespace AND table_name = 'creators')
+        RETURNING 1
+    ) SELECT count(*) INTO v_deleted FROM d;
+    v_counts := v_counts || jsonb_build_object('payout_requests', v_deleted);
+
+    DELETE FROM revenue_ledger
+    WHERE creator_id IN (SELECT row_id FROM test_fixture_rows WHERE namespace = p_namespace AND table_name = 'creators')
+      AND id NOT IN (SELECT row_id FROM test_fixture_rows WHERE namespace = p_namespace AND table_name = 'revenue_ledger');
+
+    -- Subscriptions bought through the API by fixture users
+    DELETE FROM subscriptions
+    WHERE user_id IN (SELECT row_id FROM test_fixture_rows WHERE namespace = p_namespace AND table_name = 'auth.users')
+      AND id NOT IN (SELECT row_id FROM test_fixture_rows WHERE namespace = p_namespace AND table_name = 'subscriptions');
+
+    FOREACH v_table IN ARRAY v_tables LOOP
+        EXECUTE format(
+            'WITH d AS (DELETE FROM %s WHERE id IN (SELECT row_id FROM test_fixture_rows WHERE namespace = $1 AND table_name = $2) RETURNING 1) SELECT count(*) FROM d',
+            v_table
+        ) INTO v_deleted USING p_namespace, CASE WHEN v_table = 'users' THEN 'auth.users' ELSE v_table END;
+        v_counts := v_counts || jsonb_build_object(v_table, v_deleted);
+    END LOOP;
+
+    DELETE FROM test_fixture_rows WHERE namespace = p_namespace;
+
+    RETURN json_build_object('namespace', p_namespace, 'deleted', v_counts);
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION seed_test_fixture(text, text, jsonb) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION wipe_test_fixture(text) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION seed_test_fixture(text, text, jsonb) TO service_role;
+GRANT EXECUTE ON FUNCTION wipe_test_fixture(text) TO service_role;
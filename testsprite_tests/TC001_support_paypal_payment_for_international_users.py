@@ -1,42 +1,29 @@
 import requests
-import uuid
 import time
 
+from fixtures import seeded
+
 BASE_URL = "http://localhost:8080"
 TIMEOUT = 30
 
-# Dummy auth token for the test, replace with valid token in real scenario
-AUTH_TOKEN = "Bearer test-auth-token-for-international-user"
-
-headers = {
-    "Authorization": AUTH_TOKEN,
-    "Content-Type": "application/json",
-    "Accept": "application/json"
-}
 
 def test_paypal_payment_for_international_users():
-    user_id = None
+    # Step 1: A signed-in user without a subscription; the fixture wipe removes the user
+    # and anything bought during the test (backend needs ENABLE_TEST_FIXTURES=1)
+    with seeded("users_with_subscriptions", base_url=BASE_URL, users=1, subscribed=False) as fixture:
+        user_id = fixture.ids["auth.users"][0]
+        headers = {
+            **fixture.auth_headers(user_id),
+            "Content-Type": "application/json",
+            "Accept": "application/json"
+        }
+        run_paypal_payment(user_id, headers)
+
+
+def run_paypal_payment(user_id, headers):
     subscription_id = None
 
     try:
-        # Step 1: Create a new international user (simulate)
-        create_user_payload = {
-            "username": f"testuser_{uuid.uuid4()}",
-            "email": f"testuser_{uuid.uuid4()}@example.com",
-            "country": "US",
-            "password": "TestPass123!"  # Added required password field
-        }
-        resp_create_user = requests.post(
-            f"{BASE_URL}/users",
-            json=create_user_payload,
-            headers=headers,
-            timeout=TIMEOUT,
-        )
-        assert resp_create_user.status_code == 201, f"User creation failed: {resp_create_user.text}"
-        user_data = resp_create_user.json()
-        user_id = user_data.get("id")
-        assert user_id is not None, "User ID should be returned after creation"
-
         # Step 2: Initiate a PayPal payment for subscription purchase
         payment_payload = {
             "user_id": user_id,
@@ -91,7 +78,7 @@ def test_paypal_payment_for_international_users():
         assert subscription_id is not None, "Subscription ID should be present"
 
     finally:
-        # Cleanup: Delete subscription and user created during test
+        # Cleanup: Delete the subscription created during the test (the user goes with the fixture)
         if subscription_id:
             try:
                 requests.delete(
@@ -101,14 +88,5 @@ def test_paypal_payment_for_international_users():
                 )
             except Exception:
                 pass
-        if user_id:
-            try:
-                requests.delete(
-                    f"{BASE_URL}/users/{user_id}",
-                    headers=headers,
-                    timeout=TIMEOUT
-                )
-            except Exception:
-                pass
 
 test_paypal_payment_for_international_users()
@@ -1,29 +1,17 @@
 import requests
-import uuid
+
+from fixtures import seeded
 
 BASE_URL = "http://localhost:8080"
 TIMEOUT = 30
-HEADERS = {
-    "Content-Type": "application/json",
-    # Add authorization header here if required, e.g.:
-    # "Authorization": "Bearer <token>"
-}
+
 
 def test_support_portone_payment_for_domestic_korean_users():
-    user_id = None
-    subscription_id = None
-    try:
-        # Step 1: Create a Korean domestic user (assuming an endpoint exists)
-        user_payload = {
-            "username": f"testuser_{uuid.uuid4().hex[:8]}",
-            "email": f"testuser_{uuid.uuid4().hex[:8]}@korea.kr",
-            "country": "KR"
-        }
-        res_user = requests.post(f"{BASE_URL}/users", json=user_payload, headers=HEADERS, timeout=TIMEOUT)
-        assert res_user.status_code == 201, f"User creation failed: {res_user.text}"
-        user = res_user.json()
-        user_id = user.get("id")
-        assert user_id, "User ID not returned after user creation"
+    # Step 1: A signed-in user without a subscription; the fixture wipe removes the user
+    # and the subscription the payment creates (backend needs ENABLE_TEST_FIXTURES=1)
+    with seeded("users_with_subscriptions", base_url=BASE_URL, users=1, subscribed=False) as fixture:
+        user_id = fixture.ids["auth.users"][0]
+        HEADERS = {**fixture.auth_headers(user_id), "Content-Type": "application/json"}
 
         # Step 2: Initiate a payment using Portone for subscription/content purchase
         payment_payload = {
@@ -62,12 +50,5 @@ def test_support_portone_payment_for_domestic_korean_users():
         assert status_data.get("active") is True, "User subscription status not active after payment"
         assert status_data.get("subscription_type") == "premium_monthly", "Subscription type mismatch"
 
-    finally:
-        # Cleanup: Delete the created user and related subscriptions or payments if possible
-        if user_id:
-            try:
-                requests.delete(f"{BASE_URL}/users/{user_id}", headers=HEADERS, timeout=TIMEOUT)
-            except Exception:
-                pass
 
 test_support_portone_payment_for_domestic_korean_users()
\ No newline at end of file
@@ -1,5 +1,6 @@
 import requests
 import os
+from video_fixtures import get_preset
 
 BASE_URL = "http://localhost:8080"
 TIMEOUT = 30
@@ -17,9 +18,10 @@ def test_upload_raw_video_to_supabase_storage():
     if AUTH_TOKEN:
         headers["Authorization"] = f"Bearer {AUTH_TOKEN}"
 
-    # Sample raw video content for upload - using bytes for test (simulate a small video file)
+    # Small but real, decodable video generated locally with ffmpeg (cached between runs)
     video_filename = "test_video.mp4"
-    video_content = b'\x00\x00\x00\x14ftypiso6\x00\x00\x00\x00iso6mp41'  # minimal mp4 header bytes
+    with open(get_preset("tiny"), "rb") as f:
+        video_content = f.read()
 
     # Endpoint to upload raw videos to Supabase storage
     # Assuming the API endpoint POST /storage/upload accepts multipart file upload and query param for bucket
@@ -1,5 +1,6 @@
 import requests
 import os
+from video_fixtures import get_preset
 
 BASE_URL = "http://localhost:8080"
 TIMEOUT = 30
@@ -23,7 +24,7 @@ def test_upload_processed_video_to_vimeo_and_update_db():
         payload = {
             "title": "Test Processed Video",
             "description": "Video processed for upload test",
-            "file_path": "test_processed_video.mp4"  # Assuming file already processed and available
+            "file_path": get_preset("tiny")  # Real, locally generated synthetic video
         }
         resp = requests.post(f"{BASE_URL}/videos/processed", json=payload, headers=headers, timeout=TIMEOUT)
         resp.raise_for_status()
@@ -1,16 +1,10 @@
 import requests
-import os
+
+from fixtures import seeded
 
 BASE_URL = "http://localhost:8080"
 TIMEOUT = 30
 
-# Assuming authentication is required, we get an auth token from env variables
-AUTH_TOKEN = os.getenv("AUTH_TOKEN", "test-auth-token")
-
-HEADERS = {
-    "Authorization": f"Bearer {AUTH_TOKEN}",
-    "Content-Type": "application/json"
-}
 
 def test_TC009_view_revenue_according_to_predefined_share_ratios():
     """
@@ -19,56 +13,13 @@ def test_TC009_view_revenue_according_to_predefined_share_ratios():
     processing have been done beforehand.
     """
 
-    # Step 1: Identify or create a creator resource for the test
-    creator_id = None
-    try:
-        # Create a test creator to ensure isolated data and correct RLS enforcement
-        create_creator_resp = requests.post(
-            f"{BASE_URL}/api/creators",
-            headers=HEADERS,
-            json={
-                "name": "Test Creator Revenue",
-                "email": "testcreator_revenue@example.com"
-            },
-            timeout=TIMEOUT
-        )
-        assert create_creator_resp.status_code == 201, f"Failed to create test creator: {create_creator_resp.text}"
-        creator_data = create_creator_resp.json()
-        creator_id = creator_data.get("id")
-        assert creator_id, "Creator ID missing in creation response"
-
-        # Step 2: Simulate revenues records (normally this would be set up in fixtures or the test DB).
-        # For testing purpose, create some payment transactions that represent revenue distribution with 8:2 split.
-        # Assume API supports adding test revenue entries for creators at /api/creators/{id}/revenues
-
-        # Total revenue example 1000; creator share 80%, platform share 20%
-
-        revenue_payload = {
-            "transactions": [
-                {
-                    "payment_method": "PayPal",
-                    "total_amount": 1000,
-                    "creator_share_ratio": 0.8,
-                    "platform_share_ratio": 0.2,
-                    "status": "completed"
-                },
-                {
-                    "payment_method": "Portone",
-                    "total_amount": 500,
-                    "creator_share_ratio": 0.8,
-                    "platform_share_ratio": 0.2,
-                    "status": "completed"
-                }
-            ]
-        }
-
-        add_revenue_resp = requests.post(
-            f"{BASE_URL}/api/creators/{creator_id}/revenues",
-            headers=HEADERS,
-            json=revenue_payload,
-            timeout=TIMEOUT
-        )
-        assert add_revenue_resp.status_code == 201, f"Failed to add revenue transactions: {add_revenue_resp.text}"
+    # Step 1-2: Seed isolated creators with completed revenue at an 8:2 split (backend needs ENABLE_TEST_FIXTURES=1).
+    # Each creator gets 3 ledger entries of 500: total revenue 1500; creator share 80%, platform share 20%.
+    # The second creator is only used for the RLS check; the fixture wipe removes all of it.
+    with seeded("creators_with_transactions", base_url=BASE_URL, creators=2, transactions=3,
+                 amount=500, creator_share=0.8) as fixture:
+        creator_id, other_creator_id = fixture.ids["creators"]
+        HEADERS = {**fixture.auth_headers(creator_id), "Content-Type": "application/json"}
 
         # Step 3: Query the revenue summary endpoint that returns revenue calculated according to the share ratios
         revenue_view_resp = requests.get(
@@ -80,8 +31,8 @@ def test_TC009_view_revenue_according_to_predefined_share_ratios():
         revenue_summary = revenue_view_resp.json()
 
         # Validate revenue breakdown matches 8:2 share ratio calculation
-        # Expected creator revenue: (1000 * 0.8) + (500 * 0.8) = 1200
-        # Expected platform revenue: (1000 * 0.2) + (500 * 0.2) = 300
+        # Expected creator revenue: 3 * (500 * 0.8) = 1200
+        # Expected platform revenue: 3 * (500 * 0.2) = 300
 
         expected_creator_revenue = 1200
         expected_platform_revenue = 300
@@ -100,27 +51,20 @@ def test_TC009_view_revenue_according_to_predefined_share_ratios():
             f"Platform revenue expected {expected_platform_revenue}, got {actual_platform_revenue}"
         )
 
-        # Step 4: Validate RLS policy by attempting to access revenue with a different user token (simulate by omitting auth or using a bad token)
+        # Step 4: Validate RLS policy by attempting to access revenue with a bad token and as a different creator
         invalid_headers = {
             "Authorization": "Bearer invalid-token",
             "Content-Type": "application/json"
         }
-        unauthorized_resp = requests.get(
-            f"{BASE_URL}/api/creators/{creator_id}/revenue-summary",
-            headers=invalid_headers,
-            timeout=TIMEOUT
-        )
-        assert unauthorized_resp.status_code in (401, 403), (
-            f"Unauthorized access should be denied, got status {unauthorized_resp.status_code}"
-        )
-
-    finally:
-        # Clean up: delete the created test creator and related data
-        if creator_id:
-            requests.delete(
-                f"{BASE_URL}/api/creators/{creator_id}",
-                headers=HEADERS,
+        other_creator_headers = {**fixture.auth_headers(other_creator_id), "Content-Type": "application/json"}
+        for denied_headers in (invalid_headers, other_creator_headers):
+            unauthorized_resp = requests.get(
+                f"{BASE_URL}/api/creators/{creator_id}/revenue-summary",
+                headers=denied_headers,
                 timeout=TIMEOUT
             )
+            assert unauthorized_resp.status_code in (401, 403), (
+                f"Unauthorized access should be denied, got status {unauthorized_resp.status_code}"
+            )
 
-test_TC009_view_revenue_according_to_predefined_share_ratios()
\ No newline at end of file
+test_TC009_view_revenue_according_to_predefined_share_ratios()
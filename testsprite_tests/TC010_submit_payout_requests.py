@@ -1,17 +1,10 @@
+import uuid
 import requests
-import os
+from fixtures import seeded
 
 BASE_URL = "http://localhost:8080"
 TIMEOUT = 30
 
-# Assuming authentication token is required; get from env variable for security
-AUTH_TOKEN = os.getenv("AUTH_TOKEN", "test-auth-token-placeholder")
-
-HEADERS = {
-    "Authorization": f"Bearer {AUTH_TOKEN}",
-    "Content-Type": "application/json"
-}
-
 def test_submit_payout_request():
     """
     Test the payout request submission process ensuring requests are recorded and processed correctly.
@@ -20,26 +13,38 @@ def test_submit_payout_request():
 
     payout_request_endpoint = f"{BASE_URL}/creator/dashboard/payout-requests"
 
-    payout_requests = [
-        {
-            "creator_id": "creator_test_id_123",
-            "payment_method": "PayPal",
-            "amount": 150.00,
-            "currency": "USD",
-            "paypal_email": "creator_test_paypal@example.com"
-        },
-        {
-            "creator_id": "creator_test_id_123",
-            "payment_method": "Portone",
-            "amount": 200000,
-            "currency": "KRW",
-            "portone_phone": "010-1234-5678"
-        }
-    ]
+    # One seeded creator with a 500,000 KRW ledger balance and saved PayPal/Portone payees; the namespace
+    # wipe also removes the payout requests created below. The USD request is debited in KRW, so the
+    # backend needs PAYOUT_USD_KRW_RATE.
+    with seeded("creators_with_transactions", creators=1, transactions=5, amount=100000) as fixture:
+        creator_id = fixture.ids["creators"][0]
+        HEADERS = {**fixture.auth_headers(creator_id), "Content-Type": "application/json"}
 
-    created_request_ids = []
+        # Unauthenticated callers and requests on behalf of another creator are refused
+        anon_resp = requests.post(payout_request_endpoint, json={"payment_method": "PayPal", "amount": 150.00, "currency": "USD"},
+                                  timeout=TIMEOUT)
+        assert anon_resp.status_code == 401, f"Unauthenticated payout request was not rejected: {anon_resp.status_code}"
+        other_resp = requests.post(payout_request_endpoint, json={"creator_id": str(uuid.uuid4()), "payment_method": "PayPal",
+                                                                  "amount": 150.00, "currency": "USD"},
+                                   headers=HEADERS, timeout=TIMEOUT)
+        assert other_resp.status_code == 403, f"Payout for another creator was not rejected: {other_resp.status_code}"
 
-    try:
+        # Payees come from the creator's saved payout settings; a payee in the body is ignored
+        payout_requests = [
+            {
+                "payment_method": "PayPal",
+                "amount": 150.00,
+                "currency": "USD",
+                "paypal_email": "attacker@example.com"
+            },
+            {
+                "payment_method": "Portone",
+                "amount": 200000,
+                "currency": "KRW"
+            }
+        ]
+
+        created_request_ids = []
         for payout_request in payout_requests:
             response = requests.post(payout_request_endpoint, json=payout_request, headers=HEADERS, timeout=TIMEOUT)
             assert response.status_code == 201, f"Failed to create payout request: {response.text}"
@@ -50,8 +55,8 @@ def test_submit_payout_request():
             assert json_resp.get("payment_method") == payout_request["payment_method"], "Payment method mismatch in response"
             assert abs(float(json_resp.get("amount", 0)) - float(payout_request["amount"])) < 0.01, "Amount mismatch"
             assert json_resp.get("currency") == payout_request["currency"], "Currency mismatch"
-
-            created_request_ids.append(json_resp["id"])
+            assert json_resp.get("creator_id") == creator_id, "Payout request recorded for another creator"
+            assert json_resp.get("paypal_email") != "attacker@example.com", "Payee was taken from the request body"
 
             get_resp = requests.get(f"{payout_request_endpoint}/{json_resp['id']}", headers=HEADERS, timeout=TIMEOUT)
             assert get_resp.status_code == 200, f"Failed to retrieve created payout request ID {json_resp['id']}"
@@ -59,9 +64,12 @@ def test_submit_payout_request():
             assert get_data["id"] == json_resp["id"], "Mismatch in retrieved payout request ID"
             assert get_data["status"] == json_resp["status"], "Mismatch in payout request status"
 
-    finally:
-        for req_id in created_request_ids:
-            del_resp = requests.delete(f"{payout_request_endpoint}/{req_id}", headers=HEADERS, timeout=TIMEOUT)
-            assert del_resp.status_code in (200, 204), f"Failed to delete payout request ID {req_id}"
+            created_request_ids.append(json_resp["id"])
+
+        # Single-item DELETE cancels a pending request; the rest go with the namespace wipe
+        del_resp = requests.delete(f"{payout_request_endpoint}/{created_request_ids[0]}", headers=HEADERS, timeout=TIMEOUT)
+        assert del_resp.status_code in (200, 204), f"Failed to delete payout request ID {created_request_ids[0]}"
+        gone_resp = requests.get(f"{payout_request_endpoint}/{created_request_ids[0]}", headers=HEADERS, timeout=TIMEOUT)
+        assert gone_resp.status_code == 404, "Deleted payout request is still retrievable"
 
 test_submit_payout_request()
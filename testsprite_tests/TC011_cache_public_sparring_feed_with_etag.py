@@ -0,0 +1,66 @@
+import base64
+import requests
+import time
+import statistics
+
+BASE_URL = "http://localhost:8080"
+TIMEOUT = 30
+
+SAMPLES = 20
+
+
+def test_cache_public_sparring_feed_with_etag():
+    feed_url = f"{BASE_URL}/api/sparring/public"
+
+    # Step 1: First request populates (or reuses) the cache and returns an ETag
+    first = requests.get(feed_url, timeout=TIMEOUT)
+    assert first.status_code == 200, f"Failed to fetch public sparring feed: {first.status_code} {first.text}"
+    etag = first.headers.get("ETag")
+    assert etag, "Response missing ETag header"
+    videos = first.json()
+    assert isinstance(videos, list), "Public sparring feed should be a list"
+    assert len(videos) <= 20, "Default page size should be 20"
+
+    # Step 2: Conditional GET with the same ETag must be answered with 304 and no body
+    conditional = requests.get(feed_url, headers={"If-None-Match": etag}, timeout=TIMEOUT)
+    assert conditional.status_code == 304, f"Expected 304 for matching ETag, got {conditional.status_code}"
+    assert not conditional.content, "304 response should not carry a body"
+
+    mismatched = requests.get(feed_url, headers={"If-None-Match": '"stale-etag"'}, timeout=TIMEOUT)
+    assert mismatched.status_code == 200, "Non-matching ETag should return the full feed"
+
+    # Step 3: Cursor pagination beyond the first page
+    next_cursor = first.headers.get("X-Next-Cursor")
+    if next_cursor:
+        page_two = requests.get(feed_url, params={"cursor": next_cursor}, timeout=TIMEOUT)
+        assert page_two.status_code == 200, f"Failed to fetch second page: {page_two.text}"
+        first_ids = {v["id"] for v in videos}
+        assert not first_ids & {v["id"] for v in page_two.json()}, "Pages should not overlap"
+
+    bad_cursor = requests.get(feed_url, params={"cursor": "not-a-cursor"}, timeout=TIMEOUT)
+    assert bad_cursor.status_code == 400, "Invalid cursor should be rejected"
+
+    # A cursor whose id smuggles extra PostgREST filter clauses must not reach the query
+    injected = base64.urlsafe_b64encode(b"2024-01-01T00:00:00Z|x),is_published.eq.false").decode().rstrip("=")
+    injected_cursor = requests.get(feed_url, params={"cursor": injected}, timeout=TIMEOUT)
+    assert injected_cursor.status_code == 400, "Cursor with a non-UUID id should be rejected"
+
+    # Step 4: Measure cached (200 HIT) and revalidated (304) latency
+    cached_ms = []
+    revalidated_ms = []
+    for _ in range(SAMPLES):
+        start = time.perf_counter()
+        resp = requests.get(feed_url, timeout=TIMEOUT)
+        cached_ms.append((time.perf_counter() - start) * 1000)
+        assert resp.status_code == 200
+
+        start = time.perf_counter()
+        resp = requests.get(feed_url, headers={"If-None-Match": resp.headers["ETag"]}, timeout=TIMEOUT)
+        revalidated_ms.append((time.perf_counter() - start) * 1000)
+        assert resp.status_code == 304
+
+    print(f"Cached 200: median {statistics.median(cached_ms):.1f}ms, max {max(cached_ms):.1f}ms")
+    print(f"Revalidated 304: median {statistics.median(revalidated_ms):.1f}ms, max {max(revalidated_ms):.1f}ms")
+
+
+test_cache_public_sparring_feed_with_etag()
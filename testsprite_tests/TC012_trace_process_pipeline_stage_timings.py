@@ -0,0 +1,62 @@
+import requests
+import os
+from trace_client import BASE_URL, TIMEOUT, new_request_id, wait_for_job, fetch_trace, assert_stage_budgets
+from video_fixtures import get_preset
+
+# Content row to attach the processed video to (the pipeline updates it on completion)
+LESSON_ID = os.getenv("PROCESS_LESSON_ID", "test_lesson_id")
+
+STAGE_BUDGETS_MS = {
+    "download": 60000,
+    "cut": 10000,
+    "concat": 30000,
+    "vimeo_upload": 600000,
+    "db_update": 5000,
+}
+
+
+def test_trace_process_pipeline_stage_timings():
+    # Step 1: Upload a small synthetic video
+    with open(get_preset("tiny"), "rb") as f:
+        upload_resp = requests.post(f"{BASE_URL}/upload", files={"video": ("tiny.mp4", f, "video/mp4")}, timeout=TIMEOUT)
+    assert upload_resp.status_code == 200, f"Upload failed: {upload_resp.text}"
+    upload = upload_resp.json()
+
+    # Step 2: Start processing with our own request ID
+    request_id = new_request_id("tc012")
+    process_resp = requests.post(
+        f"{BASE_URL}/process",
+        json={
+            "videoId": upload["videoId"],
+            "filename": upload["filename"],
+            "cuts": [{"start": 0, "end": 0.5}, {"start": 1, "end": 1.5}],
+            "title": "TC012 trace test",
+            "lessonId": LESSON_ID,
+        },
+        headers={"x-request-id": request_id},
+        timeout=TIMEOUT,
+    )
+    assert process_resp.status_code == 202, f"Process start failed: {process_resp.text}"
+    assert process_resp.headers.get("x-request-id") == request_id, "Request ID was not echoed back"
+    body = process_resp.json()
+    assert body["requestId"] == request_id
+
+    # Step 3: Trace is attached to the job status once it finishes
+    job = wait_for_job(body["processId"])
+    assert job.get("status") == "completed", f"Process job did not complete: {job.get('status')} {job.get('error')}"
+    assert "trace" in job, "Job status missing trace"
+    assert job["trace"]["requestId"] == request_id
+    assert job["trace"]["status"] == "completed", f"Trace ended as {job['trace']['status']}"
+
+    # Step 4: Pull the trace directly (keyed by processId) and check stages and budgets
+    trace = fetch_trace(body["processId"])
+    assert trace["requestId"] == request_id
+    assert [s["attributes"]["index"] for s in trace["spans"] if s["name"] == "cut"] == [0, 1]
+    for stage in ("download", "cut", "concat"):
+        assert stage in trace["stages"], f"Trace missing {stage} stage"
+    assert_stage_budgets(trace, STAGE_BUDGETS_MS)
+
+    print("Stage totals (ms):", trace["stages"])
+
+
+test_trace_process_pipeline_stage_timings()
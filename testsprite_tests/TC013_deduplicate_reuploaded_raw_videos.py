@@ -0,0 +1,100 @@
+import hashlib
+import requests
+import os
+import time
+from video_fixtures import get_preset
+
+BASE_URL = "http://localhost:8080"
+TIMEOUT = 30
+
+
+def chunked_upload(path, filename, sha256=None):
+    """Upload a file through the resumable session API; returns the final JSON response."""
+    size = os.path.getsize(path)
+    create = requests.post(f"{BASE_URL}/upload/sessions",
+                           json={"filename": filename, "size": size, "sha256": sha256}, timeout=TIMEOUT)
+    assert create.status_code == 201, f"Session create failed: {create.status_code} {create.text}"
+    session = create.json()
+    # A claimed hash alone must not reveal anything about stored uploads
+    assert "videoId" not in session, "Session create leaked a stored upload before any bytes were sent"
+
+    # Resume from whatever the server already has (0 for a fresh session)
+    offset = requests.get(f"{BASE_URL}/upload/sessions/{session['uploadId']}", timeout=TIMEOUT).json()["received"]
+    with open(path, "rb") as f:
+        f.seek(offset)
+        while True:
+            chunk = f.read(session["chunkSize"])
+            if not chunk:
+                break
+            resp = requests.put(f"{BASE_URL}/upload/sessions/{session['uploadId']}", params={"offset": offset},
+                                data=chunk, headers={"Content-Type": "application/octet-stream"}, timeout=TIMEOUT)
+            assert resp.status_code == 200, f"Chunk at {offset} failed: {resp.status_code} {resp.text}"
+            body = resp.json()
+            offset = body["received"]
+    assert body["complete"], "Upload did not complete"
+    return body
+
+
+def answer_challenge(path, challenge):
+    """sha256 of the challenged byte ranges, concatenated in order."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for r in challenge["ranges"]:
+            f.seek(r["offset"])
+            digest.update(f.read(r["length"]))
+    return digest.hexdigest()
+
+
+def create_session(filename, size, sha256):
+    create = requests.post(f"{BASE_URL}/upload/sessions",
+                           json={"filename": filename, "size": size, "sha256": sha256}, timeout=TIMEOUT)
+    assert create.status_code == 201, f"Session create failed: {create.status_code} {create.text}"
+    session = create.json()
+    assert "videoId" not in session, "Session create leaked a stored upload before any bytes were sent"
+    assert session.get("challenge", {}).get("ranges"), "A session announcing a hash should carry a challenge"
+    return session
+
+
+def test_reupload_same_bytes_is_deduplicated():
+    video_path = get_preset("tiny")
+    with open(video_path, "rb") as f:
+        video_content = f.read()
+    sha256 = hashlib.sha256(video_content).hexdigest()
+
+    # First upload streams the bytes (or dedupes against an earlier run; either way it ends up stored)
+    first = chunked_upload(video_path, "test_video.mp4")
+    assert first["sha256"] == sha256, "Server hash does not match the uploaded bytes"
+
+    # Knowing the hash is not enough: a wrong answer is refused, and that session still takes the bytes
+    guessed = create_session("guessed.mp4", len(video_content), sha256)
+    resp = requests.post(f"{BASE_URL}/upload/sessions/{guessed['uploadId']}/proof",
+                         json={"proof": "0" * 64}, timeout=TIMEOUT)
+    assert resp.status_code == 409, f"Wrong proof was accepted: {resp.status_code} {resp.text}"
+    requests.delete(f"{BASE_URL}/upload/sessions/{guessed['uploadId']}", timeout=TIMEOUT)
+
+    # Second upload proves possession by hashing the challenged ranges; no body bytes are sent
+    session = create_session("test_video_copy.mp4", len(video_content), sha256)
+    started = time.perf_counter()
+    resp = requests.post(f"{BASE_URL}/upload/sessions/{session['uploadId']}/proof",
+                         json={"proof": answer_challenge(video_path, session["challenge"])}, timeout=TIMEOUT)
+    elapsed = time.perf_counter() - started
+    assert resp.status_code == 200, f"Proof of possession failed: {resp.status_code} {resp.text}"
+    second = resp.json()
+    assert second["complete"] is True, "Proven upload did not complete"
+    assert second["deduplicated"] is True, "Second upload of identical bytes was not deduplicated"
+    assert elapsed < 5, f"Proven upload took {elapsed:.1f}s; it should not depend on the file size"
+    # Each upload gets its own id backed by the shared bytes, never the first uploader's
+    assert second["sha256"] == first["sha256"], "Deduplicated upload resolved to different content"
+    assert second["videoId"] != first["videoId"], "Deduplicated upload was handed the first uploader's videoId"
+    assert second["filename"] != first["filename"], "Deduplicated upload was handed the first uploader's file"
+    assert "processed" not in second, "Upload response exposes processed output recorded for other uploads"
+
+    # The classic multipart endpoint hashes while receiving and dedupes the same way
+    resp = requests.post(f"{BASE_URL}/upload", files={"video": ("again.mp4", video_content, "video/mp4")}, timeout=TIMEOUT)
+    assert resp.status_code == 200, f"Multipart upload failed: {resp.status_code} {resp.text}"
+    again = resp.json()
+    assert again["deduplicated"] is True, "Multipart re-upload was not deduplicated"
+    assert again["videoId"] not in (first["videoId"], second["videoId"]), "Multipart re-upload reused another upload's videoId"
+
+
+test_reupload_same_bytes_is_deduplicated()
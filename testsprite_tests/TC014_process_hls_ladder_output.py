@@ -0,0 +1,111 @@
+import re
+import requests
+import time
+from urllib.parse import urljoin
+
+from fixtures import seeded
+from video_fixtures import VideoSpec, get_video
+
+BASE_URL = "http://localhost:8080"
+TIMEOUT = 30
+
+
+# 20s 720p synthetic source with a keyframe every 2s, so stream-copied cuts land exactly
+HLS_SOURCE = VideoSpec(duration=20, width=1280, height=720, fps=30, gop=60)
+HLS_CUTS = [{"start": 2, "end": 8}, {"start": 10, "end": 18}]
+HLS_SEGMENT_SECONDS = 4
+
+
+def parse_playlist(text):
+    """(tags, segments) where segments are (duration, uri) pairs in order."""
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    tags = [line for line in lines if line.startswith("#")]
+    segments = []
+    for i, line in enumerate(lines):
+        if line.startswith("#EXTINF:"):
+            segments.append((float(line[len("#EXTINF:"):].split(",")[0]), lines[i + 1]))
+    return tags, segments
+
+
+def test_process_hls_ladder_on_synthetic_input():
+    with open(get_video(HLS_SOURCE), "rb") as f:
+        upload = requests.post(f"{BASE_URL}/upload", files={"video": ("hls_source.mp4", f, "video/mp4")}, timeout=TIMEOUT)
+    assert upload.status_code == 200, f"Upload failed: {upload.status_code} {upload.text}"
+    uploaded = upload.json()
+
+    with seeded("content_with_videos", creators=1, lessons=0, drills=1, sparring=0) as fixture:
+        process = requests.post(f"{BASE_URL}/process", json={
+            "videoId": uploaded["videoId"],
+            "filename": uploaded["filename"],
+            "cuts": HLS_CUTS,
+            "drillId": fixture.ids["drills"][0],
+            "videoType": "action",
+            "outputMode": "hls",
+        }, timeout=TIMEOUT)
+        assert process.status_code == 202, f"HLS process initiation failed: {process.text}"
+        process_id = process.json()["processId"]
+
+        job = None
+        deadline = time.time() + 180
+        while time.time() < deadline:
+            job = requests.get(f"{BASE_URL}/status/{process_id}", timeout=TIMEOUT).json()
+            if job.get("status") != "processing":
+                break
+            time.sleep(2)
+        assert job and job.get("status") == "completed", f"HLS processing did not complete: {job}"
+
+    hls = job["hls"]
+    master_url = urljoin(BASE_URL + "/", hls["masterUrl"])
+    master_resp = requests.get(master_url, timeout=TIMEOUT)
+    assert master_resp.status_code == 200, f"Master playlist not reachable: {master_resp.status_code}"
+    master = master_resp.text
+    assert master.startswith("#EXTM3U"), "Master playlist missing #EXTM3U header"
+
+    # One variant per rendition; 720p source means 360p + 720p and no upscaled 1080p
+    lines = [line.strip() for line in master.splitlines() if line.strip()]
+    variants = []
+    for i, line in enumerate(lines):
+        if line.startswith("#EXT-X-STREAM-INF:"):
+            assert "BANDWIDTH=" in line, f"Variant without BANDWIDTH: {line}"
+            resolution = re.search(r"RESOLUTION=(\d+)x(\d+)", line)
+            assert resolution, f"Variant without RESOLUTION: {line}"
+            variants.append((int(resolution.group(2)), urljoin(master_url, lines[i + 1])))
+    assert sorted(h for h, _ in variants) == [360, 720], f"Unexpected ladder heights: {variants}"
+    assert hls["renditions"] == ["360p", "720p"], f"Unexpected renditions: {hls['renditions']}"
+
+    expected_total = sum(c["end"] - c["start"] for c in HLS_CUTS)
+    segment_counts = set()
+    for height, variant_url in variants:
+        variant_resp = requests.get(variant_url, timeout=TIMEOUT)
+        assert variant_resp.status_code == 200, f"{height}p playlist not reachable"
+        tags, segments = parse_playlist(variant_resp.text)
+
+        assert "#EXT-X-PLAYLIST-TYPE:VOD" in tags, f"{height}p playlist is not VOD"
+        assert "#EXT-X-ENDLIST" in tags, f"{height}p playlist is not terminated"
+        assert any(t.startswith("#EXT-X-MAP:") for t in tags), f"{height}p playlist has no CMAF init segment"
+        target = int(next(t for t in tags if t.startswith("#EXT-X-TARGETDURATION:")).split(":")[1])
+        assert target <= HLS_SEGMENT_SECONDS + 1, f"{height}p target duration {target} too long"
+
+        durations = [d for d, _ in segments]
+        assert all(d <= target + 0.5 for d in durations), f"{height}p segment exceeds target duration: {durations}"
+        assert all(abs(d - HLS_SEGMENT_SECONDS) < 0.1 for d in durations[:-1]), \
+            f"{height}p segments are not {HLS_SEGMENT_SECONDS}s: {durations}"
+        assert abs(sum(durations) - expected_total) < 0.5, \
+            f"{height}p total {sum(durations):.2f}s, expected {expected_total}s"
+        segment_counts.add(len(segments))
+
+        first_segment = requests.get(urljoin(variant_url, segments[0][1]), timeout=TIMEOUT)
+        assert first_segment.status_code == 200 and first_segment.content, f"{height}p first segment not reachable"
+
+    assert len(segment_counts) == 1, f"Renditions are not segment-aligned: {segment_counts}"
+
+    # The preview is the 360p rendition joined into a progressive fragmented MP4, kept apart
+    # from the raw-upload preview that /preview serves for the same videoId
+    assert hls["previewUrl"], "Preview was not produced from the ladder run"
+    assert process_id in hls["previewUrl"], f"Ladder preview is not keyed by the job: {hls['previewUrl']}"
+    preview = requests.get(urljoin(BASE_URL + "/", hls["previewUrl"]), timeout=TIMEOUT)
+    assert preview.status_code == 200, f"Preview not reachable: {preview.status_code}"
+    assert preview.content[4:8] == b"ftyp", "Preview is not an MP4 file"
+
+
+test_process_hls_ladder_on_synthetic_input()
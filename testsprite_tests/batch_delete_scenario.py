@@ -0,0 +1,173 @@
+"""
+Batch content deletion (/api/delete-content/batch) against local Vimeo and Mux stand-ins.
+
+The stand-ins answer the three calls the backend makes (Vimeo DELETE /videos/:id, Mux GET
+/video/v1/playback-ids/:id and DELETE /video/v1/assets/:id) with a fixed latency, and
+answer every --throttle-every'th request with 429 + Retry-After so the backoff path runs.
+They also record peak in-flight requests, which must stay within the batch concurrency.
+
+Start the backend pointed at the stand-ins, with fixture endpoints enabled:
+
+    ENABLE_TEST_FIXTURES=1 VIMEO_API_BASE=http://127.0.0.1:8091 MUX_API_BASE=http://127.0.0.1:8092 npm start
+    python batch_delete_scenario.py --lessons 20 --drills 20 --sparring 20 --concurrency 8
+"""
+import argparse
+import json
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from fixtures import seed
+
+BASE_URL = "http://localhost:8080"
+TIMEOUT = 300
+
+
+class StandIn:
+    """Threaded HTTP stand-in that tracks calls, throttles and peak concurrency."""
+
+    def __init__(self, name, port, latency_s, throttle_every):
+        self.name = name
+        self.latency_s = latency_s
+        self.throttle_every = throttle_every
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.throttled = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.deleted = Counter()
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _handle(self):
+                with stand_in.lock:
+                    stand_in.requests += 1
+                    stand_in.in_flight += 1
+                    stand_in.max_in_flight = max(stand_in.max_in_flight, stand_in.in_flight)
+                    throttle = stand_in.throttle_every and stand_in.requests % stand_in.throttle_every == 0
+                try:
+                    time.sleep(stand_in.latency_s)
+                    if throttle:
+                        with stand_in.lock:
+                            stand_in.throttled += 1
+                        return self._send(429, headers={"Retry-After": "1"})
+                    status, body = stand_in.route(self.command, self.path)
+                    self._send(status, body)
+                finally:
+                    with stand_in.lock:
+                        stand_in.in_flight -= 1
+
+            def _send(self, status, body=None, headers=None):
+                payload = json.dumps(body).encode() if body is not None else b""
+                self.send_response(status)
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_DELETE = _handle
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def route(self, method, path):
+        parts = path.strip("/").split("/")
+        if method == "DELETE" and parts[:-1] in (["videos"], ["video", "v1", "assets"]):
+            with self.lock:
+                self.deleted[parts[-1]] += 1
+            return 204, None
+        if method == "GET" and parts[:-1] == ["video", "v1", "playback-ids"]:
+            return 200, {"data": {"id": parts[-1], "object": {"type": "asset", "id": f"asset-{parts[-1]}"}}}
+        return 404, {"error": "not found"}
+
+    def close(self):
+        self.server.shutdown()
+
+
+def stream_batch_delete(items, concurrency, base_url=BASE_URL):
+    """POST the batch and yield (seconds since request, parsed line) as lines arrive."""
+    started = time.perf_counter()
+    with requests.post(f"{base_url}/api/delete-content/batch", json={"items": items, "concurrency": concurrency},
+                       stream=True, timeout=TIMEOUT) as resp:
+        assert resp.status_code == 200, f"Batch delete failed: {resp.status_code} {resp.text}"
+        assert resp.headers["Content-Type"].startswith("application/x-ndjson"), "Batch delete is not streamed as NDJSON"
+        for line in resp.iter_lines():
+            if line:
+                yield time.perf_counter() - started, json.loads(line)
+
+
+def run_scenario(args):
+    vimeo = StandIn("vimeo", args.vimeo_port, args.latency, args.throttle_every)
+    mux = StandIn("mux", args.mux_port, args.latency, args.throttle_every)
+    fixture = seed("content_with_videos", base_url=args.base_url, creators=1,
+                   lessons=args.lessons, drills=args.drills, sparring=args.sparring)
+    try:
+        items = (
+            [{"contentType": "lesson", "contentId": i} for i in fixture.ids.get("lessons", [])]
+            + [{"contentType": "drill", "contentId": i} for i in fixture.ids.get("drills", [])]
+            + [{"contentType": "sparring", "contentId": i} for i in fixture.ids.get("sparring_videos", [])]
+        )
+        missing_id = str(uuid.uuid4())
+        items.append({"contentType": "drill", "contentId": missing_id})
+
+        results, summary, first_line_s, total_s = {}, None, None, 0.0
+        for elapsed, line in stream_batch_delete(items, args.concurrency, args.base_url):
+            first_line_s = elapsed if first_line_s is None else first_line_s
+            total_s = elapsed
+            if "summary" in line:
+                summary = line["summary"]
+            else:
+                results[line["contentId"]] = line
+
+        assert summary is not None, "Stream ended without a summary line"
+        assert len(results) == len(items), f"Expected {len(items)} item results, got {len(results)}"
+        assert results[missing_id]["status"] == "not_found", "Unknown ID was not reported as not_found"
+
+        failed = {cid: r for cid, r in results.items() if r["status"] not in ("deleted", "not_found")}
+        assert not failed, f"Items not deleted: {json.dumps(failed)[:500]}"
+
+        # Every referenced platform video reached its stand-in exactly once despite the 429s
+        expected_vimeo = args.lessons + args.sparring
+        expected_mux = args.drills * 2
+        assert sum(vimeo.deleted.values()) == expected_vimeo, f"Vimeo deletes {sum(vimeo.deleted.values())} != {expected_vimeo}"
+        assert sum(mux.deleted.values()) == expected_mux, f"Mux deletes {sum(mux.deleted.values())} != {expected_mux}"
+        assert all(n == 1 for n in list(vimeo.deleted.values()) + list(mux.deleted.values())), "A video was deleted twice"
+        assert vimeo.max_in_flight + mux.max_in_flight <= args.concurrency, \
+            f"Platform concurrency {vimeo.max_in_flight + mux.max_in_flight} exceeded {args.concurrency}"
+
+        print(f"Deleted {summary['deleted']} items ({summary['not_found']} not found) in {total_s:.2f}s, "
+              f"first result after {first_line_s:.2f}s")
+        print(f"Vimeo: {vimeo.requests} requests, {vimeo.throttled} throttled, peak {vimeo.max_in_flight} in flight")
+        print(f"Mux:   {mux.requests} requests, {mux.throttled} throttled, peak {mux.max_in_flight} in flight")
+        print(f"Backend saw throttling: {summary['throttled']}")
+    finally:
+        fixture.wipe()
+        vimeo.close()
+        mux.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch delete scenario against local Vimeo/Mux stand-ins")
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--vimeo-port", type=int, default=8091)
+    parser.add_argument("--mux-port", type=int, default=8092)
+    parser.add_argument("--lessons", type=int, default=20)
+    parser.add_argument("--drills", type=int, default=20)
+    parser.add_argument("--sparring", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.05, help="stand-in response latency in seconds")
+    parser.add_argument("--throttle-every", type=int, default=25, help="answer every Nth request with 429 (0 disables)")
+    run_scenario(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
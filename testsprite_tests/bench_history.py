@@ -0,0 +1,174 @@
+"""
+Benchmark result history and regression detection.
+
+Every run is appended to a JSON-lines history file. A run is compared metric by metric
+against a baseline (an explicitly saved baseline run, or else the previous run), and a
+metric regresses when its median moves the wrong way by more than the threshold AND the
+difference is statistically significant (Welch's t-test on the repeated samples).
+"""
+import json
+import os
+import math
+import statistics
+import subprocess
+import time
+import uuid
+
+TMP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tmp")
+HISTORY_PATH = os.getenv("BENCH_HISTORY_PATH", os.path.join(TMP_DIR, "bench_history.jsonl"))
+BASELINE_PATH = os.getenv("BENCH_BASELINE_PATH", os.path.join(TMP_DIR, "bench_baseline.json"))
+
+LOWER_IS_BETTER = "lower"
+HIGHER_IS_BETTER = "higher"
+
+
+class BenchRun:
+    """Collects metric samples for one benchmark run."""
+
+    def __init__(self):
+        self.metrics = {}
+
+    def add(self, name, value, unit, direction=LOWER_IS_BETTER):
+        metric = self.metrics.setdefault(name, {"unit": unit, "direction": direction, "samples": []})
+        metric["samples"].append(value)
+
+    def to_record(self):
+        return {
+            "run_id": str(uuid.uuid4()),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "git_sha": _git_sha(),
+            "metrics": self.metrics,
+        }
+
+
+def _git_sha():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def append_history(record, path=HISTORY_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+
+
+def load_history(path=HISTORY_PATH):
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def save_baseline(record, path=BASELINE_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(record, f, indent=2)
+
+
+def load_baseline(history=None, path=BASELINE_PATH):
+    """Saved baseline if there is one, otherwise the most recent run in history."""
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    history = load_history() if history is None else history
+    return history[-1] if history else None
+
+
+def _betacf(a, b, x):
+    """Continued fraction for the regularized incomplete beta function (Lentz's method)."""
+    tiny = 1e-300
+    c, d = 1.0, 1.0 - (a + b) * x / (a + 1)
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    h = d
+    for m in range(1, 201):
+        for num in (m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+                    -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1))):
+            d = 1.0 + num * d
+            d = 1.0 / (d if abs(d) > tiny else tiny)
+            c = 1.0 + num / c
+            c = c if abs(c) > tiny else tiny
+            h *= d * c
+        if abs(d * c - 1.0) < 1e-12:
+            break
+    return h
+
+
+def _regularized_beta(a, b, x):
+    if x <= 0:
+        return 0.0
+    if x >= 1:
+        return 1.0
+    front = math.exp(math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b) + a * math.log(x) + b * math.log1p(-x))
+    if x < (a + 1) / (a + b + 2):
+        return front * _betacf(a, b, x) / a
+    return 1.0 - front * _betacf(b, a, 1 - x) / b
+
+
+def student_t_two_sided_p(t, df):
+    """P(|T| >= |t|) for Student's t with df (possibly fractional) degrees of freedom."""
+    return _regularized_beta(df / 2, 0.5, df / (df + t * t))
+
+
+def welch_p_value(a, b):
+    """Two-sided p-value of Welch's t-test (Student-t with Welch-Satterthwaite degrees of freedom)."""
+    if len(a) < 2 or len(b) < 2:
+        return None
+    se_a, se_b = statistics.variance(a) / len(a), statistics.variance(b) / len(b)
+    se = math.sqrt(se_a + se_b)
+    if se == 0:
+        return 0.0 if statistics.mean(a) != statistics.mean(b) else 1.0
+    t = (statistics.mean(a) - statistics.mean(b)) / se
+    df = (se_a + se_b) ** 2 / (se_a ** 2 / (len(a) - 1) + se_b ** 2 / (len(b) - 1))
+    return student_t_two_sided_p(t, df)
+
+
+def compare(current, baseline, threshold=0.10, alpha=0.05):
+    """
+    Compare two run records. Returns one row per metric present in both:
+    {name, unit, baseline, current, change, p_value, regressed}.
+    `change` is the relative median change, signed so that positive means worse.
+    """
+    rows = []
+    for name, metric in sorted(current["metrics"].items()):
+        base = baseline["metrics"].get(name) if baseline else None
+        if not base or not base["samples"] or not metric["samples"]:
+            continue
+
+        base_median = statistics.median(base["samples"])
+        cur_median = statistics.median(metric["samples"])
+        if base_median == 0:
+            continue
+
+        change = (cur_median - base_median) / abs(base_median)
+        if metric["direction"] == HIGHER_IS_BETTER:
+            change = -change
+
+        p_value = welch_p_value(metric["samples"], base["samples"])
+        # With a single sample on either side we can only use the threshold
+        significant = p_value is None or p_value < alpha
+
+        rows.append({
+            "name": name,
+            "unit": metric["unit"],
+            "baseline": base_median,
+            "current": cur_median,
+            "change": change,
+            "p_value": p_value,
+            "regressed": change > threshold and significant,
+        })
+    return rows
+
+
+def format_report(rows):
+    lines = [f"{'metric':<48} {'baseline':>12} {'current':>12} {'change':>8} {'p':>6}"]
+    for row in rows:
+        p = "-" if row["p_value"] is None else f"{row['p_value']:.3f}"
+        flag = "  REGRESSION" if row["regressed"] else ""
+        lines.append(
+            f"{row['name']:<48} {row['baseline']:>12.3f} {row['current']:>12.3f} "
+            f"{row['change'] * 100:>+7.1f}% {p:>6}  {row['unit']}{flag}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,275 @@
+"""
+Benchmark suite for the Python tooling and the API scenarios.
+
+Suites:
+  keying   remove_bg.remove_background throughput (pixels/s) and peak RSS per image size
+  api      per-endpoint latency while replaying the TC001-TC010 scenario scripts
+  process  cut + concat wall time per cut count, using the same ffmpeg invocations as
+           the backend /process worker, on synthetic input from video_fixtures
+
+Each run is appended to tmp/bench_history.jsonl and compared against the baseline; the
+process exits non-zero when any metric regresses past --threshold.
+
+    python bench_suite.py --suites keying,process --repeat 5
+    python bench_suite.py --save-baseline
+"""
+import argparse
+import glob
+import multiprocessing
+import os
+import re
+import runpy
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from queue import Empty
+from urllib.parse import urlparse
+
+import bench_history
+from bench_history import BenchRun, HIGHER_IS_BETTER, LOWER_IS_BETTER
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(TESTS_DIR)
+
+KEYING_SIZES = [(512, 512), (1920, 1080)]
+KEYING_TIMEOUT_S = float(os.getenv("BENCH_KEYING_TIMEOUT", "600"))
+PROCESS_CUT_COUNTS = [1, 4, 16]
+PROCESS_PRESET = os.getenv("BENCH_PROCESS_PRESET", "short_720p")
+
+try:
+    import resource
+except ImportError:  # Windows: peak RSS is not reported
+    resource = None
+
+
+# --- keying ---
+
+def _make_keying_input(path, size):
+    from PIL import Image, ImageDraw
+
+    img = Image.new("RGB", size, (0, 0, 0))
+    draw = ImageDraw.Draw(img)
+    # Deterministic mix of pure black, near-black and coloured regions
+    for i in range(0, size[0], 32):
+        shade = (i * 7) % 256
+        draw.rectangle([i, 0, i + 15, size[1]], fill=(shade, 255 - shade, (shade * 3) % 256))
+    draw.ellipse([size[0] // 4, size[1] // 4, size[0] * 3 // 4, size[1] * 3 // 4], fill=(20, 20, 20))
+    img.save(path, "PNG")
+
+
+def _keying_worker(input_path, output_path, queue):
+    sys.path.insert(0, REPO_ROOT)
+    from remove_bg import remove_background
+
+    start = time.perf_counter()
+    remove_background(input_path, output_path)
+    elapsed = time.perf_counter() - start
+
+    peak_rss_kb = None
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak_rss_kb = peak / 1024 if sys.platform == "darwin" else peak
+    queue.put((elapsed, peak_rss_kb))
+
+
+def _await_worker_result(proc, queue, timeout):
+    """Result the worker put on the queue; raises instead of hanging if it dies or overruns."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return queue.get(timeout=1)
+        except Empty:
+            pass
+        if not proc.is_alive():
+            # The result may have landed between the last poll and the exit
+            try:
+                return queue.get(timeout=1)
+            except Empty:
+                raise RuntimeError(f"keying worker exited with code {proc.exitcode} before reporting a result")
+        if time.monotonic() > deadline:
+            proc.terminate()
+            proc.join()
+            raise TimeoutError(f"keying worker did not finish within {timeout:.0f}s")
+
+
+def bench_keying(run, repeat):
+    # Each sample runs in a fresh process so peak RSS belongs to that image alone
+    ctx = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp:
+        for width, height in KEYING_SIZES:
+            input_path = os.path.join(tmp, f"in_{width}x{height}.png")
+            output_path = os.path.join(tmp, f"out_{width}x{height}.png")
+            _make_keying_input(input_path, (width, height))
+
+            for _ in range(repeat):
+                queue = ctx.Queue()
+                proc = ctx.Process(target=_keying_worker, args=(input_path, output_path, queue))
+                proc.start()
+                elapsed, peak_rss_kb = _await_worker_result(proc, queue, KEYING_TIMEOUT_S)
+                proc.join()
+
+                label = f"keying.{width}x{height}"
+                run.add(f"{label}.pixels_per_s", width * height / elapsed, "px/s", HIGHER_IS_BETTER)
+                if peak_rss_kb is not None:
+                    run.add(f"{label}.peak_rss", peak_rss_kb / 1024, "MiB", LOWER_IS_BETTER)
+
+
+# --- api ---
+
+_ID_SEGMENT = re.compile(
+    r"^([0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}|\d+|(?=.*\d)[\w-]{16,})$",
+    re.IGNORECASE,
+)
+
+
+def endpoint_template(method, url):
+    """'GET http://host/users/123/subscription' -> 'GET /users/{id}/subscription'."""
+    path = urlparse(url).path or "/"
+    segments = ["{id}" if _ID_SEGMENT.match(seg) else seg for seg in path.split("/")]
+    return f"{method.upper()} {'/'.join(segments)}"
+
+
+def bench_api(run, repeat):
+    import requests
+
+    scripts = sorted(glob.glob(os.path.join(TESTS_DIR, "TC0[0-1][0-9]_*.py")))
+    scripts = [s for s in scripts if 1 <= int(os.path.basename(s)[2:5]) <= 10]
+
+    original_request = requests.sessions.Session.request
+    timings = []
+
+    def timed_request(self, method, url, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return original_request(self, method, url, *args, **kwargs)
+        finally:
+            timings.append((endpoint_template(method, url), time.perf_counter() - start))
+
+    requests.sessions.Session.request = timed_request
+    try:
+        for script in scripts:
+            tc = os.path.basename(script)[:5]
+            for _ in range(repeat):
+                timings.clear()
+                start = time.perf_counter()
+                passed = True
+                try:
+                    runpy.run_path(script, run_name="__bench__")
+                except (AssertionError, requests.RequestException, KeyError, ValueError) as e:
+                    # Scenario failures still produce useful latency samples
+                    passed = False
+                    print(f"  {tc} failed: {type(e).__name__}: {str(e)[:120]}")
+                run.add(f"api.{tc}.flow_wall_time", (time.perf_counter() - start) * 1000, "ms")
+                run.add(f"api.{tc}.passed", 1.0 if passed else 0.0, "ratio", HIGHER_IS_BETTER)
+                for endpoint, elapsed in timings:
+                    run.add(f"api.{tc}.{endpoint}", elapsed * 1000, "ms")
+    finally:
+        requests.sessions.Session.request = original_request
+
+
+# --- process ---
+
+def _ffmpeg():
+    return os.getenv("FFMPEG_PATH", "ffmpeg")
+
+
+def run_cut_and_concat(input_path, cuts, work_dir):
+    """Mirror of the /process worker: stream-copy each cut, then concat-demux them.
+
+    -ss goes before -i (input seeking), as fluent-ffmpeg's setStartTime emits it.
+    """
+    segment_names = []
+    for i, (start, end) in enumerate(cuts):
+        name = f"part_{i}.mp4"
+        subprocess.run([
+            _ffmpeg(), "-hide_banner", "-loglevel", "error", "-y",
+            "-ss", str(start), "-i", input_path, "-t", str(end - start),
+            "-c", "copy", "-avoid_negative_ts", "1", os.path.join(work_dir, name),
+        ], check=True)
+        segment_names.append(name)
+
+    concat_list = os.path.join(work_dir, "concat_list.txt")
+    with open(concat_list, "w") as f:
+        f.write("\n".join(f"file '{name}'" for name in segment_names))
+
+    final_path = os.path.join(work_dir, "final.mp4")
+    subprocess.run([
+        _ffmpeg(), "-hide_banner", "-loglevel", "error", "-y",
+        "-f", "concat", "-safe", "0", "-i", concat_list, "-c", "copy", final_path,
+    ], check=True)
+    return final_path
+
+
+def even_cuts(duration, count):
+    """count cuts spread over the video, each half of its slot long."""
+    slot = duration / count
+    return [(round(i * slot, 3), round(i * slot + slot / 2, 3)) for i in range(count)]
+
+
+def bench_process(run, repeat):
+    from video_fixtures import PRESETS, get_preset
+
+    spec = PRESETS[PROCESS_PRESET]
+    input_path = get_preset(PROCESS_PRESET)
+
+    for count in PROCESS_CUT_COUNTS:
+        cuts = even_cuts(spec.duration, count)
+        for _ in range(repeat):
+            work_dir = tempfile.mkdtemp(prefix="bench_process_")
+            try:
+                start = time.perf_counter()
+                run_cut_and_concat(input_path, cuts, work_dir)
+                run.add(f"process.{PROCESS_PRESET}.cuts_{count}.wall_time",
+                        time.perf_counter() - start, "s")
+            finally:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+
+SUITES = {"keying": bench_keying, "api": bench_api, "process": bench_process}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run benchmarks and check for regressions")
+    parser.add_argument("--suites", default="keying,process",
+                        help=f"comma separated, any of: {', '.join(SUITES)}")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="relative median change that counts as a regression (default 0.10)")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="store this run as the baseline for future comparisons")
+    parser.add_argument("--no-fail", action="store_true", help="report regressions without failing")
+    args = parser.parse_args()
+
+    run = BenchRun()
+    for name in args.suites.split(","):
+        print(f"Running {name} benchmarks...")
+        SUITES[name.strip()](run, args.repeat)
+
+    history = bench_history.load_history()
+    baseline = bench_history.load_baseline(history)
+    record = run.to_record()
+    bench_history.append_history(record)
+
+    if args.save_baseline:
+        bench_history.save_baseline(record)
+        print(f"Saved run {record['run_id']} as baseline")
+
+    if baseline is None:
+        print("No baseline yet; this run will be compared against next time.")
+        return 0
+
+    rows = bench_history.compare(record, baseline, threshold=args.threshold)
+    print(f"\nCompared against {baseline.get('git_sha') or baseline['run_id']} ({baseline['timestamp']})")
+    print(bench_history.format_report(rows))
+
+    regressions = [row for row in rows if row["regressed"]]
+    if regressions:
+        print(f"\n{len(regressions)} metric(s) regressed past {args.threshold:.0%}")
+        return 0 if args.no_fail else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""
+Bulk test fixtures: seed a named dataset in one call and wipe it by namespace.
+
+The backend must run with ENABLE_TEST_FIXTURES=1. Datasets (see the seed_test_fixture
+SQL function for all parameters):
+
+    users_with_subscriptions     users=10, plan_interval="month", amount=29000, subscribed=True
+    creators_with_transactions   creators=3, transactions=20, amount=10000, creator_share=0.8
+    content_with_videos          creators=1, lessons=5, drills=5, sparring=5
+
+    with seeded("creators_with_transactions", creators=1, transactions=5) as fx:
+        creator_id = fx.ids["creators"][0]
+        headers = fx.auth_headers(creator_id)
+        ...
+
+Seeded users and creators are auth users, so auth_headers() signs in as any of them.
+Pass admin=True to users_with_subscriptions for admin-only routes, and subscribed=False
+for users who have not paid yet (subscriptions they buy during the test are wiped too).
+"""
+import uuid
+from contextlib import contextmanager
+
+import requests
+
+BASE_URL = "http://localhost:8080"
+TIMEOUT = 60
+
+
+class Fixture:
+    def __init__(self, namespace, dataset, ids, base_url=BASE_URL):
+        self.namespace = namespace
+        self.dataset = dataset
+        self.ids = ids
+        self.base_url = base_url
+
+    def auth_headers(self, user_id):
+        """Authorization headers carrying a fresh access token for a user seeded in this fixture."""
+        resp = requests.post(f"{self.base_url}/test-fixtures/{self.namespace}/sessions",
+                             json={"userId": user_id}, timeout=TIMEOUT)
+        assert resp.status_code == 201, f"Failed to sign in as {user_id}: {resp.status_code} {resp.text}"
+        return {"Authorization": f"Bearer {resp.json()['accessToken']}"}
+
+    def wipe(self):
+        resp = requests.delete(f"{self.base_url}/test-fixtures/{self.namespace}", timeout=TIMEOUT)
+        assert resp.status_code == 200, f"Failed to wipe fixture {self.namespace}: {resp.status_code} {resp.text}"
+        return resp.json()["deleted"]
+
+
+def seed(dataset, namespace=None, base_url=BASE_URL, **params):
+    namespace = namespace or f"tc-{uuid.uuid4().hex[:8]}"
+    resp = requests.post(
+        f"{base_url}/test-fixtures/seed",
+        json={"dataset": dataset, "namespace": namespace, "params": params},
+        timeout=TIMEOUT,
+    )
+    assert resp.status_code == 201, f"Failed to seed {dataset}: {resp.status_code} {resp.text}"
+    body = resp.json()
+    return Fixture(body["namespace"], body["dataset"], body["ids"], base_url)
+
+
+@contextmanager
+def seeded(dataset, namespace=None, base_url=BASE_URL, **params):
+    """Seed a dataset for the duration of a with-block and always wipe it afterwards."""
+    fixture = seed(dataset, namespace=namespace, base_url=base_url, **params)
+    try:
+        yield fixture
+    finally:
+        fixture.wipe()
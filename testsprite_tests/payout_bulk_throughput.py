@@ -0,0 +1,108 @@
+import requests
+import json
+import os
+import time
+import random
+
+from fixtures import seeded
+
+BASE_URL = os.getenv("BASE_URL", "http://localhost:8080")
+TIMEOUT = 120
+
+# Harness size: several thousand requests by default, pushed in bulk batches
+PAYOUT_COUNT = int(os.getenv("PAYOUT_COUNT", "5000"))
+PAYOUT_BATCH = int(os.getenv("PAYOUT_BATCH", "500"))
+# Payout routes act for the signed-in creator and the export needs an admin. Fixture creators
+# with a large ledger balance and a fixture admin are seeded and signed in (backend needs
+# ENABLE_TEST_FIXTURES=1). USD requests are debited in KRW, so the backend also needs
+# PAYOUT_USD_KRW_RATE.
+FIXTURE_CREATORS = 5
+
+
+def build_payout_request(rng):
+    # Payees come from each creator's saved payout settings
+    if rng.random() < 0.5:
+        return {"payment_method": "PayPal", "amount": round(rng.uniform(10, 500), 2), "currency": "USD"}
+    return {"payment_method": "Portone", "amount": rng.randrange(10000, 1000000, 1000), "currency": "KRW"}
+
+
+def test_payout_bulk_throughput():
+    """
+    Push PAYOUT_COUNT payout requests through the bulk endpoint, stream the settlement
+    export back and report requests/s for both directions.
+    """
+    # 10 ledger entries of 100M KRW per creator covers the ~2B KRW the default run requests
+    with seeded("creators_with_transactions", base_url=BASE_URL, creators=FIXTURE_CREATORS,
+                 transactions=10, amount=100_000_000) as creators, \
+            seeded("users_with_subscriptions", base_url=BASE_URL, users=1, admin=True) as admins:
+        creator_headers = [{**creators.auth_headers(c), "Content-Type": "application/json"}
+                           for c in creators.ids["creators"]]
+        admin_headers = admins.auth_headers(admins.ids["auth.users"][0])
+        run_payout_bulk_throughput(creator_headers, admin_headers)
+
+
+def run_payout_bulk_throughput(creator_headers, admin_headers):
+    bulk_endpoint = f"{BASE_URL}/creator/dashboard/payout-requests/bulk"
+    export_endpoint = f"{BASE_URL}/api/admin/payouts/settlement-export"
+
+    rng = random.Random(42)
+    payout_requests = [build_payout_request(rng) for _ in range(PAYOUT_COUNT)]
+    created_ids = {i: [] for i in range(len(creator_headers))}  # creator index -> request ids
+
+    try:
+        # Step 1: Bulk submission, batches spread round-robin over the signed-in creators
+        submit_start = time.perf_counter()
+        for n, offset in enumerate(range(0, PAYOUT_COUNT, PAYOUT_BATCH)):
+            batch = payout_requests[offset:offset + PAYOUT_BATCH]
+            creator = n % len(creator_headers)
+            response = requests.post(bulk_endpoint, json={"requests": batch}, headers=creator_headers[creator],
+                                     timeout=TIMEOUT)
+            assert response.status_code == 201, f"Bulk submit failed: {response.status_code} {response.text}"
+
+            body = response.json()
+            assert body["created"] == len(batch), f"Bulk submit rejected items: {body['results'][:5]}"
+            created_ids[creator].extend(r["id"] for r in body["results"])
+        submit_elapsed = time.perf_counter() - submit_start
+
+        # Step 2: Streaming settlement export (NDJSON so group totals are easy to check)
+        export_start = time.perf_counter()
+        response = requests.get(export_endpoint, params={"format": "ndjson"}, headers=admin_headers,
+                                timeout=TIMEOUT, stream=True)
+        assert response.status_code == 200, f"Settlement export failed: {response.status_code}"
+
+        exported_ids = set()
+        group_keys = []
+        summary = None
+        for line in response.iter_lines():
+            if not line:
+                continue
+            record = json.loads(line)
+            if record["type"] == "request":
+                exported_ids.add(record["id"])
+            elif record["type"] == "group_total":
+                group_keys.append((record["currency"], record["payment_method"]))
+            elif record["type"] == "summary":
+                summary = record
+        export_elapsed = time.perf_counter() - export_start
+
+        assert summary is not None, "Settlement export missing summary record"
+        all_ids = [i for ids in created_ids.values() for i in ids]
+        assert set(all_ids) <= exported_ids, "Settlement export is missing submitted requests"
+        assert len(group_keys) == len(set(group_keys)), f"Groups were split across the export: {group_keys}"
+
+        print(f"Submitted {PAYOUT_COUNT} payout requests in {submit_elapsed:.2f}s "
+              f"({PAYOUT_COUNT / submit_elapsed:.0f} req/s, batch={PAYOUT_BATCH})")
+        print(f"Exported {summary['count']} requests in {len(group_keys)} groups in {export_elapsed:.2f}s "
+              f"({summary['count'] / export_elapsed:.0f} rows/s)")
+
+    finally:
+        for creator, ids in created_ids.items():
+            for offset in range(0, len(ids), PAYOUT_BATCH):
+                batch = ids[offset:offset + PAYOUT_BATCH]
+                del_resp = requests.delete(bulk_endpoint, json={"ids": batch}, headers=creator_headers[creator],
+                                           timeout=TIMEOUT)
+                assert del_resp.status_code == 200, f"Failed to delete payout requests: {del_resp.text}"
+
+
+if __name__ == "__main__":
+    test_payout_bulk_throughput()
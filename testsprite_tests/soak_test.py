@@ -0,0 +1,236 @@
+"""
+Soak test: drive upload -> preview -> process against a running backend for hours while
+sampling its resource usage, then flag anything that grows without bound.
+
+A driver loop repeatedly uploads the "tiny" synthetic video (with a random trailer so the
+content-hash dedupe does not absorb the disk churn), requests a preview and polls it. A
+sampler thread polls GET /metrics/runtime every --sample-interval seconds for RSS, heap,
+open file descriptors, temp-dir bytes and in-memory map sizes and writes them to a fresh
+samples file per run (--out, default tmp/soak_samples_<run id>.ndjson).
+
+/process jobs are opt-in: --process-every N submits one every N iterations against a
+seeded drill. Each job uploads a real video to the Vimeo account configured on the
+backend and nothing deletes it, so only enable this against a throwaway account.
+
+A metric is flagged as unbounded when, after --warmup, its least-squares slope projects
+past its growth budget over 24h and its window medians rise monotonically. Start the
+backend with short housekeeping settings so eviction is exercised within the run, e.g.
+
+    JOB_STATUS_TTL_HOURS=0.25 TEMP_FILE_TTL_HOURS=0.25 HOUSEKEEPING_INTERVAL_MS=60000 npm start
+    python soak_test.py --hours 4 --sample-interval 30
+    python soak_test.py --analyze tmp/soak_samples_20261019T120000.ndjson
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+
+import requests
+
+from fixtures import seeded
+from video_fixtures import get_preset
+
+BASE_URL = os.getenv("SOAK_BASE_URL", "http://localhost:8080")
+TIMEOUT = 60
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def default_out():
+    run_id = time.strftime("%Y%m%dT%H%M%S")
+    return os.path.join(TESTS_DIR, "tmp", f"soak_samples_{run_id}.ndjson")
+
+
+# metric -> (extractor, allowed growth per 24h in the metric's unit)
+METRICS = {
+    "rss_mb": (lambda s: s["rssBytes"] / 1024 / 1024, 64),
+    "heap_mb": (lambda s: s["heapUsedBytes"] / 1024 / 1024, 32),
+    "open_fds": (lambda s: s["openFds"], 16),
+    "temp_mb": (lambda s: sum(s["tempBytes"].values()) / 1024 / 1024, 256),
+    "job_status_entries": (lambda s: s["maps"]["jobStatus"], 200),
+    "vimeo_folder_entries": (lambda s: s["maps"]["vimeoFolderCache"], 50),
+}
+WINDOWS = 4
+
+
+class Sampler(threading.Thread):
+    def __init__(self, base_url, interval, out_path):
+        super().__init__(daemon=True)
+        self.base_url = base_url
+        self.interval = interval
+        self.out_path = out_path
+        self.samples = []
+        self.stopped = threading.Event()
+
+    def run(self):
+        os.makedirs(os.path.dirname(self.out_path), exist_ok=True)
+        started = time.monotonic()
+        # One file per run: --analyze fits a single run's elapsed_s timeline
+        with open(self.out_path, "w", encoding="utf-8") as out:
+            while not self.stopped.is_set():
+                try:
+                    stats = requests.get(f"{self.base_url}/metrics/runtime", timeout=TIMEOUT).json()
+                    sample = {"elapsed_s": round(time.monotonic() - started, 1), "t": time.time(), **stats}
+                    self.samples.append(sample)
+                    out.write(json.dumps(sample) + "\n")
+                    out.flush()
+                except requests.RequestException as e:
+                    print(f"[sampler] {type(e).__name__}: {e}")
+                self.stopped.wait(self.interval)
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def drive(base_url, deadline, process_every, drill_id, stats):
+    with open(get_preset("tiny"), "rb") as f:
+        video = f.read()
+
+    iteration = 0
+    while time.monotonic() < deadline:
+        iteration += 1
+        try:
+            payload = video + os.urandom(16)
+            upload = requests.post(f"{base_url}/upload", files={"video": ("soak.mp4", payload, "video/mp4")}, timeout=TIMEOUT)
+            upload.raise_for_status()
+            uploaded = upload.json()
+            stats["uploads"] += 1
+
+            preview = requests.post(f"{base_url}/preview", json={"videoId": uploaded["videoId"], "filename": uploaded["filename"]}, timeout=TIMEOUT)
+            preview.raise_for_status()
+            job_id = preview.json()["jobId"]
+            for _ in range(60):
+                status = requests.get(f"{base_url}/status/{job_id}", timeout=TIMEOUT).json().get("status")
+                if status != "processing":
+                    break
+                time.sleep(1)
+            stats["previews"] += 1
+
+            if process_every and drill_id and iteration % process_every == 0:
+                process = requests.post(f"{base_url}/process", json={
+                    "videoId": uploaded["videoId"],
+                    "filename": uploaded["filename"],
+                    "cuts": [{"start": 0, "end": 1}],
+                    "drillId": drill_id,
+                    "videoType": "action",
+                    "title": "Soak test",
+                }, timeout=TIMEOUT)
+                process.raise_for_status()
+                stats["processes"] += 1
+        except requests.RequestException as e:
+            stats["errors"] += 1
+            print(f"[driver] iteration {iteration}: {type(e).__name__}: {e}")
+            time.sleep(5)
+
+
+def analyze(samples, warmup_s):
+    """Per-metric growth verdicts over the post-warmup samples."""
+    steady = [s for s in samples if s["elapsed_s"] >= warmup_s]
+    rows = []
+    for name, (extract, budget_per_day) in METRICS.items():
+        points = [(s["elapsed_s"], extract(s)) for s in steady]
+        points = [(x, y) for x, y in points if y is not None]
+        if len(points) < WINDOWS * 2:
+            rows.append({"metric": name, "samples": len(points), "verdict": "insufficient data"})
+            continue
+
+        xs, ys = zip(*points)
+        slope, _ = statistics.linear_regression(xs, ys)
+        per_day = slope * 86400
+        size = len(ys) // WINDOWS
+        medians = [statistics.median(ys[i * size:(i + 1) * size]) for i in range(WINDOWS)]
+        monotonic = all(b > a for a, b in zip(medians, medians[1:]))
+        unbounded = monotonic and per_day > budget_per_day
+        rows.append({
+            "metric": name,
+            "samples": len(points),
+            "first": ys[0],
+            "last": ys[-1],
+            "per_day": per_day,
+            "budget_per_day": budget_per_day,
+            "window_medians": medians,
+            "verdict": "UNBOUNDED" if unbounded else "ok",
+        })
+    return rows
+
+
+def format_analysis(rows):
+    lines = [f"{'metric':<22} {'n':>5} {'first':>10} {'last':>10} {'slope/24h':>11} {'budget':>8}  verdict"]
+    for row in rows:
+        if "per_day" not in row:
+            lines.append(f"{row['metric']:<22} {row['samples']:>5} {'':>10} {'':>10} {'':>11} {'':>8}  {row['verdict']}")
+            continue
+        lines.append(
+            f"{row['metric']:<22} {row['samples']:>5} {row['first']:>10.1f} {row['last']:>10.1f} "
+            f"{row['per_day']:>+11.1f} {row['budget_per_day']:>8}  {row['verdict']}"
+        )
+    return "\n".join(lines)
+
+
+def load_samples(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def soak(args, drill_id=None):
+    sampler = Sampler(args.base_url, args.sample_interval, args.out)
+    sampler.start()
+    stats = {"uploads": 0, "previews": 0, "processes": 0, "errors": 0}
+    deadline = time.monotonic() + args.hours * 3600
+
+    workers = [
+        threading.Thread(target=drive, args=(args.base_url, deadline, args.process_every, drill_id, stats), daemon=True)
+        for _ in range(args.concurrency)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    sampler.stop()
+
+    print(f"Driver: {stats['uploads']} uploads, {stats['previews']} previews, {stats['processes']} processes, {stats['errors']} errors")
+    return sampler.samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Soak the backend and detect unbounded resource growth")
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--hours", type=float, default=4.0)
+    parser.add_argument("--concurrency", type=int, default=2, help="parallel driver loops")
+    parser.add_argument("--sample-interval", type=float, default=30.0, help="seconds between /metrics/runtime samples")
+    parser.add_argument("--warmup", type=float, default=900.0, help="seconds of samples to ignore before fitting growth")
+    parser.add_argument("--process-every", type=int, default=0,
+                        help="submit a /process job every N iterations against a seeded drill; each one uploads "
+                             "a Vimeo video that is not cleaned up (default 0: disabled)")
+    parser.add_argument("--out", help="NDJSON file for this run's samples, overwritten "
+                                      "(default tmp/soak_samples_<run id>.ndjson)")
+    parser.add_argument("--analyze", metavar="SAMPLES", help="only analyze an existing samples file")
+    args = parser.parse_args()
+
+    if not args.analyze:
+        args.out = args.out or default_out()
+        print(f"Writing samples to {args.out}")
+
+    if args.analyze:
+        samples = load_samples(args.analyze)
+    elif args.process_every:
+        with seeded("content_with_videos", base_url=args.base_url, creators=1, lessons=0, drills=1, sparring=0) as fixture:
+            samples = soak(args, drill_id=fixture.ids["drills"][0])
+    else:
+        samples = soak(args)
+
+    rows = analyze(samples, args.warmup)
+    print(format_analysis(rows))
+
+    unbounded = [row["metric"] for row in rows if row["verdict"] == "UNBOUNDED"]
+    if unbounded:
+        print(f"\nUnbounded growth: {', '.join(unbounded)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""
+Client helpers for the backend's /process tracing: send a known x-request-id, wait for
+the job through /status/:jobId and assert per-stage time budgets on the returned trace.
+Traces are keyed by the job's processId; the x-request-id is recorded on the trace.
+"""
+import time
+import uuid
+
+import requests
+
+BASE_URL = "http://localhost:8080"
+TIMEOUT = 30
+
+
+def new_request_id(prefix="tc"):
+    return f"{prefix}-{uuid.uuid4()}"
+
+
+def fetch_trace(process_id, base_url=BASE_URL):
+    resp = requests.get(f"{base_url}/traces/{process_id}", timeout=TIMEOUT)
+    assert resp.status_code == 200, f"Trace {process_id} not found: {resp.status_code} {resp.text}"
+    return resp.json()
+
+
+def fetch_stage_metrics(base_url=BASE_URL):
+    resp = requests.get(f"{base_url}/metrics/process", timeout=TIMEOUT)
+    resp.raise_for_status()
+    return resp.json()["stages"]
+
+
+def wait_for_job(job_id, max_wait=900, interval=5, base_url=BASE_URL):
+    """Poll /status/:jobId until the job leaves 'processing'; returns the final status body."""
+    deadline = time.monotonic() + max_wait
+    while True:
+        resp = requests.get(f"{base_url}/status/{job_id}", timeout=TIMEOUT)
+        assert resp.status_code == 200, f"Failed to get job status: {resp.status_code} {resp.text}"
+        job = resp.json()
+        if job.get("status") != "processing":
+            return job
+        assert time.monotonic() < deadline, f"Job {job_id} still processing after {max_wait}s"
+        time.sleep(interval)
+
+
+def assert_stage_budgets(trace, budgets_ms, per_span=("cut",)):
+    """
+    budgets_ms maps stage name -> budget in ms. Stages named in per_span are checked
+    span by span (e.g. every single cut); the rest against the stage total.
+    Stages absent from the trace are skipped.
+    """
+    failures = []
+    for stage, budget in budgets_ms.items():
+        if stage in per_span:
+            for span in (s for s in trace["spans"] if s["name"] == stage):
+                if span["durationMs"] > budget:
+                    failures.append(f"{stage}[{span['attributes'].get('index')}] {span['durationMs']}ms > {budget}ms")
+        elif stage in trace["stages"] and trace["stages"][stage] > budget:
+            failures.append(f"{stage} {trace['stages'][stage]}ms > {budget}ms")
+    assert not failures, "Stage budgets exceeded: " + "; ".join(failures)
@@ -0,0 +1,274 @@
+"""
+Deterministic replay of traffic captured by the backend (TRAFFIC_CAPTURE=1).
+
+Records are re-issued in their original order, keeping the original inter-arrival gaps
+divided by --speed (so --speed 4 replays an hour in 15 minutes; --speed 0 sends as fast
+as the worker pool allows). Each request is sent at its scheduled time from a thread
+pool, so slow responses do not delay later arrivals. The report compares captured vs
+replayed latency per endpoint and counts status mismatches.
+
+Every record carries the sample rate it was captured at (sr), and each one is re-sent
+about 1/sr times, spread over the gap to the next record, so the replay approaches the
+original load rather than the sampled one (--no-scale replays the sample as captured).
+
+Only GET and HEAD are replayed by default. Writes (/process, deletes, payouts, ...) have
+real side effects and their bodies carry [scrubbed] placeholders, so they are re-sent
+only with --allow-writes, and even then records with scrubbed bodies are skipped.
+
+    python traffic_replay.py backend/traffic_capture.ndjson --target http://localhost:8081 --speed 2
+    python traffic_replay.py capture.ndjson --since 2026-10-12T18:00 --until 2026-10-12T22:00
+
+With --stand-in PORT the tool instead serves a local stand-in built from the capture: each
+endpoint answers with its captured statuses and latencies in order, which makes a
+replay target that needs no Supabase, Vimeo or Mux.
+"""
+import argparse
+import json
+import random
+import statistics
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from bench_suite import endpoint_template
+
+TIMEOUT = 30
+SAFE_METHODS = {"GET", "HEAD"}
+SCRUBBED_MARKERS = ("[scrubbed]", "[too large]", "[truncated]")
+
+
+def load_records(paths, since=None, until=None):
+    records = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if since is not None and record["t"] < since:
+                    continue
+                if until is not None and record["t"] >= until:
+                    continue
+                records.append(record)
+    # Stable sort keeps capture order for records in the same millisecond
+    records.sort(key=lambda r: r["t"])
+    return records
+
+
+def _parse_time(value):
+    if value is None:
+        return None
+    if value.isdigit():
+        return int(value)
+    return int(datetime.fromisoformat(value).timestamp() * 1000)
+
+
+def skip_reason(record, allow_writes=False):
+    """Why a record cannot be re-sent, or None."""
+    if record.get("mp"):
+        # Multipart bodies (raw uploads) are not captured, so they cannot be re-sent
+        return "multipart"
+    if record["m"].upper() not in SAFE_METHODS:
+        if not allow_writes:
+            return "write (needs --allow-writes)"
+        if "b" in record and any(marker in json.dumps(record["b"]) for marker in SCRUBBED_MARKERS):
+            return "scrubbed body"
+    return None
+
+
+def schedule(records, scale=True, seed=0):
+    """
+    (offset ms from the first record, record) pairs to send. With scale, each record is
+    repeated 1/sr times (fractions rounded stochastically with a fixed seed, so runs are
+    repeatable) and the copies are spread evenly up to the next record's time.
+    """
+    rng = random.Random(seed)
+    first_t = records[0]["t"] if records else 0
+    # The last record has no successor; spread its copies over the average gap instead
+    mean_gap = (records[-1]["t"] - first_t) / (len(records) - 1) if len(records) > 1 else 0
+    plan = []
+    for i, record in enumerate(records):
+        offset = record["t"] - first_t
+        copies = 1
+        if scale:
+            expected = 1 / record.get("sr", 1) if record.get("sr") else 1
+            copies = int(expected) + (1 if rng.random() < expected - int(expected) else 0)
+        gap = (records[i + 1]["t"] - record["t"]) if i + 1 < len(records) else mean_gap
+        for c in range(copies):
+            plan.append((offset + gap * c / copies, record))
+    plan.sort(key=lambda item: item[0])
+    return plan
+
+
+def replay(records, target, speed=1.0, workers=32, allow_writes=False, scale=True):
+    """Re-issue records against target; returns per-request results and skip counts by reason."""
+    results = []
+    lock = threading.Lock()
+    session = requests.Session()
+    session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=workers))
+    session.mount("https://", requests.adapters.HTTPAdapter(pool_maxsize=workers))
+
+    def send(record):
+        headers = {k: v for k, v in (record.get("h") or {}).items() if v}
+        headers["x-request-id"] = f"replay-{record.get('id') or record['t']}"
+        start = time.perf_counter()
+        try:
+            resp = session.request(record["m"], target + record["p"], json=record.get("b"),
+                                   headers=headers, timeout=TIMEOUT)
+            status = resp.status_code
+        except requests.RequestException as e:
+            status = f"error: {type(e).__name__}"
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with lock:
+            results.append({
+                "endpoint": endpoint_template(record["m"], record["p"]),
+                "captured_ms": record["d"],
+                "replayed_ms": elapsed_ms,
+                "captured_status": record["s"],
+                "replayed_status": status,
+            })
+
+    skipped = Counter()
+    sendable = []
+    for record in records:
+        reason = skip_reason(record, allow_writes)
+        if reason:
+            skipped[reason] += 1
+        else:
+            sendable.append(record)
+
+    replay_start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for offset_ms, record in schedule(sendable, scale=scale):
+            if speed > 0:
+                due = replay_start + offset_ms / 1000 / speed
+                delay = due - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            pool.submit(send, record)
+
+    return results, skipped
+
+
+def summarize(results):
+    by_endpoint = defaultdict(list)
+    for r in results:
+        by_endpoint[r["endpoint"]].append(r)
+
+    def p95(values):
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+    rows = []
+    for endpoint, items in sorted(by_endpoint.items()):
+        captured = [r["captured_ms"] for r in items]
+        replayed = [r["replayed_ms"] for r in items]
+        rows.append({
+            "endpoint": endpoint,
+            "count": len(items),
+            "captured_p50": statistics.median(captured),
+            "replayed_p50": statistics.median(replayed),
+            "captured_p95": p95(captured),
+            "replayed_p95": p95(replayed),
+            "status_mismatches": sum(1 for r in items if r["captured_status"] != r["replayed_status"]),
+        })
+    return rows
+
+
+def format_summary(rows):
+    lines = [f"{'endpoint':<52} {'n':>6} {'p50 cap':>9} {'p50 rep':>9} {'p95 cap':>9} {'p95 rep':>9} {'Δp50':>8} {'status≠':>8}"]
+    for row in rows:
+        delta = row["replayed_p50"] - row["captured_p50"]
+        lines.append(
+            f"{row['endpoint']:<52} {row['count']:>6} {row['captured_p50']:>9.1f} {row['replayed_p50']:>9.1f} "
+            f"{row['captured_p95']:>9.1f} {row['replayed_p95']:>9.1f} {delta:>+8.1f} {row['status_mismatches']:>8}"
+        )
+    return "\n".join(lines)
+
+
+def serve_stand_in(records, port):
+    """Answer each endpoint with its captured (status, latency) sequence, cycling when exhausted."""
+    responses = defaultdict(deque)
+    for record in records:
+        responses[endpoint_template(record["m"], record["p"])].append((record["s"], record["d"]))
+    lock = threading.Lock()
+
+    class StandInHandler(BaseHTTPRequestHandler):
+        def _respond(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            if length:
+                self.rfile.read(length)
+            queue = responses.get(endpoint_template(self.command, self.path))
+            if not queue:
+                status, delay_ms = 404, 0
+            else:
+                with lock:
+                    status, delay_ms = queue[0]
+                    queue.rotate(-1)
+            time.sleep(delay_ms / 1000)
+            body = b"" if status in (204, 304) else b"{}"
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        do_GET = do_POST = do_PUT = do_DELETE = _respond
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), StandInHandler)
+    print(f"Stand-in serving {len(responses)} endpoints on http://127.0.0.1:{port}")
+    server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay captured backend traffic against a target")
+    parser.add_argument("logs", nargs="+", help="capture NDJSON files (e.g. traffic_capture.ndjson and .1)")
+    parser.add_argument("--target", default="http://localhost:8080")
+    parser.add_argument("--speed", type=float, default=1.0, help="time compression factor; 0 = no waits")
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--allow-writes", action="store_true",
+                        help="also replay non-GET/HEAD requests (side effects on the target!)")
+    parser.add_argument("--no-scale", dest="scale", action="store_false",
+                        help="replay the sampled records once each instead of scaling by 1/sample rate")
+    parser.add_argument("--since", help="ISO time or epoch ms; only replay records at or after this")
+    parser.add_argument("--until", help="ISO time or epoch ms; only replay records before this")
+    parser.add_argument("--json", dest="json_out", help="write per-endpoint summary as JSON here")
+    parser.add_argument("--stand-in", type=int, metavar="PORT", help="serve a stand-in built from the logs instead")
+    args = parser.parse_args()
+
+    records = load_records(args.logs, _parse_time(args.since), _parse_time(args.until))
+    if not records:
+        print("No records to replay.")
+        return
+
+    if args.stand_in:
+        serve_stand_in(records, args.stand_in)
+        return
+
+    span_s = (records[-1]["t"] - records[0]["t"]) / 1000
+    print(f"Replaying {len(records)} records spanning {span_s:.0f}s against {args.target} at {args.speed}x")
+
+    started = time.monotonic()
+    results, skipped = replay(records, args.target.rstrip("/"), speed=args.speed, workers=args.workers,
+                              allow_writes=args.allow_writes, scale=args.scale)
+    rows = summarize(results)
+
+    skipped_text = ", ".join(f"{count} {reason}" for reason, count in sorted(skipped.items())) or "none"
+    print(f"Replayed {len(results)} requests in {time.monotonic() - started:.1f}s (skipped: {skipped_text})\n")
+    print(format_summary(rows))
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
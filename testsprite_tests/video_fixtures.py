@@ -0,0 +1,126 @@
+"""
+Deterministic synthetic test videos generated locally with ffmpeg's lavfi sources.
+
+Videos are cached by their generation parameters, so benchmarks and scenarios can ask
+for "1080p, 1 hour, GOP 60" repeatedly and only pay the encode cost once.
+
+    python video_fixtures.py --preset sparring_1080p_hour
+    python video_fixtures.py --duration 30 --width 1280 --height 720 --gop 48
+"""
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import tempfile
+from dataclasses import asdict, dataclass, replace
+
+FFMPEG = os.getenv("FFMPEG_PATH", "ffmpeg")
+FIXTURE_DIR = os.getenv("VIDEO_FIXTURE_DIR", os.path.join(tempfile.gettempdir(), "grappl-video-fixtures"))
+
+# Bump when the ffmpeg command changes so stale cached files are not reused
+FIXTURE_VERSION = 1
+
+
+@dataclass(frozen=True)
+class VideoSpec:
+    duration: float = 10.0
+    width: int = 1280
+    height: int = 720
+    fps: int = 30
+    gop: int = 60
+    video_bitrate: str = "2M"
+    audio: bool = True
+    preset: str = "veryfast"
+
+    def cache_key(self):
+        payload = json.dumps({"version": FIXTURE_VERSION, **asdict(self)}, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+    def filename(self):
+        return f"synthetic_{self.width}x{self.height}_{self.duration:g}s_gop{self.gop}_{self.cache_key()}.mp4"
+
+
+PRESETS = {
+    "tiny": VideoSpec(duration=2, width=320, height=240, fps=15, gop=15, video_bitrate="200k"),
+    "short_720p": VideoSpec(duration=30, width=1280, height=720),
+    "lesson_1080p": VideoSpec(duration=600, width=1920, height=1080, gop=60, video_bitrate="6M"),
+    "sparring_1080p_hour": VideoSpec(duration=3600, width=1920, height=1080, gop=60, video_bitrate="6M"),
+}
+
+
+def build_command(spec, output_path):
+    """ffmpeg command producing a bit-exact, reproducible test video for spec."""
+    cmd = [
+        FFMPEG, "-hide_banner", "-loglevel", "error", "-y",
+        "-f", "lavfi", "-i", f"testsrc2=size={spec.width}x{spec.height}:rate={spec.fps}:duration={spec.duration}",
+    ]
+    if spec.audio:
+        cmd += ["-f", "lavfi", "-i", f"sine=frequency=440:sample_rate=48000:duration={spec.duration}"]
+
+    cmd += [
+        "-c:v", "libx264", "-preset", spec.preset, "-pix_fmt", "yuv420p",
+        "-b:v", spec.video_bitrate, "-maxrate", spec.video_bitrate, "-bufsize", spec.video_bitrate,
+        # Fixed GOP with no scene-cut keyframes so cut points land predictably
+        "-g", str(spec.gop), "-keyint_min", str(spec.gop), "-sc_threshold", "0",
+        "-x264-params", f"keyint={spec.gop}:min-keyint={spec.gop}:scenecut=0",
+    ]
+    if spec.audio:
+        cmd += ["-c:a", "aac", "-b:a", "128k"]
+    else:
+        cmd += ["-an"]
+
+    cmd += [
+        "-map_metadata", "-1", "-fflags", "+bitexact", "-flags:v", "+bitexact", "-flags:a", "+bitexact",
+        "-movflags", "+faststart",
+        output_path,
+    ]
+    return cmd
+
+
+def get_video(spec=None, fixture_dir=FIXTURE_DIR, **overrides):
+    """
+    Return the path of a synthetic video matching spec (plus keyword overrides),
+    generating it with ffmpeg on first use.
+    """
+    spec = replace(spec or VideoSpec(), **overrides)
+    os.makedirs(fixture_dir, exist_ok=True)
+    output_path = os.path.join(fixture_dir, spec.filename())
+
+    if os.path.exists(output_path):
+        return output_path
+
+    # Encode to a temp name and rename, so an interrupted run never leaves a truncated fixture
+    tmp_path = f"{output_path}.{os.getpid()}.tmp.mp4"
+    try:
+        subprocess.run(build_command(spec, tmp_path), check=True)
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return output_path
+
+
+def get_preset(name, fixture_dir=FIXTURE_DIR):
+    return get_video(PRESETS[name], fixture_dir=fixture_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate cached synthetic test videos")
+    parser.add_argument("--preset", choices=sorted(PRESETS))
+    parser.add_argument("--duration", type=float)
+    parser.add_argument("--width", type=int)
+    parser.add_argument("--height", type=int)
+    parser.add_argument("--fps", type=int)
+    parser.add_argument("--gop", type=int)
+    parser.add_argument("--bitrate", dest="video_bitrate")
+    parser.add_argument("--no-audio", dest="audio", action="store_false", default=None)
+    args = parser.parse_args()
+
+    base = PRESETS[args.preset] if args.preset else VideoSpec()
+    overrides = {k: v for k, v in vars(args).items() if k != "preset" and v is not None}
+    print(get_video(base, **overrides))
+
+
+if __name__ == "__main__":
+    main()
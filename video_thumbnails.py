@@ -0,0 +1,300 @@
+"""
+Poster frames, WebP thumbnails and hover-scrub sprite sheets from a single decode.
+
+ffmpeg decodes each video exactly once, sampling SPRITE_FRAMES evenly spaced frames
+scaled to the largest thumbnail width and piping them as raw RGB. Pillow builds every
+output from those frames:
+
+    <out>/<sha256>/poster.jpg          most detailed non-dark sampled frame
+    <out>/<sha256>/thumb_<w>.webp      poster at each width in THUMB_WIDTHS
+    <out>/<sha256>/sprite.webp         grid of all sampled frames for hover scrubbing
+    <out>/<sha256>/manifest.json       paths, sprite geometry and per-tile timestamps
+
+When neither the container nor the stream reports a duration (ffprobe "N/A", e.g. some
+live-recorded WebM), frames are sampled once per second from the start for the poster and
+thumbnails, and the sprite is skipped ("sprite": null) since its tiles could not span the video.
+
+Outputs are keyed by the video's content hash, so a catalog backfill only does work for
+videos it has not seen (or when the generation settings change). Videos are processed
+in parallel over a process pool.
+
+    python video_thumbnails.py backend/temp/processing --out backend/temp/processed/thumbnails
+    python video_thumbnails.py final.mp4 --out thumbs --workers 4 --json
+"""
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from PIL import Image, ImageStat
+
+FFMPEG = os.getenv("FFMPEG_PATH", "ffmpeg")
+FFPROBE = os.getenv("FFPROBE_PATH", "ffprobe")
+
+THUMB_WIDTHS = (320, 640, 1280)
+SPRITE_FRAMES = 60
+SPRITE_COLUMNS = 10
+SPRITE_TILE_WIDTH = 160
+UNKNOWN_DURATION_FRAMES = 10  # poster candidates, one per second, when the duration is unknown
+WEBP_QUALITY = 80
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".m4v", ".mkv", ".webm")
+
+# Bump when the outputs change so cached results are regenerated
+THUMBNAIL_VERSION = 1
+
+
+def settings_key():
+    return {
+        "version": THUMBNAIL_VERSION,
+        "thumb_widths": list(THUMB_WIDTHS),
+        "sprite_frames": SPRITE_FRAMES,
+        "sprite_columns": SPRITE_COLUMNS,
+        "sprite_tile_width": SPRITE_TILE_WIDTH,
+    }
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def parse_duration(value):
+    """Seconds from an ffprobe duration field, or None for "N/A", missing or non-positive values."""
+    try:
+        duration = float(value)
+    except (TypeError, ValueError):
+        return None
+    return duration if duration > 0 else None
+
+
+def probe(path):
+    """(duration, width, height) of the first video stream, with rotation applied.
+
+    duration is the container's, else the stream's, else None when neither is known.
+    """
+    out = subprocess.run(
+        [FFPROBE, "-v", "error", "-select_streams", "v:0", "-show_entries",
+         "stream=width,height,duration:stream_side_data=rotation:stream_tags=rotate:format=duration",
+         "-of", "json", path],
+        capture_output=True, check=True, text=True,
+    ).stdout
+    info = json.loads(out)
+    stream = info["streams"][0]
+    width, height = stream["width"], stream["height"]
+    rotation = int(stream.get("tags", {}).get("rotate", 0))
+    for side_data in stream.get("side_data_list", []):
+        rotation = int(side_data.get("rotation", rotation))
+    if abs(rotation) % 180 == 90:
+        width, height = height, width
+    duration = parse_duration(info.get("format", {}).get("duration")) or parse_duration(stream.get("duration"))
+    return duration, width, height
+
+
+def decode_frames(path, duration, width, height, count=SPRITE_FRAMES, max_width=max(THUMB_WIDTHS)):
+    """Decode path once and yield (timestamp, PIL.Image) for `count` evenly spaced frames.
+
+    With an unknown duration, yields UNKNOWN_DURATION_FRAMES frames one second apart instead.
+    """
+    out_w = min(max_width, width) // 2 * 2
+    out_h = max(2, round(height * out_w / width / 2) * 2)
+    frame_bytes = out_w * out_h * 3
+    if duration is None:
+        interval, count = 1.0, UNKNOWN_DURATION_FRAMES
+    else:
+        interval = duration / count
+
+    cmd = [
+        # Start half an interval in so samples sit mid-interval and the first tile is not a black lead-in frame
+        FFMPEG, "-hide_banner", "-loglevel", "error", "-ss", f"{interval / 2:.3f}", "-i", path,
+        "-vf", f"fps=1/{interval:.6f},scale={out_w}:{out_h}:flags=bilinear",
+        "-frames:v", str(count), "-an", "-f", "rawvideo", "-pix_fmt", "rgb24", "pipe:1",
+    ]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        index = 0
+        while True:
+            data = proc.stdout.read(frame_bytes)
+            if len(data) < frame_bytes:
+                break
+            yield (index + 0.5) * interval, Image.frombytes("RGB", (out_w, out_h), data)
+            index += 1
+    finally:
+        proc.stdout.close()
+        stderr = proc.stderr.read().decode(errors="replace")
+        if proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg failed for {path}: {stderr.strip()}")
+
+
+def frame_score(image):
+    """Higher for detailed, well-exposed frames; near-black or flat frames score lowest."""
+    stat = ImageStat.Stat(image.convert("L").resize((64, 36)))
+    mean, stddev = stat.mean[0], stat.stddev[0]
+    if mean < 20 or mean > 235:
+        return stddev * 0.1
+    return stddev
+
+
+def render_outputs(frames, out_dir, sprite=True):
+    """Write poster, thumbnails and (unless sprite=False) the sprite from an iterable of (timestamp, image)."""
+    os.makedirs(out_dir, exist_ok=True)
+    tiles, timestamps = [], []
+    poster, poster_time, poster_score = None, 0.0, -1.0
+
+    for timestamp, image in frames:
+        score = frame_score(image)
+        if score > poster_score:
+            poster, poster_time, poster_score = image, timestamp, score
+        if sprite:
+            tile_height = max(1, round(image.height * SPRITE_TILE_WIDTH / image.width))
+            tiles.append(image.resize((SPRITE_TILE_WIDTH, tile_height), Image.BILINEAR))
+            timestamps.append(round(timestamp, 3))
+
+    if poster is None:
+        raise RuntimeError("no frames decoded")
+
+    poster.save(os.path.join(out_dir, "poster.jpg"), "JPEG", quality=88, optimize=True, progressive=True)
+
+    thumbnails = {}
+    for width in THUMB_WIDTHS:
+        if width > poster.width and thumbnails:
+            continue  # never upscale; the largest available size is already written
+        target = min(width, poster.width)
+        height = round(poster.height * target / poster.width)
+        name = f"thumb_{width}.webp"
+        poster.resize((target, height), Image.LANCZOS).save(os.path.join(out_dir, name), "WEBP", quality=WEBP_QUALITY, method=4)
+        thumbnails[str(width)] = name
+
+    outputs = {
+        "poster": "poster.jpg",
+        "poster_time": round(poster_time, 3),
+        "thumbnails": thumbnails,
+        "sprite": None,
+    }
+    if not sprite:
+        return outputs
+
+    tile_w, tile_h = tiles[0].size
+    columns = min(SPRITE_COLUMNS, len(tiles))
+    rows = -(-len(tiles) // columns)
+    sheet = Image.new("RGB", (columns * tile_w, rows * tile_h))
+    for i, tile in enumerate(tiles):
+        sheet.paste(tile, ((i % columns) * tile_w, (i // columns) * tile_h))
+    sheet.save(os.path.join(out_dir, "sprite.webp"), "WEBP", quality=WEBP_QUALITY - 10, method=4)
+
+    outputs["sprite"] = {
+        "file": "sprite.webp",
+        "columns": columns,
+        "rows": rows,
+        "tile_width": tile_w,
+        "tile_height": tile_h,
+        "timestamps": timestamps,
+    }
+    return outputs
+
+
+def read_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, "manifest.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def outputs_exist(out_dir, manifest):
+    """True when every file the manifest points at is still on disk."""
+    files = [manifest.get("poster"), *manifest.get("thumbnails", {}).values()]
+    if manifest.get("sprite"):
+        files.append(manifest["sprite"].get("file"))
+    return all(name and os.path.isfile(os.path.join(out_dir, name)) for name in files)
+
+
+def generate(path, out_root):
+    """Generate (or reuse) all outputs for one video. Runs inside a pool worker."""
+    sha256 = hash_file(path)
+    out_dir = os.path.join(out_root, sha256)
+
+    manifest = read_manifest(out_dir)
+    # A partially cleaned-up directory (missing poster, WebP or sprite) is regenerated
+    if manifest and manifest.get("settings") == settings_key() and outputs_exist(out_dir, manifest):
+        # Reuse counts as use: the backend's temp-file GC ages this directory by its newest mtime
+        os.utime(os.path.join(out_dir, "manifest.json"))
+        return {**manifest, "source": path, "cached": True}
+
+    duration, width, height = probe(path)
+    outputs = render_outputs(decode_frames(path, duration, width, height), out_dir, sprite=duration is not None)
+    manifest = {
+        "sha256": sha256,
+        "settings": settings_key(),
+        "duration": duration,
+        "width": width,
+        "height": height,
+        **outputs,
+    }
+
+    # Write-then-rename so an interrupted run never leaves a manifest for partial outputs
+    tmp = os.path.join(out_dir, f"manifest.json.{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, os.path.join(out_dir, "manifest.json"))
+    return {**manifest, "source": path, "cached": False}
+
+
+def find_videos(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    if name.lower().endswith(VIDEO_EXTENSIONS):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def generate_many(paths, out_root, workers=None):
+    """Yield one result per video as it finishes: a manifest, or {"source", "error"}."""
+    videos = list(dict.fromkeys(find_videos(paths)))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(generate, video, out_root): video for video in videos}
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as e:
+                yield {"source": futures[future], "error": str(e)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate posters, WebP thumbnails and scrub sprites from videos")
+    parser.add_argument("paths", nargs="+", help="video files or directories to scan")
+    parser.add_argument("--out", default=os.path.join("backend", "temp", "processed", "thumbnails"))
+    parser.add_argument("--workers", type=int, default=None, help="process pool size (default: CPU count)")
+    parser.add_argument("--json", action="store_true", help="print one JSON manifest per line")
+    args = parser.parse_args()
+
+    generated = cached = failed = 0
+    for result in generate_many(args.paths, args.out, args.workers):
+        if args.json:
+            print(json.dumps(result), flush=True)
+        if "error" in result:
+            failed += 1
+            if not args.json:
+                print(f"FAILED {result['source']}: {result['error']}")
+        elif result["cached"]:
+            cached += 1
+        else:
+            generated += 1
+            if not args.json:
+                print(f"{result['source']} -> {os.path.join(args.out, result['sha256'])}")
+
+    if not args.json:
+        print(f"Done: {generated} generated, {cached} cached, {failed} failed")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()